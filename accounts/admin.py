@@ -1,8 +1,10 @@
 from django.contrib import admin
-from .models import Curriculum
+from .models import Curriculum, GenerationCacheEntry, LinkCheck
 
 # Register your models here.
 admin.site.register(Curriculum)
+admin.site.register(GenerationCacheEntry)
+admin.site.register(LinkCheck)
 
 
 
@@ -0,0 +1,154 @@
+"""
+Streaming export of every curriculum, its progress and feedback as a ZIP of
+JSON Lines files, optionally with one PDF per curriculum.
+
+    for chunk in export_zip_chunks(include_pdfs=False):
+        out.write(chunk)
+
+Rows are read with .iterator(chunk_size=...) and the archive is written
+incrementally into a small buffer that is drained as chunks, so memory stays
+flat however many curricula there are. Used by the admin_export_curricula
+view and manage.py export_curricula; only the command adds PDFs, which come
+from the PDF cache or, on a miss, the render pool.
+"""
+import json
+import shutil
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from io import BytesIO
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Curriculum, CurriculumFeedback, ProgressBitmap, UserProgress
+from .pdf import PdfRenderBusy, curriculum_document, open_cached_pdf, pdf_cache_key, render_pool
+from .pdf_builder import render_pdf
+from .progress import get_progress_store, progress_version
+
+CURRICULUM_FIELDS = (
+    'id', 'user_id', 'user__username', 'topic', 'difficulty', 'duration', 'content', 'total_tasks',
+    'completed_tasks', 'progress_percentage', 'created_at', 'updated_at',
+)
+PROGRESS_FIELDS = ('curriculum_id', 'user_id', 'week_number', 'task_index', 'completed', 'completed_at', 'changed_at')
+FEEDBACK_FIELDS = (
+    'id', 'curriculum_id', 'user_id', 'rating', 'difficulty_rating', 'feedback_text', 'created_at',
+)
+
+# Drained chunks are at least this big, so responses are not a stream of tiny writes
+FLUSH_BYTES = 64 * 1024
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable file object that zipfile writes into and the generator drains"""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self, force=False):
+        if self._size and (force or self._size >= FLUSH_BYTES):
+            data = b''.join(self._chunks)
+            self._chunks, self._size = [], 0
+            yield data
+
+
+def _json_line(record):
+    return (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def curriculum_records(chunk_size):
+    for record in Curriculum.objects.order_by('id').values(*CURRICULUM_FIELDS).iterator(chunk_size=chunk_size):
+        record['username'] = record.pop('user__username')
+        yield record
+
+
+def progress_records(chunk_size):
+    """One record per touched task, from whichever store PROGRESS_STORAGE selects"""
+    if get_progress_store().name == 'bitmap':
+        bitmaps = ProgressBitmap.objects.select_related('curriculum').only('curriculum__user_id', 'stride', 'bits', 'times')
+        for bitmap in bitmaps.order_by('curriculum_id').iterator(chunk_size=chunk_size):
+            completed = set(bitmap.completed_keys())
+            for week_number, task_index in sorted(completed | {bitmap.key_for(int(bit)) for bit in bitmap.times}):
+                completed_at, changed_at = bitmap.get_times(week_number, task_index)
+                yield {
+                    'curriculum_id': bitmap.curriculum_id,
+                    'user_id': bitmap.curriculum.user_id,
+                    'week_number': week_number,
+                    'task_index': task_index,
+                    'completed': (week_number, task_index) in completed,
+                    'completed_at': completed_at,
+                    'changed_at': changed_at,
+                }
+        return
+    rows = UserProgress.objects.order_by('curriculum_id', 'week_number', 'task_index').values(*PROGRESS_FIELDS)
+    yield from rows.iterator(chunk_size=chunk_size)
+
+
+def feedback_records(chunk_size):
+    yield from CurriculumFeedback.objects.order_by('id').values(*FEEDBACK_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _render(curriculum, key, store):
+    """Future for a curriculum's PDF bytes from the render pool, rendering here when the pool is full"""
+    document = curriculum_document(curriculum, store.completed_keys(curriculum.user, curriculum),
+                                   curriculum.progress_percentage)
+    try:
+        return render_pool.submit(curriculum.id, key, document)
+    except PdfRenderBusy:
+        future = Future()
+        future.set_result(render_pdf(document))
+        return future
+
+
+def curriculum_pdfs(chunk_size):
+    """(curriculum id, open PDF file) per curriculum; cached renders are reused, misses render in the pool"""
+    store = get_progress_store()
+    window = deque()  # Misses rendering ahead in the pool, oldest first
+    curricula = Curriculum.objects.order_by('id').select_related('user')
+    for curriculum in curricula.iterator(chunk_size=chunk_size):
+        key = pdf_cache_key(curriculum, progress_version(curriculum.user, curriculum))
+        pdf = open_cached_pdf(curriculum, key)
+        window.append((curriculum.id, pdf if pdf is not None else _render(curriculum, key, store)))
+        # Keep every pool worker busy, but yield in curriculum order
+        while window and (not isinstance(window[0][1], Future) or len(window) > render_pool.workers):
+            yield _opened(*window.popleft())
+    while window:
+        yield _opened(*window.popleft())
+
+
+def _opened(curriculum_id, pdf):
+    return curriculum_id, BytesIO(pdf.result()) if isinstance(pdf, Future) else pdf
+
+
+def export_zip_chunks(include_pdfs=False, chunk_size=500):
+    """Yield the bytes of the export ZIP as it is written"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, records in (
+            ('curricula.jsonl', curriculum_records(chunk_size)),
+            ('progress.jsonl', progress_records(chunk_size)),
+            ('feedback.jsonl', feedback_records(chunk_size)),
+        ):
+            # Sizes are unknown up front, so allow entries past 4 GB
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for record in records:
+                    entry.write(_json_line(record))
+                    yield from buffer.drain()
+
+        if include_pdfs:
+            for curriculum_id, pdf in curriculum_pdfs(chunk_size):
+                with archive.open(f'pdf/{curriculum_id}.pdf', 'w', force_zip64=True) as entry:
+                    shutil.copyfileobj(pdf, entry)
+                pdf.close()
+                yield from buffer.drain()
+
+    # The central directory is written when the archive closes
+    yield from buffer.drain(force=True)
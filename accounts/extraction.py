@@ -0,0 +1,280 @@
+"""
+Single-pass extraction of curriculum JSON from raw LLM output.
+
+CurriculumParser scans the text once, jumping between structural
+characters with a regex instead of walking every character. It skips
+prose and markdown fences, finds the outermost JSON value, emits each
+week as soon as it is complete (for streaming), repairs truncated output
+by closing brackets at the last complete nested value, and normalizes the
+result against a compiled curriculum schema.
+"""
+import json
+import re
+
+_TOKEN = re.compile(r'["\\\[\]{}]')
+_VALUE_START = re.compile(r'[\[{]')
+_DECODER = json.JSONDecoder()
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class CurriculumFormatError(ValueError):
+    """Raised when no curriculum can be recovered from the text"""
+
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+
+def _string_list(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else json.dumps(item) for item in value]
+    return None
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_str(value):
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+def _task_text(index, raw):
+    return _as_str(raw.get('title') or raw.get('name')) or f'Task {index + 1}'
+
+
+TASK_SCHEMA = {
+    'task': (_as_str, _task_text),
+    'resources': (_string_list, lambda index, raw: []),
+    'videos': (_string_list, lambda index, raw: []),
+}
+
+WEEK_SCHEMA = {
+    'week': (_as_int, lambda index, raw: index + 1),
+    'title': (_as_str, lambda index, raw: _as_str(raw.get('topic')) or f'Week {index + 1}'),
+    'description': (_as_str, lambda index, raw: _as_str(raw.get('goal')) or ''),
+    'tasks': (None, lambda index, raw: []),  # Filled in by normalize_week
+}
+
+
+def compile_schema(schema):
+    """Turn {field: (coerce, default)} into a normalizer(raw, index) -> dict"""
+    fields = [(name, coerce, default) for name, (coerce, default) in schema.items() if coerce]
+
+    def normalize(raw, index):
+        result = dict(raw)  # Keep keys the schema doesn't know about
+        for name, coerce, default in fields:
+            value = coerce(raw[name]) if name in raw else None
+            result[name] = default(index, raw) if value is None else value
+        return result
+
+    return normalize
+
+
+_normalize_task = compile_schema(TASK_SCHEMA)
+_normalize_week_fields = compile_schema(WEEK_SCHEMA)
+
+
+def normalize_task(raw, index):
+    if isinstance(raw, str):
+        raw = {'task': raw}
+    elif not isinstance(raw, dict):
+        raw = {}
+    return _normalize_task(raw, index)
+
+
+def normalize_week(raw, index):
+    """Fill in missing week fields and task/resources/videos keys"""
+    week = _normalize_week_fields(raw, index)
+    tasks = raw.get('tasks')
+    week['tasks'] = [normalize_task(task, i) for i, task in enumerate(tasks)] if isinstance(tasks, list) else []
+    return week
+
+
+def validate_curriculum(value):
+    """Return a {"weeks": [...]} document with every week and task normalized"""
+    if isinstance(value, list):
+        document, weeks = {}, value
+    elif isinstance(value, dict):
+        document, weeks = dict(value), value.get('weeks')
+    else:
+        raise CurriculumFormatError("Curriculum must be a JSON object or array")
+
+    if not isinstance(weeks, list):
+        raise CurriculumFormatError("Curriculum has no weeks")
+    weeks = [week for week in weeks if isinstance(week, dict)]
+    if not weeks:
+        raise CurriculumFormatError("Curriculum has no weeks")
+
+    document['weeks'] = [normalize_week(week, i) for i, week in enumerate(weeks)]
+    return document
+
+
+def _looks_like_curriculum(value):
+    if isinstance(value, dict):
+        return isinstance(value.get('weeks'), list)
+    return isinstance(value, list) and any(isinstance(item, dict) for item in value)
+
+
+def _loads_lenient(text):
+    """json.loads, retrying once with trailing commas removed"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(_TRAILING_COMMA.sub(r'\1', text))
+
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+class CurriculumParser:
+    """Incremental parser: feed() chunks as they arrive, then call result()"""
+
+    def __init__(self, emit_weeks=True):
+        self.text = ''
+        self.emit_weeks = emit_weeks
+        self.weeks_emitted = 0
+        self._pos = 0
+        self._value = None
+        self.complete = False
+        self._reset_root()
+
+    def _reset_root(self):
+        self._root_start = None
+        self._stack = []  # Open containers, '{' or '['
+        self._in_string = False
+        self._string_start = None
+        self._escaped = -1  # Index of a character escaped by a backslash
+        self._last_key = None
+        self._weeks_depth = None  # Stack depth inside the weeks array
+        self._week_start = None
+        self._safe_end = None  # Just past the last complete nested value
+        self._safe_stack = ()
+
+    def feed(self, chunk):
+        """Consume the next chunk of text and return any weeks it completed"""
+        self.text += chunk
+        weeks = []
+        if self.complete:
+            return weeks
+
+        text = self.text
+        stack = self._stack
+        for match in _TOKEN.finditer(text, self._pos):
+            i = match.start()
+            ch = text[i]
+
+            if self._in_string:
+                if i == self._escaped:
+                    continue
+                if ch == '\\':
+                    self._escaped = i + 1
+                elif ch == '"':
+                    self._in_string = False
+                    if len(stack) == 1 and stack[0] == '{':
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                # Quotes in prose outside the JSON value are ignored
+                if stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif ch in '[{':
+                if not stack:
+                    self._root_start = i
+                    if ch == '[':
+                        self._weeks_depth = 1
+                elif ch == '[' and self._weeks_depth is None and len(stack) == 1 and self._last_key == 'weeks':
+                    self._weeks_depth = 2
+                elif ch == '{' and self.emit_weeks and len(stack) == self._weeks_depth and stack[-1] == '[':
+                    self._week_start = i
+                stack.append(ch)
+            elif ch in ']}':
+                if not stack:
+                    continue
+                if _CLOSERS[stack[-1]] != ch:
+                    # Mismatched brackets: this was not JSON, look for the next value
+                    self._reset_root()
+                    stack = self._stack
+                    continue
+                stack.pop()
+
+                if self._week_start is not None and len(stack) == self._weeks_depth:
+                    try:
+                        weeks.append(normalize_week(_loads_lenient(text[self._week_start:i + 1]), self.weeks_emitted))
+                        self.weeks_emitted += 1
+                    except json.JSONDecodeError:
+                        pass
+                    self._week_start = None
+
+                if stack:
+                    self._safe_end = i + 1
+                    self._safe_stack = tuple(stack)
+                    continue
+
+                # The outermost value closed; accept it if it is a curriculum
+                try:
+                    value = _loads_lenient(text[self._root_start:i + 1])
+                except json.JSONDecodeError:
+                    value = None
+                if _looks_like_curriculum(value):
+                    self._value = value
+                    self.complete = True
+                    self._pos = i + 1
+                    return weeks
+                self._reset_root()
+                stack = self._stack
+
+        self._pos = len(text)
+        return weeks
+
+    def result(self):
+        """The normalized curriculum, repairing truncated output if needed"""
+        value = self._value if self.complete else self._repair()
+        if value is None:
+            raise CurriculumFormatError("No curriculum JSON found in response")
+        return validate_curriculum(value)
+
+    def _repair(self):
+        if self._root_start is None or self._safe_end is None:
+            return None
+        # Cut back to the last complete nested value and close everything still open
+        closers = ''.join(_CLOSERS[opener] for opener in reversed(self._safe_stack))
+        try:
+            value = _loads_lenient(self.text[self._root_start:self._safe_end] + closers)
+        except json.JSONDecodeError:
+            return None
+        return value if _looks_like_curriculum(value) else None
+
+
+def parse_curriculum(text):
+    """(document, complete) for an LLM response; complete is False when truncated output had to be repaired"""
+    # Fast path: a well-formed value at the first bracket, decoded in C
+    match = _VALUE_START.search(text)
+    if match:
+        try:
+            value, _ = _DECODER.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            value = None
+        if _looks_like_curriculum(value):
+            return validate_curriculum(value), True
+
+    # Prose brackets, trailing commas or truncation: scan and repair
+    parser = CurriculumParser(emit_weeks=False)
+    parser.feed(text)
+    return parser.result(), parser.complete
+
+
+def extract_curriculum(text):
+    """Parse a complete LLM response into a normalized curriculum document"""
+    return parse_curriculum(text)[0]
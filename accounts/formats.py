@@ -0,0 +1,109 @@
+"""
+Lightweight curriculum export formats, the cheap alternatives to the PDF.
+
+Each serializer takes the curriculum and the document built by
+pdf.curriculum_document (normalized weeks plus the completion set) and
+yields text chunks, which the download_curriculum view streams.
+
+    @register('markdown', 'text/markdown; charset=utf-8', 'md')
+    def to_markdown(curriculum, document):
+        yield ...
+"""
+import json
+from collections import namedtuple
+from datetime import timedelta
+
+from django.utils import timezone
+
+ExportFormat = namedtuple('ExportFormat', ['name', 'content_type', 'extension', 'serialize'])
+
+EXPORT_FORMATS = {}
+
+
+def register(name, content_type, extension):
+    """Add a serializer to EXPORT_FORMATS under name"""
+    def decorator(serialize):
+        EXPORT_FORMATS[name] = ExportFormat(name, content_type, extension, serialize)
+        return serialize
+    return decorator
+
+
+@register('markdown', 'text/markdown; charset=utf-8', 'md')
+def to_markdown(curriculum, document):
+    yield (
+        f"# {document['topic']} Curriculum\n\n"
+        f"- **Duration:** {document['duration']}\n"
+        f"- **Difficulty:** {document['difficulty'].title()}\n"
+        f"- **Progress:** {document['progress_percentage']:.1f}% completed\n"
+    )
+    for week in document['weeks']:
+        parts = [f"\n## Week {week['week_number']}: {week['title']}\n\n{week['description']}\n"]
+        if week['videos']:
+            parts.append("\n### Videos\n\n" + ''.join(f"- {video}\n" for video in week['videos']))
+        if week['tasks']:
+            parts.append("\n### Tasks\n\n" + ''.join(
+                f"- [{'x' if completed else ' '}] {task}\n" for task, completed in week['tasks']
+            ))
+        yield ''.join(parts)
+
+
+@register('json', 'application/json', 'json')
+def to_json(curriculum, document):
+    header = {key: value for key, value in document.items() if key != 'weeks'}
+    header['id'] = curriculum.id
+    # Written week by week rather than dumping the whole document at once
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "weeks": ['
+    for i, week in enumerate(document['weeks']):
+        week = dict(week, tasks=[{'task': task, 'completed': completed} for task, completed in week['tasks']])
+        yield (', ' if i else '') + json.dumps(week, ensure_ascii=False)
+    yield ']}\n'
+
+
+def _ics_text(value):
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets and end it with CRLF"""
+    data = line.encode('utf-8')
+    chunks = []
+    while len(data) > 75:
+        cut = 75 if not chunks else 74
+        # Do not split a multi-byte character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(data[:cut])
+        data = data[cut:]
+    chunks.append(data)
+    return b'\r\n '.join(chunks).decode('utf-8') + '\r\n'
+
+
+@register('ics', 'text/calendar; charset=utf-8', 'ics')
+def to_ical(curriculum, document):
+    """One all-day event per week, back to back from the day the curriculum was created"""
+    start = timezone.localdate(curriculum.created_at) if curriculum.created_at else timezone.localdate()
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_ics_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//AI Curriculum//Curriculum Export//EN',
+        'CALSCALE:GREGORIAN',
+        f"X-WR-CALNAME:{_ics_text(document['topic'])} Curriculum",
+    ))
+    for index, week in enumerate(document['weeks']):
+        week_start = start + timedelta(weeks=index)
+        tasks = '\n'.join(f"{'[x]' if completed else '[ ]'} {task}" for task, completed in week['tasks'])
+        summary = f"Week {week['week_number']}: {week['title']}"
+        description = f"{week['description']}\n\n{tasks}" if tasks else week['description']
+        yield ''.join(_ics_line(line) for line in (
+            'BEGIN:VEVENT',
+            f"UID:curriculum-{curriculum.id}-week-{week['week_number']}@ai-curriculum",
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;VALUE=DATE:{week_start:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{week_start + timedelta(weeks=1):%Y%m%d}',
+            f'SUMMARY:{_ics_text(summary)}',
+            f'DESCRIPTION:{_ics_text(description)}',
+            'END:VEVENT',
+        ))
+    yield _ics_line('END:VCALENDAR')
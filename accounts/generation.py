@@ -0,0 +1,867 @@
+"""
+Curriculum generation pipeline shared by the web views and background workers:
+prompt construction, response parsing, the generation cache and persistence.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import llm, metrics, throttling
+from .links import validate_curriculum_links
+from .progress import get_progress_store, progress_buffer
+from .extraction import CurriculumFormatError, CurriculumParser, parse_curriculum, validate_curriculum
+from .models import (
+    Curriculum, CurriculumWeek, GenerationCacheEntry, GenerationLease, build_structure, content_weeks
+)
+
+# Bump whenever the prompt changes so stale cached curricula are not served
+PROMPT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def build_curriculum_prompt(topic, duration, difficulty):
+    """Build the Gemini prompt for a full curriculum"""
+    return f"""
+Create a detailed {duration} curriculum for learning {topic} at {difficulty} level.
+
+Format as JSON with this structure:
+{{
+    "weeks": [
+        {{
+            "week": 1,
+            "title": "Week title",
+            "description": "What will be covered",
+            "tasks": [
+                {{
+                    "task": "Specific learning task",
+                    "resources": ["Resource 1", "Resource 2"],
+                    "videos": ["Video URL or search term"]
+                }}
+            ]
+        }}
+    ]
+}}
+
+Make it practical and hands-on with real-world applications.
+Include 3-4 tasks per week.
+Focus on {topic} fundamentals and practical skills.
+Return only valid JSON, no extra text.
+"""
+
+
+def build_extension_prompt(topic, difficulty, week_titles, first_week, last_week, replace=False):
+    """Build the prompt for weeks first_week..last_week given only the other weeks' titles"""
+    outline = "\n".join(f"Week {number}: {title}" for number, title in week_titles) or "(none yet)"
+    if replace:
+        request = f"Rewrite week {first_week} with fresh content that fits between the surrounding weeks."
+    else:
+        request = f"Continue the curriculum with weeks {first_week} to {last_week}, building on the existing weeks."
+    return f"""
+You are extending an existing curriculum for learning {topic} at {difficulty} level.
+
+The existing weeks are:
+{outline}
+
+{request}
+Do not repeat the existing weeks.
+
+Format as JSON with this structure, containing only the requested weeks:
+{{
+    "weeks": [
+        {{
+            "week": {first_week},
+            "title": "Week title",
+            "description": "What will be covered",
+            "tasks": [
+                {{
+                    "task": "Specific learning task",
+                    "resources": ["Resource 1", "Resource 2"],
+                    "videos": ["Video URL or search term"]
+                }}
+            ]
+        }}
+    ]
+}}
+
+Make it practical and hands-on with real-world applications.
+Include 3-4 tasks per week.
+Return only valid JSON, no extra text.
+"""
+
+
+def build_outline_prompt(topic, duration, difficulty):
+    """Build the prompt for a titles-only outline of a long curriculum"""
+    return f"""
+Plan a {duration}-week curriculum for learning {topic} at {difficulty} level.
+
+Give only a one-line title for each of the {duration} weeks, in order, as JSON:
+{{
+    "weeks": [
+        {{"week": 1, "title": "Week title"}}
+    ]
+}}
+
+Return only valid JSON, no extra text.
+"""
+
+
+def build_chunk_prompt(topic, difficulty, outline, first_week, last_week):
+    """Build the prompt for weeks first_week..last_week of a planned outline"""
+    plan = "\n".join(f"Week {number}: {title}" for number, title in outline)
+    return f"""
+You are writing part of a {len(outline)}-week curriculum for learning {topic} at {difficulty} level.
+
+The full plan is:
+{plan}
+
+Write weeks {first_week} to {last_week} only, following the plan.
+
+Format as JSON with this structure:
+{{
+    "weeks": [
+        {{
+            "week": {first_week},
+            "title": "Week title",
+            "description": "What will be covered",
+            "tasks": [
+                {{
+                    "task": "Specific learning task",
+                    "resources": ["Resource 1", "Resource 2"],
+                    "videos": ["Video URL or search term"]
+                }}
+            ]
+        }}
+    ]
+}}
+
+Make it practical and hands-on with real-world applications.
+Include 3-4 tasks per week.
+Return only valid JSON, no extra text.
+"""
+
+
+def _normalize(value):
+    """Lowercase and collapse whitespace so trivially different inputs share a key"""
+    return ' '.join(str(value or '').split()).lower()
+
+
+def generation_cache_key(topic, duration, difficulty, goal):
+    """Stable cache key for a generation request"""
+    parts = {
+        'topic': _normalize(topic),
+        'duration': int(duration),
+        'difficulty': _normalize(difficulty),
+        'goal': _normalize(goal),
+        'prompt_version': PROMPT_VERSION,
+    }
+    payload = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """Two-tier cache: an in-process LRU with TTL in front of GenerationCacheEntry rows"""
+
+    def __init__(self):
+        self._entries = OrderedDict()  # key -> (expires_at timestamp, content)
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CURRICULUM_CACHE_TTL', 60 * 60 * 24)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'CURRICULUM_CACHE_MAX_ENTRIES', 256)
+
+    def get(self, key, record_stats=True):
+        """Return a copy of the cached curriculum for key, or None on a miss"""
+        content = self._memory_get(key, record_stats)
+        if content is not None:
+            return copy.deepcopy(content)
+
+        entry = GenerationCacheEntry.objects.filter(
+            cache_key=key,
+            expires_at__gt=timezone.now()
+        ).first()
+        if entry is None:
+            if record_stats:
+                with self._lock:
+                    self._stats['misses'] += 1
+            return None
+
+        if record_stats:
+            GenerationCacheEntry.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1)
+            with self._lock:
+                self._stats['db_hits'] += 1
+        self._memory_set(key, entry.content, entry.expires_at.timestamp())
+        return copy.deepcopy(entry.content)
+
+    def set(self, key, content, topic=''):
+        """Store a freshly generated curriculum in both tiers"""
+        expires_at = timezone.now() + timezone.timedelta(seconds=self.ttl)
+
+        # Opportunistically drop expired rows so the table stays bounded
+        GenerationCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        GenerationCacheEntry.objects.update_or_create(
+            cache_key=key,
+            defaults={
+                'topic': topic[:200],
+                'prompt_version': PROMPT_VERSION,
+                'content': content,
+                'expires_at': expires_at,
+            }
+        )
+        self._memory_set(key, copy.deepcopy(content), expires_at.timestamp())
+
+    def clear(self):
+        """Empty the in-process tier and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self):
+        """Snapshot of hit/miss/eviction counters for cache sizing"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        stats['db_entries'] = GenerationCacheEntry.objects.filter(expires_at__gt=timezone.now()).count()
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = ((stats['memory_hits'] + stats['db_hits']) / lookups) if lookups else 0.0
+        return stats
+
+    def _memory_get(self, key, record_stats=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                return None
+            self._entries.move_to_end(key)
+            if record_stats:
+                self._stats['memory_hits'] += 1
+            return content
+
+    def _memory_set(self, key, content, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+
+generation_cache = GenerationCache()
+
+
+class _Flight:
+    """One in-process leader call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical generations onto a single LLM call.
+
+    Threads in one process wait on the leader's Event. Across processes the
+    leader holds a GenerationLease row and the other processes poll the
+    generation cache until the leader's result lands there. If the leader
+    fails, its in-process followers get its exception and waiting processes
+    contend for the lease again, so one of them makes the next call. Only a
+    wait that times out falls back to the caller's own call.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'leaders': 0,
+            'followers': 0,
+            'remote_followers': 0,
+            'fallbacks': 0,
+        }
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CURRICULUM_SINGLE_FLIGHT_TIMEOUT', 60)
+
+    @property
+    def lease_ttl(self):
+        # Separate from the follower timeout: the lease must outlive the leader's whole generation
+        return max(getattr(settings, 'CURRICULUM_SINGLE_FLIGHT_LEASE_TTL', 600), self.timeout)
+
+    @property
+    def poll_interval(self):
+        return getattr(settings, 'CURRICULUM_SINGLE_FLIGHT_POLL_INTERVAL', 0.25)
+
+    def do(self, key, fn, across_processes=True):
+        """
+        Return fn() for the first caller of key; concurrent callers share its
+        result. With across_processes=False only this process's flights are
+        shared and no database is touched, for worker threads whose caller
+        holds the lease itself (see lease()).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['leaders'] += 1
+            else:
+                self._stats['followers'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                return self._fallback(fn)
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = self._lead_across_processes(key, fn) if across_processes else fn()
+            return copy.deepcopy(flight.result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def lease(self, key):
+        """Take the cross-process lease for key; returns its owner for release(), or None if another process holds it"""
+        owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        return owner if self._acquire_lease(key, owner) else None
+
+    def release(self, key, owner):
+        GenerationLease.objects.filter(cache_key=key, owner=owner[:200]).delete()
+
+    def _lead_across_processes(self, key, fn):
+        deadline = time.monotonic() + self.timeout
+        following = False
+        while time.monotonic() < deadline:
+            owner = self.lease(key)
+            if owner is not None:
+                try:
+                    return fn()
+                finally:
+                    self.release(key, owner)
+
+            # Another process is generating this key; wait for its result to be cached
+            if not following:
+                following = True
+                with self._lock:
+                    self._stats['remote_followers'] += 1
+            while time.monotonic() < deadline:
+                content = generation_cache.get(key, record_stats=False)
+                if content is not None:
+                    return content
+                if not GenerationLease.objects.filter(cache_key=key).exists():
+                    # Leader released without caching a result, i.e. it failed; contend for the lease again
+                    break
+                time.sleep(self.poll_interval)
+        return self._fallback(fn)
+
+    def _acquire_lease(self, key, owner):
+        now = timezone.now()
+        # Leases from crashed processes expire instead of blocking the key forever
+        GenerationLease.objects.filter(cache_key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                GenerationLease.objects.create(
+                    cache_key=key,
+                    owner=owner[:200],
+                    expires_at=now + timezone.timedelta(seconds=self.lease_ttl)
+                )
+            return True
+        except IntegrityError:
+            return False
+
+    def _fallback(self, fn):
+        with self._lock:
+            self._stats['fallbacks'] += 1
+        return fn()
+
+
+single_flight = SingleFlight()
+
+
+class GenerationError(Exception):
+    """Raised when the AI response cannot be turned into a curriculum"""
+
+    def __init__(self, message, raw_output=''):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+def parse_curriculum_response(ai_response):
+    """Turn raw AI output into a normalized {"weeks": [...]} document"""
+    try:
+        return _extract(ai_response)[0]
+    except CurriculumFormatError:
+        raise GenerationError("Invalid JSON from AI", raw_output=ai_response)
+
+
+def _extract(ai_response):
+    """parse_curriculum, timed and counted as the parse stage; returns (document, complete)"""
+    with metrics.stage('parse'):
+        try:
+            return parse_curriculum(ai_response)
+        except CurriculumFormatError:
+            metrics.parse_failures.inc()
+            raise
+
+
+def _llm_generate(prompt, context, kind='full'):
+    """One backend call, holding a generation slot, timed as the llm stage and counted by kind and outcome"""
+    with throttling.generation_slot(), metrics.stage('llm'):
+        try:
+            ai_response = llm.get_backend().generate(prompt, context)
+        except Exception:
+            metrics.llm_calls.inc(kind=kind, outcome='error')
+            raise
+    metrics.llm_calls.inc(kind=kind, outcome='ok')
+    metrics.llm_response_bytes.observe(len(ai_response.encode('utf-8')))
+    return ai_response
+
+
+def _cache_generated(cache_key, content, topic, complete):
+    """Cache a fresh generation unless it was repaired from a truncated response that lost weeks"""
+    if not complete:
+        logger.warning("Not caching truncated curriculum for %s (%d weeks)", topic, len(content['weeks']))
+        return
+    generation_cache.set(cache_key, content, topic=topic)
+
+
+def _is_complete(content, parsed_complete, duration):
+    """Whether a parsed response can be cached: not repaired, or repaired without losing weeks"""
+    return parsed_complete or len(content['weeks']) >= int(duration)
+
+
+def _call_llm(topic, duration, difficulty):
+    """Uncached LLM generation parsed into (curriculum, complete); touches no database"""
+    if int(duration) > getattr(settings, 'CURRICULUM_CHUNK_THRESHOLD', 8):
+        # Chunks that come back short are asked for again, so the result is always complete
+        return _call_llm_chunked(topic, int(duration), difficulty), True
+
+    context = {'topic': topic, 'duration': duration, 'difficulty': difficulty}
+    ai_response = _llm_generate(build_curriculum_prompt(topic, duration, difficulty), context)
+
+    logger.debug("AI raw output: %s", ai_response)
+
+    try:
+        content, complete = _extract(ai_response)
+    except CurriculumFormatError:
+        raise GenerationError("Invalid JSON from AI", raw_output=ai_response)
+    return content, _is_complete(content, complete, duration)
+
+
+def _generate_outline(topic, duration, difficulty):
+    """[(week_number, title)] for every week, padded if the outline comes back short"""
+    context = {'topic': topic, 'duration': duration, 'difficulty': difficulty, 'outline': True}
+    ai_response = _llm_generate(build_outline_prompt(topic, duration, difficulty), context, kind='outline')
+    try:
+        titles = [week['title'] for week in _extract(ai_response)[0]['weeks']]
+    except CurriculumFormatError:
+        titles = []  # The chunks can still be written without a plan
+    return [(number, titles[number - 1] if number <= len(titles) else f'Week {number}')
+            for number in range(1, duration + 1)]
+
+
+def _generate_chunk(topic, difficulty, outline, first_week, last_week):
+    """Weeks first_week..last_week; weeks lost to truncation are asked for again"""
+    weeks = []
+    for attempt in range(getattr(settings, 'CURRICULUM_CHUNK_ATTEMPTS', 3)):
+        start = first_week + len(weeks)
+        if start > last_week:
+            break
+        if attempt:
+            metrics.retries.inc()
+        context = {'topic': topic, 'difficulty': difficulty, 'first_week': start, 'last_week': last_week}
+        ai_response = _llm_generate(build_chunk_prompt(topic, difficulty, outline, start, last_week), context, kind='chunk')
+        try:
+            document, complete = _extract(ai_response)
+        except CurriculumFormatError:
+            continue
+        received = document['weeks']
+        if not complete and len(received) <= last_week - start + 1:
+            # The response was cut off inside the last week, so it is missing tasks; ask for it again
+            received = received[:-1]
+        weeks += received[:last_week - start + 1]
+
+    if len(weeks) < last_week - first_week + 1:
+        raise GenerationError(f"Could not generate weeks {first_week + len(weeks)}-{last_week}")
+    for offset, week in enumerate(weeks):
+        week['week'] = first_week + offset
+    return weeks
+
+
+def _call_llm_chunked(topic, duration, difficulty):
+    """
+    Long curricula: a titles-only outline first, then blocks of
+    CURRICULUM_CHUNK_WEEKS weeks generated in parallel, so no single
+    response is large enough to hit the output-token limit.
+    """
+    outline = _generate_outline(topic, duration, difficulty)
+    size = getattr(settings, 'CURRICULUM_CHUNK_WEEKS', 4)
+    ranges = [(first, min(first + size - 1, duration)) for first in range(1, duration + 1, size)]
+
+    max_workers = min(getattr(settings, 'CURRICULUM_CHUNK_CONCURRENCY', 6), len(ranges))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        chunks = pool.map(lambda r: _generate_chunk(topic, difficulty, outline, *r), ranges)
+        weeks = [week for chunk in chunks for week in chunk]
+
+    return validate_curriculum({'weeks': weeks})
+
+
+def generate_curriculum_content(topic, duration, difficulty, goal):
+    """Return (content, cached) for a request, calling Gemini only on a cache miss"""
+    cache_key = generation_cache_key(topic, duration, difficulty, goal)
+    content = generation_cache.get(cache_key)
+    if content is not None:
+        metrics.generations.inc(result='cached')
+        return content, True
+    return _generate_shared(cache_key, topic, duration, difficulty), False
+
+
+def _generate_shared(cache_key, topic, duration, difficulty):
+    """Generate a cache miss through single_flight, counted in the generations metric"""
+    def generate():
+        # A follower that falls back or takes over the lease may find a leader's result after all
+        content = generation_cache.get(cache_key, record_stats=False)
+        if content is not None:
+            return content
+
+        content, complete = _call_llm(topic, duration, difficulty)
+        _cache_generated(cache_key, content, topic, complete)
+        return content
+
+    if getattr(settings, 'CURRICULUM_SINGLE_FLIGHT', True):
+        return _counted(single_flight.do, cache_key, generate)
+    return _counted(generate)
+
+
+def _counted(fn, *args, **kwargs):
+    """fn(*args, **kwargs), counted as a generated or failed generation"""
+    try:
+        content = fn(*args, **kwargs)
+    except Exception:
+        metrics.generations.inc(result='failed')
+        raise
+    metrics.generations.inc(result='generated')
+    return content
+
+
+def _generate_bulk_item(cache_key, topic, duration, difficulty, completeness):
+    """
+    One bulk cache miss on a pool thread. The caller holds the cross-process
+    lease, so only this process's flights are shared and no database is
+    touched; completeness[cache_key] is set when this call reached the LLM.
+    """
+    def generate():
+        content, completeness[cache_key] = _call_llm(topic, duration, difficulty)
+        return content
+
+    if getattr(settings, 'CURRICULUM_SINGLE_FLIGHT', True):
+        return _counted(single_flight.do, cache_key, generate, across_processes=False)
+    return _counted(generate)
+
+
+def save_curriculum(user, topic, difficulty, duration, content):
+    """Persist a generated curriculum and initialize its progress counters"""
+    with metrics.stage('persist'):
+        curriculum = Curriculum.objects.create(
+            user=user,
+            topic=topic,
+            difficulty=difficulty,
+            duration=duration,
+            content=content
+        )
+        curriculum.rebuild_structure()
+
+    # Initialize progress tracking (should be 0% initially)
+    with metrics.stage('progress'):
+        curriculum.update_progress()
+    validate_curriculum_links(content)
+    return curriculum
+
+
+def _bulk_spec(raw):
+    """Validate one item of a bulk request into (topic, duration, difficulty, goal)"""
+    if not isinstance(raw, dict) or not raw.get('topic'):
+        raise ValueError("topic is required")
+    try:
+        duration = int(raw.get('duration'))
+    except (TypeError, ValueError):
+        raise ValueError("duration must be a number of weeks")
+    return raw['topic'], duration, raw.get('difficulty', 'beginner'), raw.get('goal') or "Learn the topic thoroughly"
+
+
+def generate_curricula_bulk(user, specs):
+    """
+    Generate and save a curriculum per spec, calling the LLM for up to
+    CURRICULUM_BULK_CONCURRENCY specs at once. Returns one result dict per
+    spec, in order, each with success and either curriculum_id or error.
+    """
+    results = [None] * len(specs)
+    contents = {}  # spec index -> (content, cached)
+    misses = {}  # cache key -> (spec, [spec indexes])
+
+    for i, raw in enumerate(specs):
+        try:
+            spec = _bulk_spec(raw)
+        except ValueError as e:
+            results[i] = {'success': False, 'error': str(e)}
+            continue
+        cache_key = generation_cache_key(*spec)
+        content = generation_cache.get(cache_key)
+        if content is not None:
+            metrics.generations.inc(result='cached')
+            contents[i] = (content, True)
+        else:
+            # Identical specs in one batch share a single LLM call
+            misses.setdefault(cache_key, (spec, []))[1].append(i)
+
+    def finish(cache_key, generate):
+        spec, indexes = misses[cache_key]
+        try:
+            content = generate()
+        except Exception as e:
+            for i in indexes:
+                results[i] = {'success': False, 'error': str(e)}
+            return
+        # Identical specs in the batch are counted like single-flight followers
+        metrics.generations.inc(len(indexes) - 1, result='generated')
+        for i in indexes:
+            contents[i] = (copy.deepcopy(content), False)
+
+    # Database work (leases, the cache) stays on this thread; pool threads only call the LLM
+    leases, remote = {}, []
+    if getattr(settings, 'CURRICULUM_SINGLE_FLIGHT', True):
+        for cache_key in misses:
+            owner = single_flight.lease(cache_key)
+            if owner is None:
+                remote.append(cache_key)  # Another process is generating it
+            else:
+                leases[cache_key] = owner
+
+    local = [cache_key for cache_key in misses if cache_key not in remote]
+    if local:
+        completeness = {}
+        max_workers = min(getattr(settings, 'CURRICULUM_BULK_CONCURRENCY', 4), len(local))
+        try:
+            with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+                futures = {
+                    pool.submit(_generate_bulk_item, cache_key, *misses[cache_key][0][:3], completeness): cache_key
+                    for cache_key in local
+                }
+                for future in as_completed(futures):
+                    cache_key = futures[future]
+                    if cache_key in completeness:
+                        # Cached before the lease is released, so other processes waiting on it find the result
+                        _cache_generated(cache_key, future.result(), misses[cache_key][0][0], completeness[cache_key])
+                    finish(cache_key, future.result)
+        finally:
+            for cache_key, owner in leases.items():
+                single_flight.release(cache_key, owner)
+
+    for cache_key in remote:
+        topic, duration, difficulty, _ = misses[cache_key][0]
+        finish(cache_key, lambda: _generate_shared(cache_key, topic, duration, difficulty))
+
+    curricula = []
+    for i, (content, _) in sorted(contents.items()):
+        topic, duration, difficulty, goal = _bulk_spec(specs[i])
+        total_tasks = sum(len(week.get('tasks') or []) for week in content_weeks(content) if isinstance(week, dict))
+        curricula.append(Curriculum(
+            user=user,
+            topic=topic,
+            difficulty=difficulty,
+            duration=duration,
+            content=content,
+            total_tasks=total_tasks
+        ))
+
+    with transaction.atomic():
+        Curriculum.objects.bulk_create(curricula)
+        build_structure(curricula)
+        for curriculum in curricula:
+            validate_curriculum_links(curriculum.content)
+
+    for (i, (_, cached)), curriculum in zip(sorted(contents.items()), curricula):
+        results[i] = {'success': True, 'curriculum_id': curriculum.id, 'topic': curriculum.topic, 'cached': cached}
+    return results
+
+
+def _generate_weeks(curriculum, first_week, last_week, replace=False):
+    """Ask the LLM for just weeks first_week..last_week of an existing curriculum"""
+    week_titles = [
+        (week.week_number, week.title)
+        for week in CurriculumWeek.objects.filter(curriculum=curriculum).only('week_number', 'title')
+        if not (replace and week.week_number == first_week)
+    ]
+    prompt = build_extension_prompt(curriculum.topic, curriculum.difficulty, week_titles, first_week, last_week, replace)
+    context = {
+        'topic': curriculum.topic,
+        'difficulty': curriculum.difficulty,
+        'first_week': first_week,
+        'last_week': last_week,
+    }
+    ai_response = _llm_generate(prompt, context, kind='extend')
+    weeks = parse_curriculum_response(ai_response)['weeks']
+
+    expected = last_week - first_week + 1
+    if len(weeks) < expected:
+        raise GenerationError(f"Expected {expected} weeks, got {len(weeks)}", raw_output=ai_response)
+    # Number the weeks ourselves so progress keys line up whatever the model wrote
+    weeks = weeks[:expected]
+    for offset, week in enumerate(weeks):
+        week['week'] = first_week + offset
+    return weeks
+
+
+def extend_curriculum(curriculum, extra_weeks):
+    """
+    Append extra_weeks new weeks, generating only those. Existing weeks,
+    their rows and their UserProgress are left untouched.
+    """
+    weeks = content_weeks(curriculum.content)
+    first_week = max((week.get('week', 0) for week in weeks if isinstance(week, dict)), default=0) + 1
+    new_weeks = _generate_weeks(curriculum, first_week, first_week + extra_weeks - 1)
+
+    with transaction.atomic():
+        start = len(weeks)
+        curriculum.content = {'weeks': weeks + new_weeks}
+        curriculum.duration = len(weeks) + len(new_weeks)
+        curriculum.content_version += 1
+        curriculum.save(update_fields=['content', 'duration', 'content_version'])
+        build_structure([curriculum], positions=set(range(start, start + len(new_weeks))))
+        curriculum.update_progress()
+    validate_curriculum_links({'weeks': new_weeks})
+    return new_weeks
+
+
+def regenerate_week(curriculum, week_number):
+    """Replace one week with freshly generated content; only that week's progress is reset"""
+    weeks = content_weeks(curriculum.content)
+    positions = [i for i, week in enumerate(weeks) if isinstance(week, dict) and week.get('week') == week_number]
+    if not positions:
+        raise ValueError(f"Week {week_number} not found")
+    new_week = _generate_weeks(curriculum, week_number, week_number, replace=True)[0]
+
+    with transaction.atomic():
+        weeks = list(weeks)
+        weeks[positions[0]] = new_week
+        curriculum.content = {'weeks': weeks}
+        curriculum.content_version += 1
+        curriculum.save(update_fields=['content', 'content_version'])
+        CurriculumWeek.objects.filter(curriculum=curriculum, position=positions[0]).delete()
+        build_structure([curriculum], positions={positions[0]})
+        # The old tasks are gone, so completions recorded against them no longer apply
+        get_progress_store().clear_week(curriculum.user, curriculum, week_number)
+        progress_buffer.discard(curriculum, week_number)
+        curriculum.update_progress()
+    validate_curriculum_links({'weeks': [new_week]})
+    return new_week
+
+
+async def stream_curriculum(user, topic, duration, difficulty, goal):
+    """Async generator of ('week', week) events followed by ('done', result) or ('error', result)"""
+    cache_key = generation_cache_key(topic, duration, difficulty, goal)
+    content = await sync_to_async(generation_cache.get)(cache_key)
+    cached = content is not None
+
+    if not cached and int(duration) > getattr(settings, 'CURRICULUM_CHUNK_THRESHOLD', 8):
+        # Long curricula are generated in parallel chunks; send the weeks once all are in
+        try:
+            content = await sync_to_async(_call_llm_chunked, thread_sensitive=False)(topic, int(duration), difficulty)
+        except GenerationError as e:
+            yield 'error', {'error': str(e), 'raw_output': e.raw_output}
+            return
+        await sync_to_async(_cache_generated)(cache_key, content, topic, True)
+        for week in content['weeks']:
+            yield 'week', week
+    elif not cached:
+        # LLM calls run off the main sync thread so they never block other views
+        prompt = build_curriculum_prompt(topic, duration, difficulty)
+        context = {'topic': topic, 'duration': duration, 'difficulty': difficulty}
+        parser = CurriculumParser()
+
+        # The slot is held until the stream is consumed, or the client goes away
+        slot = throttling.generation_slot()
+        await sync_to_async(slot.__enter__, thread_sensitive=False)()
+        try:
+            chunks = llm.get_backend().stream(prompt, context)
+            # Incremental parsing is interleaved with the stream, so it counts as llm time
+            started = time.perf_counter()
+            while True:
+                chunk = await sync_to_async(next, thread_sensitive=False)(chunks, None)
+                if chunk is None:
+                    break
+                for week in parser.feed(chunk):
+                    yield 'week', week
+        finally:
+            await sync_to_async(slot.__exit__, thread_sensitive=False)(None, None, None)
+        metrics.stage_seconds.observe(time.perf_counter() - started, stage='llm')
+        metrics.llm_calls.inc(kind='stream', outcome='ok')
+        metrics.llm_response_bytes.observe(len(parser.text.encode('utf-8')))
+
+        try:
+            with metrics.stage('parse'):
+                content = parser.result()
+        except CurriculumFormatError:
+            metrics.parse_failures.inc()
+            yield 'error', {'error': "Invalid JSON from AI", 'raw_output': parser.text}
+            return
+
+        complete = _is_complete(content, parser.complete, duration)
+        await sync_to_async(_cache_generated)(cache_key, content, topic, complete)
+        # The final document is authoritative; send anything the parser could not split out
+        for week in content['weeks'][parser.weeks_emitted:]:
+            yield 'week', week
+    else:
+        for week in content.get('weeks', []):
+            yield 'week', week
+
+    curriculum = await sync_to_async(save_curriculum)(user, topic, difficulty, duration, content)
+    yield 'done', {'curriculum_id': curriculum.id, 'cached': cached}
@@ -0,0 +1,66 @@
+"""
+Background curriculum generation: queueing, claiming and running GenerationJob rows.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .generation import generate_curriculum_content, save_curriculum
+from .models import GenerationJob
+from .throttling import GenerationBusy
+
+
+def enqueue_generation_job(user, topic, duration, difficulty, goal):
+    """Queue a generation request for run_generation_workers"""
+    return GenerationJob.objects.create(
+        user=user,
+        topic=topic,
+        duration=duration,
+        difficulty=difficulty,
+        goal=goal
+    )
+
+
+def expire_stale_jobs():
+    """Fail running jobs older than GENERATION_JOB_LEASE seconds, whose worker must have died"""
+    now = timezone.now()
+    cutoff = now - timezone.timedelta(seconds=getattr(settings, 'GENERATION_JOB_LEASE', 600))
+    return GenerationJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='failed',
+        error='The generation worker stopped before finishing; please try again',
+        finished_at=now
+    )
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to running; None if the queue is empty"""
+    expire_stale_jobs()
+    for job_id in GenerationJob.objects.filter(status='pending').values_list('id', flat=True)[:10]:
+        # The conditional update only succeeds for one worker per job
+        claimed = GenerationJob.objects.filter(id=job_id, status='pending').update(
+            status='running',
+            started_at=timezone.now()
+        )
+        if claimed:
+            return GenerationJob.objects.get(id=job_id)
+    return None
+
+
+def run_generation_job(job):
+    """Generate and persist the curriculum for a claimed job"""
+    try:
+        content, _ = generate_curriculum_content(job.topic, job.duration, job.difficulty, job.goal)
+        job.curriculum = save_curriculum(job.user, job.topic, job.difficulty, job.duration, content)
+        job.status = 'succeeded'
+    except GenerationBusy:
+        # Every slot is taken by other callers; put the job back for a later claim
+        job.status = 'pending'
+        job.started_at = None
+        job.save(update_fields=['status', 'started_at'])
+        return job
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save()
+    return job
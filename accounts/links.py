@@ -0,0 +1,245 @@
+"""
+Resource and video link validation.
+
+LinkValidator checks URLs on a thread pool sharing one pooled HTTP session,
+with at most LINK_CHECK_PER_HOST requests in flight per host. Results are
+cached in LinkCheck rows for LINK_CHECK_TTL seconds; expired rows are still
+served while a background thread revalidates them. Validation runs as a
+pipeline stage after a curriculum is saved, so it never delays a response.
+
+URLs come from LLM output that users can steer, so every request and every
+redirect hop is refused unless the host resolves only to global addresses
+(or is listed in LINK_CHECK_ALLOWED_HOSTS).
+"""
+import hashlib
+import ipaddress
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import LinkCheck, content_weeks
+
+# Hosts that block HEAD requests from servers but are known to be valid
+TRUSTED_HOSTS = ['youtube.com', 'youtu.be', 'vimeo.com', 'mit.edu', 'harvard.edu']
+
+MAX_REDIRECTS = 5
+
+
+class BlockedURLError(Exception):
+    """Raised for a URL whose host is not a public address"""
+
+
+def is_trusted_host(host):
+    """host is a trusted domain or a subdomain of one; 'mit.edu.attacker.com' is not"""
+    return any(host == trusted or host.endswith('.' + trusted) for trusted in TRUSTED_HOSTS)
+
+
+def is_public_url(url):
+    """True if url is http(s) and its host resolves only to global IP addresses"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if parsed.scheme not in ('http', 'https') or not host:
+        return False
+    if host in getattr(settings, 'LINK_CHECK_ALLOWED_HOSTS', []):
+        return True
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        addresses = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError, ValueError):
+        return False
+    # Loopback, private, link-local (cloud metadata) and reserved ranges are all non-global
+    return bool(addresses) and all(
+        ipaddress.ip_address(address[4][0].split('%')[0]).is_global for address in addresses
+    )
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def curriculum_urls(content):
+    """Every distinct http(s) URL in a curriculum's week and task resources/videos"""
+    urls = []
+    for week in content_weeks(content):
+        if not isinstance(week, dict):
+            continue
+        candidates = list(week.get('videos') or [])
+        for task in week.get('tasks') or []:
+            if isinstance(task, dict):
+                candidates += list(task.get('resources') or []) + list(task.get('videos') or [])
+        urls += [url for url in candidates if isinstance(url, str) and urlparse(url).scheme in ('http', 'https')]
+    return list(dict.fromkeys(urls))
+
+
+class LinkValidator:
+    """Concurrent, cached URL reachability checks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._pool = None
+        self._host_slots = {}
+        self._revalidating = set()
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'LINK_CHECK_TIMEOUT', 5)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LINK_CHECK_TTL', 60 * 60 * 24 * 7)
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                # Imported lazily like the other optional network clients
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                workers = getattr(settings, 'LINK_CHECK_WORKERS', 16)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = 'ai-curriculum-link-checker'
+                self._session = session
+            return self._session
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LINK_CHECK_WORKERS', 16),
+                    thread_name_prefix='link-check'
+                )
+            return self._pool
+
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(getattr(settings, 'LINK_CHECK_PER_HOST', 4))
+            return self._host_slots[host]
+
+    def probe(self, url):
+        """Request one URL; returns (ok, status_code, error). Touches no database"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            return False, None, 'Invalid URL'
+        if is_trusted_host(parsed.hostname.lower()):
+            return True, None, ''
+
+        session = self._get_session()
+        try:
+            with self._host_slot(parsed.netloc.lower()):
+                response = self._request(session, 'HEAD', url)
+                if response.status_code in (405, 501):
+                    # Some servers refuse HEAD; fall back to a GET without reading the body
+                    response = self._request(session, 'GET', url)
+            return response.status_code < 400, response.status_code, ''
+        except BlockedURLError:
+            return False, None, 'Blocked address'
+        except Exception as e:
+            return False, None, type(e).__name__
+
+    def _request(self, session, method, url):
+        """Follow redirects by hand so every hop gets the same address check"""
+        for _ in range(MAX_REDIRECTS + 1):
+            if not is_public_url(url):
+                raise BlockedURLError(url)
+            response = session.request(method, url, timeout=self.timeout, allow_redirects=False, stream=True)
+            response.close()
+            if not response.is_redirect:
+                return response
+            url = urljoin(url, response.headers['location'])
+        raise RuntimeError('Too many redirects')
+
+    def check(self, urls, wait=True):
+        """
+        Return {url: ok}, probing uncached URLs concurrently. Expired results
+        are returned as-is and refreshed in the background. With wait=False
+        uncached URLs map to None and are probed in the background too.
+        """
+        urls = list(dict.fromkeys(urls))
+        now = timezone.now()
+        cached = {check.url: check for check in LinkCheck.objects.filter(url_hash__in=[url_hash(url) for url in urls])}
+
+        results = {url: check.ok for url, check in cached.items()}
+        missing = [url for url in urls if url not in cached]
+        stale = [url for url, check in cached.items() if check.expires_at <= now]
+
+        if missing and wait:
+            probes = list(self._get_pool().map(self.probe, missing))
+            self._store(dict(zip(missing, probes)))
+            results.update((url, probe[0]) for url, probe in zip(missing, probes))
+        elif missing:
+            results.update((url, None) for url in missing)
+            stale += missing
+        if stale:
+            self.revalidate_in_background(stale)
+        return results
+
+    def _store(self, probes):
+        now = timezone.now()
+        expires_at = now + timezone.timedelta(seconds=self.ttl)
+        for url, (ok, status_code, error) in probes.items():
+            LinkCheck.objects.update_or_create(
+                url_hash=url_hash(url),
+                defaults={
+                    'url': url,
+                    'host': urlparse(url).netloc.lower()[:255],
+                    'ok': ok,
+                    'status_code': status_code,
+                    'error': error[:255],
+                    'checked_at': now,
+                    'expires_at': expires_at,
+                }
+            )
+
+    def refresh(self, urls):
+        """Probe urls now, ignoring the cache, and store the results"""
+        urls = list(dict.fromkeys(urls))
+        self._store(dict(zip(urls, self._get_pool().map(self.probe, urls))))
+
+    def revalidate_in_background(self, urls):
+        """Probe any of urls that are uncached or expired on a background thread"""
+        with self._lock:
+            # URLs already being refreshed by another thread are skipped
+            urls = [url for url in urls if url not in self._revalidating]
+            self._revalidating.update(urls)
+        if not urls:
+            return None
+
+        def run():
+            try:
+                fresh = set(LinkCheck.objects.filter(
+                    url_hash__in=[url_hash(url) for url in urls],
+                    expires_at__gt=timezone.now()
+                ).values_list('url', flat=True))
+                due = [url for url in urls if url not in fresh]
+                if due:
+                    self.refresh(due)
+            finally:
+                with self._lock:
+                    self._revalidating.difference_update(urls)
+                connection.close()
+
+        thread = threading.Thread(target=run, name='link-revalidate', daemon=True)
+        thread.start()
+        return thread
+
+
+link_validator = LinkValidator()
+
+
+def validate_curriculum_links(content):
+    """Pipeline stage: check a saved curriculum's links once its transaction commits"""
+    if not getattr(settings, 'CURRICULUM_VALIDATE_LINKS', True):
+        return
+    urls = curriculum_urls(content)
+    if urls:
+        transaction.on_commit(lambda: link_validator.revalidate_in_background(urls))
@@ -0,0 +1,251 @@
+"""
+LLM backends and the lazily configured, process-wide Gemini client.
+
+settings.LLM_BACKEND picks the backend class: the real Gemini API, a
+deterministic fake that writes schema-valid curricula offline, or a
+record/replay backend serving saved responses from a directory. Every
+backend accepts latency and failure injection through LLM_BACKEND_OPTIONS.
+
+Nothing here touches the network or imports the SDK until a model is
+actually needed, so importing views and running management commands
+stays fast and works offline.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+_lock = threading.Lock()
+_configured = False
+_models = {}
+_backend = None
+
+
+def _genai():
+    """Import and configure the Gemini SDK on first use"""
+    global _configured
+    import google.generativeai as genai  # Heavy (grpc/protobuf), so deferred
+
+    if not _configured:
+        with _lock:
+            if not _configured:
+                genai.configure(api_key=getattr(settings, 'GEMINI_API_KEY', None))
+                _configured = True
+    return genai
+
+
+def get_model(name=None):
+    """Return the shared GenerativeModel for name, creating it once per process"""
+    name = name or getattr(settings, 'GEMINI_MODEL', 'gemini-1.5-flash')
+    model = _models.get(name)
+    if model is None:
+        genai = _genai()
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = genai.GenerativeModel(name)
+    return model
+
+
+def reset():
+    """Forget cached models and the backend, e.g. after changing settings"""
+    global _configured, _backend
+    with _lock:
+        _models.clear()
+        _configured = False
+        _backend = None
+
+
+def list_generation_models(refresh=False):
+    """Models supporting generateContent, cached on disk for LLM_MODELS_CACHE_TTL seconds"""
+    path = settings.LLM_MODELS_CACHE_PATH
+    ttl = getattr(settings, 'LLM_MODELS_CACHE_TTL', 60 * 60 * 24)
+
+    if not refresh:
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if time.time() - cached['fetched_at'] < ttl:
+                return cached['models']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    models = []
+    for m in _genai().list_models():
+        if 'generateContent' in m.supported_generation_methods:
+            models.append({
+                'name': m.name,
+                'display_name': getattr(m, 'display_name', ''),
+                'input_token_limit': getattr(m, 'input_token_limit', None),
+                'output_token_limit': getattr(m, 'output_token_limit', None),
+                'supported_generation_methods': list(m.supported_generation_methods),
+            })
+
+    with open(path, 'w') as f:
+        json.dump({'fetched_at': time.time(), 'models': models}, f, indent=2)
+    return models
+
+
+class LLMError(Exception):
+    """Raised by a backend when a call fails (including injected failures)"""
+
+
+class LLMBackend:
+    """Base class: subclasses implement _generate and optionally _stream"""
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, failure_rate=0.0, seed=None, **options):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.options = options
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._stats_lock = threading.Lock()
+
+    def generate(self, prompt, context=None):
+        """Return the full response text for prompt"""
+        self._before_call()
+        return self._generate(prompt, context or {})
+
+    def stream(self, prompt, context=None):
+        """Yield the response text in chunks as it is produced"""
+        # A generator, so latency and the first request happen on the consumer's thread
+        self._before_call()
+        yield from self._stream(prompt, context or {})
+
+    def _generate(self, prompt, context):
+        raise NotImplementedError
+
+    def _stream(self, prompt, context):
+        # Backends without native streaming hand back the whole text at once
+        yield self._generate(prompt, context)
+
+    def _before_call(self):
+        with self._stats_lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise LLMError(f"Injected failure from {type(self).__name__}")
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the shared GenerativeModel"""
+
+    def __init__(self, model=None, **options):
+        super().__init__(**options)
+        self.model_name = model or getattr(settings, 'GEMINI_MODEL', 'gemini-1.5-flash')
+
+    def _generate(self, prompt, context):
+        return get_model(self.model_name).generate_content(prompt).text
+
+    def _stream(self, prompt, context):
+        for chunk in get_model(self.model_name).generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic, schema-valid curricula for any topic and duration, no network"""
+
+    FOCUS_AREAS = [
+        'Foundations', 'Core Concepts', 'Tooling', 'Hands-on Practice', 'Data Handling',
+        'Testing', 'Design Patterns', 'Performance', 'Real-world Project', 'Review',
+    ]
+
+    def __init__(self, chunk_size=64, **options):
+        super().__init__(**options)
+        self.chunk_size = chunk_size
+
+    def _generate(self, prompt, context):
+        weeks = self.build_weeks(context)
+        if context.get('outline'):
+            weeks = [{'week': week['week'], 'title': week['title']} for week in weeks]
+        return json.dumps({'weeks': weeks})
+
+    def _stream(self, prompt, context):
+        text = self._generate(prompt, context)
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i:i + self.chunk_size]
+
+    def build_weeks(self, context):
+        topic = context.get('topic') or 'General'
+        first_week = int(context.get('first_week', 1))
+        last_week = int(context.get('last_week', context.get('duration', 4)))
+        digest = hashlib.sha256(topic.lower().encode('utf-8')).digest()
+        slug = '-'.join(topic.lower().split())
+
+        weeks = []
+        for number in range(first_week, last_week + 1):
+            focus = self.FOCUS_AREAS[(digest[0] + number) % len(self.FOCUS_AREAS)]
+            task_count = 3 + digest[number % len(digest)] % 2
+            weeks.append({
+                'week': number,
+                'title': f'{topic}: {focus}',
+                'description': f'Week {number} covers {focus.lower()} for {topic}.',
+                'tasks': [
+                    {
+                        'task': f'{focus} exercise {i + 1} for {topic}',
+                        'resources': [f'https://example.com/{slug}/week-{number}/task-{i + 1}'],
+                        'videos': [f'{topic} {focus.lower()} tutorial'],
+                    }
+                    for i in range(task_count)
+                ],
+            })
+        return weeks
+
+
+class ReplayBackend(LLMBackend):
+    """Serve saved responses from a directory; with record=True, call Gemini for misses and save them"""
+
+    def __init__(self, directory=None, record=False, **options):
+        super().__init__(**options)
+        self.directory = str(directory or settings.LLM_REPLAY_DIR)
+        self.record = record
+        self._recorder = GeminiBackend(model=options.get('model')) if record else None
+
+    def path_for(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def _generate(self, prompt, context):
+        path = self.path_for(prompt)
+        try:
+            with open(path) as f:
+                return json.load(f)['response']
+        except FileNotFoundError:
+            if not self.record:
+                raise LLMError(f"No recorded response for prompt ({os.path.basename(path)})")
+
+        text = self._recorder.generate(prompt, context)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'prompt': prompt, 'response': text}, f, indent=2)
+        return text
+
+
+def get_backend():
+    """Return the process-wide backend configured by LLM_BACKEND / LLM_BACKEND_OPTIONS"""
+    global _backend
+    backend = _backend
+    if backend is None:
+        with _lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'LLM_BACKEND', 'accounts.llm.GeminiBackend'))
+                _backend = backend_class(**getattr(settings, 'LLM_BACKEND_OPTIONS', {}))
+            backend = _backend
+    return backend
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in ('LLM_BACKEND', 'LLM_BACKEND_OPTIONS', 'GEMINI_API_KEY', 'GEMINI_MODEL'):
+        reset()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from accounts.export import export_zip_chunks
+
+
+class Command(BaseCommand):
+    help = 'Export all curricula, progress and feedback as JSON Lines in a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='curricula-export.zip', help='ZIP file to write')
+        parser.add_argument('--pdfs', action='store_true', help='Also include one PDF per curriculum, reusing cached renders')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        written = 0
+        with open(options['output'], 'wb') as f:
+            for chunk in export_zip_chunks(include_pdfs=options['pdfs'], chunk_size=options['chunk_size']):
+                f.write(chunk)
+                written += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"📦 Exported to {options['output']} ({written / 1024:.0f} KB)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.llm import list_generation_models
+
+
+class Command(BaseCommand):
+    help = 'List Gemini models that support content generation (cached on disk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true', help='Ignore the disk cache and query the API')
+
+    def handle(self, *args, **options):
+        try:
+            models = list_generation_models(refresh=options['refresh'])
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Could not list models: {e}'))
+            return
+
+        self.stdout.write(f'🤖 {len(models)} models support generateContent')
+        self.stdout.write('=' * 50)
+        for model in models:
+            limits = f"in {model['input_token_limit']} / out {model['output_token_limit']} tokens"
+            self.stdout.write(f"{model['name']}  ({limits})")
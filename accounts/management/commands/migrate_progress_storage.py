@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from accounts.models import Curriculum, ProgressBitmap, UserProgress
+
+
+class Command(BaseCommand):
+    help = 'Copy task progress between UserProgress rows and per-curriculum ProgressBitmap storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['bitmap', 'rows'], required=True, help='Storage to copy progress into')
+        parser.add_argument('--delete-source', action='store_true', help='Delete the old representation afterwards')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['to'] == 'bitmap':
+            copied = self.rows_to_bitmaps(options['batch_size'], options['delete_source'])
+        else:
+            copied = self.bitmaps_to_rows(options['batch_size'], options['delete_source'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Copied progress for {copied} curricula to {options['to']} storage"))
+        self.stdout.write(f"   Set PROGRESS_STORAGE = '{options['to']}' in settings to start using it")
+
+    def rows_to_bitmaps(self, batch_size, delete_source):
+        curriculum_ids = list(Curriculum.objects.values_list('id', flat=True))
+        for start in range(0, len(curriculum_ids), batch_size):
+            batch = curriculum_ids[start:start + batch_size]
+            bitmaps = {curriculum_id: ProgressBitmap(curriculum_id=curriculum_id) for curriculum_id in batch}
+            # Only the owner's rows count towards a curriculum's progress
+            rows = UserProgress.objects.filter(curriculum_id__in=batch, user=F('curriculum__user')).order_by()
+            for row in rows.iterator(chunk_size=batch_size * 10):
+                if row.week_number < 1 or row.task_index < 0:
+                    continue
+                bitmap = bitmaps[row.curriculum_id]
+                bitmap.set(row.week_number, row.task_index, row.completed)
+                bitmap.set_times(row.week_number, row.task_index, row.completed_at, row.changed_at)
+
+            with transaction.atomic():
+                ProgressBitmap.objects.filter(curriculum_id__in=batch).delete()
+                ProgressBitmap.objects.bulk_create(bitmaps.values())
+                if delete_source:
+                    UserProgress.objects.filter(curriculum_id__in=batch).delete()
+        return len(curriculum_ids)
+
+    def bitmaps_to_rows(self, batch_size, delete_source):
+        copied = 0
+        bitmaps = ProgressBitmap.objects.select_related('curriculum').only('curriculum__user_id', 'stride', 'bits', 'times')
+        for bitmap in bitmaps.iterator(chunk_size=batch_size):
+            curriculum = bitmap.curriculum
+            completed = set(bitmap.completed_keys())
+            keys = completed | {bitmap.key_for(int(bit)) for bit in bitmap.times}
+            rows = []
+            for week_number, task_index in sorted(keys):
+                completed_at, changed_at = bitmap.get_times(week_number, task_index)
+                rows.append(UserProgress(
+                    user_id=curriculum.user_id,
+                    curriculum=curriculum,
+                    week_number=week_number,
+                    task_index=task_index,
+                    completed=(week_number, task_index) in completed,
+                    completed_at=completed_at,
+                    changed_at=changed_at
+                ))
+
+            with transaction.atomic():
+                UserProgress.objects.filter(curriculum=curriculum, user_id=curriculum.user_id).delete()
+                UserProgress.objects.bulk_create(rows)
+                if delete_source:
+                    bitmap.delete()
+            copied += 1
+        return copied
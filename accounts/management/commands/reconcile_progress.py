@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from accounts.models import Curriculum, CurriculumTask, ProgressBitmap, UserProgress
+from accounts.progress import get_progress_store
+
+
+class Command(BaseCommand):
+    help = 'Recount curriculum progress counters and repair any drift from the per-toggle deltas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def recount(self, ids):
+        """{curriculum id: (total_tasks, completed_tasks)} for ids, read from the task rows and the progress store"""
+        totals = dict(
+            CurriculumTask.objects.filter(curriculum__in=ids)
+            .values('curriculum').annotate(n=Count('id')).values_list('curriculum', 'n')
+        )
+        if get_progress_store().name == 'bitmap':
+            completed = {
+                bitmap.curriculum_id: bitmap.count() for bitmap in ProgressBitmap.objects.filter(curriculum__in=ids)
+            }
+        else:
+            # Progress rows belong to the curriculum owner; others are ignored as in update_progress()
+            completed = dict(
+                UserProgress.objects.filter(curriculum__in=ids, completed=True, user=F('curriculum__user'))
+                .values('curriculum').annotate(n=Count('id')).values_list('curriculum', 'n')
+            )
+        return {pk: (totals.get(pk, 0), completed.get(pk, 0)) for pk in ids}
+
+    def reconcile_batch(self, ids, dry_run):
+        """Recount and repair one batch; returns the number of drifted curricula"""
+        fields = ('id', 'total_tasks', 'completed_tasks', 'progress_percentage')
+        with transaction.atomic():
+            curricula = Curriculum.objects.filter(id__in=ids).only(*fields)
+            if not dry_run:
+                # Toggles apply their delta in the same transaction as the progress write, so
+                # with the rows locked the recount and the stored counters cannot miss one
+                curricula = curricula.select_for_update()
+            curricula = list(curricula)
+            counts = self.recount(ids)
+
+            drifted = []
+            for curriculum in curricula:
+                total_tasks, completed_tasks = counts[curriculum.id]
+                progress_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+                if (curriculum.total_tasks, curriculum.completed_tasks) == (total_tasks, completed_tasks) \
+                        and abs(curriculum.progress_percentage - progress_percentage) < 1e-9:
+                    continue
+
+                self.stdout.write(
+                    f'   Curriculum {curriculum.id}: {curriculum.completed_tasks}/{curriculum.total_tasks} '
+                    f'-> {completed_tasks}/{total_tasks}'
+                )
+                curriculum.total_tasks = total_tasks
+                curriculum.completed_tasks = completed_tasks
+                curriculum.progress_percentage = progress_percentage
+                drifted.append(curriculum)
+
+            if drifted and not dry_run:
+                Curriculum.objects.bulk_update(drifted, ['total_tasks', 'completed_tasks', 'progress_percentage'])
+        return len(drifted)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Curriculum.objects.order_by('id').values_list('id', flat=True))
+        drifted = 0
+        for start in range(0, len(ids), batch_size):
+            drifted += self.reconcile_batch(ids[start:start + batch_size], options['dry_run'])
+
+        checked = len(ids)
+        action = 'would be repaired' if options['dry_run'] else 'repaired'
+        if drifted:
+            self.stdout.write(self.style.WARNING(f'🔧 {drifted} of {checked} curricula {action}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ All {checked} curricula are consistent'))
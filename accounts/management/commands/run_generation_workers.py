@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.jobs import claim_next_job, run_generation_job
+
+
+def _run_in_worker(job):
+    """Run one job on a pool thread and release that thread's DB connection"""
+    try:
+        return run_generation_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Process queued curriculum generation jobs with a bounded worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'GENERATION_WORKERS', 4),
+                            help='Maximum number of concurrent LLM calls')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the current queue and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        self.stdout.write(self.style.SUCCESS(f'⚙️  Generation workers started ({workers} threads)'))
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    # Only claim as many jobs as there are free threads so
+                    # pending jobs stay visible to other worker processes
+                    while len(in_flight) < workers:
+                        job = claim_next_job()
+                        if job is None:
+                            break
+                        self.stdout.write(f'▶️  Job {job.id}: {job.topic} ({job.duration} weeks)')
+                        in_flight.add(pool.submit(_run_in_worker, job))
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = future.result()
+                        if job.status == 'succeeded':
+                            self.stdout.write(self.style.SUCCESS(f'✅ Job {job.id} -> curriculum {job.curriculum_id}'))
+                        elif job.status == 'pending':
+                            self.stdout.write(self.style.WARNING(f'⏳ Job {job.id} re-queued, the generator is busy'))
+                        else:
+                            self.stdout.write(self.style.ERROR(f'❌ Job {job.id} failed: {job.error}'))
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('⚠️  Stopping after in-flight jobs finish'))
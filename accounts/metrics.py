@@ -0,0 +1,141 @@
+"""
+In-process metrics for the generation pipeline, exposed in the Prometheus
+text format by the admin_metrics view.
+
+    with metrics.stage('llm'):
+        ...
+    metrics.parse_failures.inc()
+
+Values are per process; scrape every worker (or sum them) when running
+several.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; LLM calls dominate so the buckets reach well past a minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._values.get(_label_key(labels))
+        return series[-1] if series else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, cumulative in zip(self.buckets, series):
+                    samples.append((f'{self.name}_bucket', key, cumulative, (('le', repr(float(bound))),)))
+                samples.append((f'{self.name}_bucket', key, series[-1], (('le', '+Inf'),)))
+                samples.append((f'{self.name}_sum', key, series[-2]))
+                samples.append((f'{self.name}_count', key, series[-1]))
+        return samples
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+stage_seconds = Histogram(
+    'curriculum_generation_stage_seconds',
+    'Time spent in each generation stage (llm, parse, persist, progress)'
+)
+llm_response_bytes = Histogram(
+    'curriculum_llm_response_bytes',
+    'Size of raw LLM responses',
+    buckets=SIZE_BUCKETS
+)
+llm_calls = Counter('curriculum_llm_calls_total', 'LLM calls by kind and outcome')
+parse_failures = Counter('curriculum_parse_failures_total', 'LLM responses no curriculum could be extracted from')
+retries = Counter('curriculum_llm_retries_total', 'Extra LLM calls made to recover truncated or invalid chunks')
+generations = Counter('curriculum_generations_total', 'Generation requests by result (generated, cached, failed)')
+
+REGISTRY = [stage_seconds, llm_response_bytes, llm_calls, parse_failures, retries, generations]
+
+
+@contextmanager
+def stage(name):
+    """Record the duration of the enclosed block as a generation stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=name)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for sample in metric.samples():
+            name, key, value = sample[:3]
+            extra = sample[3] if len(sample) > 3 else ()
+            lines.append(f'{name}{_format_labels(key, extra)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.reset()
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_generationlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurriculumWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('week_number', models.IntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('description', models.TextField(blank=True)),
+                ('videos', models.JSONField(blank=True, default=list)),
+                ('curriculum', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weeks', to='accounts.curriculum')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('curriculum', 'position')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CurriculumTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_number', models.IntegerField()),
+                ('task_index', models.IntegerField()),
+                ('task', models.TextField()),
+                ('resources', models.JSONField(blank=True, default=list)),
+                ('videos', models.JSONField(blank=True, default=list)),
+                ('curriculum', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='accounts.curriculum')),
+                ('week', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='accounts.curriculumweek')),
+            ],
+            options={
+                'ordering': ['week__position', 'task_index'],
+                'indexes': [models.Index(fields=['curriculum', 'week_number', 'task_index'], name='accounts_cu_curricu_f58860_idx')],
+            },
+        ),
+    ]
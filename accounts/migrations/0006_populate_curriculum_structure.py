@@ -0,0 +1,64 @@
+from django.db import migrations
+
+
+def content_weeks(content):
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict) and isinstance(content.get('weeks'), list):
+        return content['weeks']
+    return []
+
+
+def populate_structure(apps, schema_editor):
+    """Convert list-format content to {"weeks": [...]} and build week/task rows"""
+    Curriculum = apps.get_model('accounts', 'Curriculum')
+    CurriculumWeek = apps.get_model('accounts', 'CurriculumWeek')
+    CurriculumTask = apps.get_model('accounts', 'CurriculumTask')
+
+    for curriculum in Curriculum.objects.iterator():
+        weeks_data = content_weeks(curriculum.content)
+        if isinstance(curriculum.content, list):
+            curriculum.content = {'weeks': weeks_data}
+            curriculum.save(update_fields=['content'])
+
+        weeks, week_tasks = [], []
+        for position, week_data in enumerate(weeks_data):
+            if not isinstance(week_data, dict):
+                continue
+            weeks.append(CurriculumWeek(
+                curriculum=curriculum,
+                position=position,
+                week_number=week_data.get('week', 1),
+                title=str(week_data.get('title') or ''),
+                description=str(week_data.get('description') or ''),
+                videos=week_data.get('videos') or [],
+            ))
+            week_tasks.append(week_data.get('tasks') or [])
+        CurriculumWeek.objects.bulk_create(weeks)
+
+        tasks = []
+        for week, raw_tasks in zip(weeks, week_tasks):
+            for task_index, task in enumerate(raw_tasks):
+                if not isinstance(task, dict):
+                    task = {'task': str(task)}
+                tasks.append(CurriculumTask(
+                    curriculum=curriculum,
+                    week=week,
+                    week_number=week.week_number,
+                    task_index=task_index,
+                    task=str(task.get('task') or task.get('title') or ''),
+                    resources=task.get('resources') or [],
+                    videos=task.get('videos') or [],
+                ))
+        CurriculumTask.objects.bulk_create(tasks)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_curriculumweek_curriculumtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_structure, migrations.RunPython.noop),
+    ]
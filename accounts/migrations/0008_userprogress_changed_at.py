@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_linkcheck'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprogress',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_userprogress_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressBitmap',
+            fields=[
+                ('curriculum', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress_bitmap', serialize=False, to='accounts.curriculum')),
+                ('stride', models.IntegerField(default=32)),
+                ('bits', models.BinaryField(default=b'')),
+                ('times', models.JSONField(default=dict)),
+                ('version', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
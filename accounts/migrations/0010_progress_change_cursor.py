@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_progressbitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curriculum',
+            name='content_version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='curriculum',
+            name='progress_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='userprogress',
+            index=models.Index(fields=['curriculum', 'seq'], name='accounts_us_curricu_b2b09b_idx'),
+        ),
+    ]
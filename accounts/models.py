@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
@@ -127,6 +128,11 @@ class Curriculum(models.Model):
     completed_tasks = models.IntegerField(default=0)
     progress_percentage = models.FloatField(default=0.0)
 
+    # Change cursors for polling clients: progress_seq advances on every UserProgress
+    # write, content_version whenever weeks are added or replaced
+    progress_seq = models.BigIntegerField(default=0)
+    content_version = models.IntegerField(default=1)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -138,41 +144,151 @@ class Curriculum(models.Model):
         return f"{self.user.username} - {self.topic} ({self.difficulty})"
 
     def update_progress(self):
-        """Calculate and update progress percentage"""
-        total_tasks = 0
-        completed_tasks = 0
-
-        # Handle both old and new content formats
-        if isinstance(self.content, list):
-            # Old format: content is directly a list of weeks
-            weeks = self.content
-        elif isinstance(self.content, dict) and 'weeks' in self.content:
-            # New format: content is an object with 'weeks' key
-            weeks = self.content['weeks']
-        else:
-            # Fallback: empty weeks
-            weeks = []
-
-        # Count total tasks from weeks
-        for week in weeks:
-            total_tasks += len(week.get('tasks', []))
-
-        # Count completed tasks
-        completed_tasks = UserProgress.objects.filter(
-            user=self.user,
-            curriculum=self,
-            completed=True
-        ).count()
+        """Recount total and completed tasks; used at creation, on structural changes and by reconcile_progress"""
+        # Count total tasks from the normalized task rows
+        total_tasks = CurriculumTask.objects.filter(curriculum=self).count()
+
+        # Count completed tasks in whichever store PROGRESS_STORAGE selects
+        from .progress import get_progress_store
+        completed_tasks = get_progress_store().count(self.user, self)
 
         self.total_tasks = total_tasks
         self.completed_tasks = completed_tasks
         self.progress_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        self.save()
+        # Only the counters, so a stale progress_seq never moves the change cursor backwards
+        self.save(update_fields=['total_tasks', 'completed_tasks', 'progress_percentage', 'updated_at'])
+
+    def rebuild_structure(self):
+        """Replace the week/task rows with ones built from content"""
+        CurriculumWeek.objects.filter(curriculum=self).delete()
+        build_structure([self])
+
+    def weeks_as_content(self):
+        """The weeks array the frontend expects, read from the normalized rows"""
+        weeks = CurriculumWeek.objects.filter(curriculum=self).prefetch_related('tasks')
+        return [week.as_content() for week in weeks]
+
+    def apply_progress_delta(self, delta):
+        """Shift completed_tasks by delta in one UPDATE, without recounting or saving other columns"""
+        completed = F('completed_tasks') + delta
+        Curriculum.objects.filter(pk=self.pk).update(
+            completed_tasks=completed,
+            progress_percentage=Case(
+                When(total_tasks__gt=0, then=ExpressionWrapper(
+                    completed * Value(100.0) / F('total_tasks'), output_field=models.FloatField()
+                )),
+                default=Value(0.0),
+                output_field=models.FloatField()
+            )
+        )
+        self.completed_tasks, self.progress_percentage = Curriculum.objects.filter(pk=self.pk).values_list(
+            'completed_tasks', 'progress_percentage'
+        ).get()
+
+    def next_progress_seq(self):
+        """Advance the progress change cursor and return it; the UPDATE also serializes concurrent writers"""
+        Curriculum.objects.filter(pk=self.pk).update(progress_seq=F('progress_seq') + 1)
+        self.progress_seq = Curriculum.objects.filter(pk=self.pk).values_list('progress_seq', flat=True).get()
+        return self.progress_seq
 
     def get_progress_percentage(self):
         """Get the current progress percentage"""
         return self.progress_percentage
 
+def content_weeks(content):
+    """Weeks from either content format: a bare list (old) or {"weeks": [...]}"""
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict) and isinstance(content.get('weeks'), list):
+        return content['weeks']
+    return []
+
+def build_structure(curricula, positions=None):
+    """
+    Bulk-create week/task rows for saved curricula, two inserts in total.
+    positions limits it to those content indexes, for rebuilding single weeks.
+    """
+    weeks = []
+    week_tasks = []
+    for curriculum in curricula:
+        for position, week_data in enumerate(content_weeks(curriculum.content)):
+            if not isinstance(week_data, dict) or (positions is not None and position not in positions):
+                continue
+            weeks.append(CurriculumWeek(
+                curriculum=curriculum,
+                position=position,
+                week_number=week_data.get('week', 1),
+                title=str(week_data.get('title') or ''),
+                description=str(week_data.get('description') or ''),
+                videos=week_data.get('videos') or [],
+            ))
+            week_tasks.append(week_data.get('tasks') or [])
+    CurriculumWeek.objects.bulk_create(weeks)
+
+    tasks = []
+    for week, raw_tasks in zip(weeks, week_tasks):
+        for task_index, task in enumerate(raw_tasks):
+            if not isinstance(task, dict):
+                task = {'task': str(task)}
+            tasks.append(CurriculumTask(
+                curriculum=week.curriculum,
+                week=week,
+                week_number=week.week_number,
+                task_index=task_index,
+                task=str(task.get('task') or task.get('title') or ''),
+                resources=task.get('resources') or [],
+                videos=task.get('videos') or [],
+            ))
+    CurriculumTask.objects.bulk_create(tasks)
+    return tasks
+
+class CurriculumWeek(models.Model):
+    """One week of a curriculum, normalized out of Curriculum.content"""
+    curriculum = models.ForeignKey(Curriculum, on_delete=models.CASCADE, related_name='weeks')
+    position = models.IntegerField()
+    week_number = models.IntegerField()
+    title = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    videos = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        unique_together = ['curriculum', 'position']
+        ordering = ['position']
+
+    def __str__(self):
+        return f"{self.curriculum.topic} - Week {self.week_number}: {self.title}"
+
+    def as_content(self):
+        week = {
+            'week': self.week_number,
+            'title': self.title,
+            'description': self.description,
+            'tasks': [task.as_content() for task in self.tasks.all()],
+        }
+        if self.videos:
+            week['videos'] = self.videos
+        return week
+
+class CurriculumTask(models.Model):
+    """One task of a curriculum week, addressed like UserProgress by (week_number, task_index)"""
+    curriculum = models.ForeignKey(Curriculum, on_delete=models.CASCADE, related_name='tasks')
+    week = models.ForeignKey(CurriculumWeek, on_delete=models.CASCADE, related_name='tasks')
+    week_number = models.IntegerField()
+    task_index = models.IntegerField()
+    task = models.TextField()
+    resources = models.JSONField(default=list, blank=True)
+    videos = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['week__position', 'task_index']
+        indexes = [models.Index(fields=['curriculum', 'week_number', 'task_index'])]
+
+    def __str__(self):
+        return f"Week {self.week_number} Task {self.task_index}: {self.task[:50]}"
+
+    def as_content(self):
+        return {'task': self.task, 'resources': self.resources, 'videos': self.videos}
+
 class UserProgress(models.Model):
     """Track individual task completion for users"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -182,14 +298,120 @@ class UserProgress(models.Model):
     completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # When completed was last set, by the client's clock for batch syncs; later changes win conflicts
+    changed_at = models.DateTimeField(null=True, blank=True)
+    # Curriculum.progress_seq at the last write, for ?since= delta reads
+    seq = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ['user', 'curriculum', 'week_number', 'task_index']
         ordering = ['week_number', 'task_index']
+        indexes = [models.Index(fields=['curriculum', 'seq'])]
 
     def __str__(self):
         return f"{self.user.username} - Week {self.week_number} Task {self.task_index} - {'✓' if self.completed else '✗'}"
 
+class ProgressBitmap(models.Model):
+    """
+    Compact alternative to UserProgress rows (PROGRESS_STORAGE = 'bitmap'):
+    one bit per task at (week_number - 1) * stride + task_index, plus a
+    sparse map of timestamps for tasks that have been touched.
+    """
+    curriculum = models.OneToOneField(Curriculum, on_delete=models.CASCADE, primary_key=True, related_name='progress_bitmap')
+    stride = models.IntegerField(default=32)  # Bits reserved per week
+    bits = models.BinaryField(default=b'')
+    times = models.JSONField(default=dict)  # str(bit) -> [completed_at, changed_at (ISO 8601), version written at]
+    version = models.IntegerField(default=0)  # Optimistic concurrency for read-modify-write
+
+    def __str__(self):
+        return f"Progress bitmap for curriculum {self.curriculum_id}"
+
+    def bit_for(self, week_number, task_index):
+        """Bit index of a task, or None if the task falls outside the current stride"""
+        if week_number < 1 or task_index < 0:
+            raise ValueError(f"No bit for week {week_number} task {task_index}")
+        if task_index >= self.stride:
+            return None
+        return (week_number - 1) * self.stride + task_index
+
+    def key_for(self, bit):
+        return bit // self.stride + 1, bit % self.stride
+
+    def _set_bits(self):
+        for byte_index, byte in enumerate(bytes(self.bits)):
+            while byte:
+                low = byte & -byte
+                yield byte_index * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def _restride(self, stride):
+        """Re-lay the bits out with a wider stride when a week outgrows it"""
+        completed = self.completed_keys()
+        times = {self.key_for(int(bit)): value for bit, value in self.times.items()}
+        self.stride = stride
+        self.bits = b''
+        self.times = {}
+        for week_number, task_index in completed:
+            self.set(week_number, task_index, True)
+        for (week_number, task_index), value in times.items():
+            self.times[str(self.bit_for(week_number, task_index))] = value
+
+    def is_set(self, week_number, task_index):
+        bit = self.bit_for(week_number, task_index)
+        data = bytes(self.bits)
+        return bit is not None and bit // 8 < len(data) and bool(data[bit // 8] & (1 << bit % 8))
+
+    def set(self, week_number, task_index, completed):
+        """Set one task's bit; returns True if it changed"""
+        if self.bit_for(week_number, task_index) is None:
+            if not completed:
+                return False
+            self._restride(max(self.stride * 2, task_index + 1))
+        bit = self.bit_for(week_number, task_index)
+
+        data = bytearray(self.bits)
+        if bit // 8 >= len(data):
+            if not completed:
+                return False
+            data.extend(bytes(bit // 8 + 1 - len(data)))
+        mask = 1 << bit % 8
+        if bool(data[bit // 8] & mask) == completed:
+            return False
+        data[bit // 8] ^= mask
+        self.bits = bytes(data.rstrip(b'\0'))
+        return True
+
+    def completed_keys(self):
+        """(week_number, task_index) of every completed task"""
+        return [self.key_for(bit) for bit in self._set_bits()]
+
+    def count(self):
+        return sum(bin(byte).count('1') for byte in bytes(self.bits))
+
+    def get_times(self, week_number, task_index):
+        """[completed_at, changed_at] as ISO strings, None where unknown"""
+        bit = self.bit_for(week_number, task_index)
+        return self.times.get(str(bit), [None, None])[:2] if bit is not None else [None, None]
+
+    def set_times(self, week_number, task_index, completed_at, changed_at, seq=0):
+        if self.bit_for(week_number, task_index) is None:
+            self._restride(max(self.stride * 2, task_index + 1))
+        self.times[str(self.bit_for(week_number, task_index))] = [
+            completed_at.isoformat() if completed_at else None,
+            changed_at.isoformat() if changed_at else None,
+            seq,
+        ]
+
+    def changed_since(self, seq):
+        """(week_number, task_index) of tasks written at a version after seq"""
+        return [self.key_for(int(bit)) for bit, value in self.times.items() if len(value) > 2 and value[2] > seq]
+
+    def clear_week(self, week_number):
+        """Forget every task in one week, e.g. after it is regenerated"""
+        for task_index in range(self.stride):
+            self.set(week_number, task_index, False)
+            self.times.pop(str(self.bit_for(week_number, task_index)), None)
+
 class UserNote(models.Model):
     """User notes for curriculum sections"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -257,6 +479,82 @@ class UserAchievement(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_achievement_type_display()}"
 
+# ============================================================================
+# GENERATION MODELS
+# ============================================================================
+
+class GenerationCacheEntry(models.Model):
+    """Shared cache of AI responses keyed on normalized generation parameters"""
+    cache_key = models.CharField(max_length=64, unique=True)
+    topic = models.CharField(max_length=200, blank=True)
+    prompt_version = models.IntegerField(default=1)
+    content = models.JSONField()
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Cached: {self.topic} (v{self.prompt_version}, {self.hit_count} hits)"
+
+class GenerationLease(models.Model):
+    """Cross-process single-flight lock: the holder is the only process calling the LLM for cache_key"""
+    cache_key = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Lease {self.cache_key[:12]} held by {self.owner}"
+
+class GenerationJob(models.Model):
+    """Queued curriculum generation processed by run_generation_workers"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    topic = models.CharField(max_length=200)
+    difficulty = models.CharField(max_length=20, default='beginner')
+    duration = models.IntegerField()
+    goal = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    curriculum = models.ForeignKey(Curriculum, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.topic} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+class LinkCheck(models.Model):
+    """Cached reachability of a resource/video URL, revalidated once expires_at passes"""
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.TextField()
+    host = models.CharField(max_length=255, blank=True)
+    ok = models.BooleanField(default=False)
+    status_code = models.IntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    checked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{'OK' if self.ok else 'BROKEN'} {self.url}"
+
 # ============================================================================
 # ADMIN MODELS
 # ============================================================================
@@ -0,0 +1,184 @@
+"""
+Curriculum PDF rendering and the on-disk render cache.
+
+Rendered files are stored as PDF_CACHE_DIR/<curriculum id>/<key>.pdf, where
+the key hashes the curriculum's content together with its progress version.
+Any change to either produces a new key, so nothing has to be invalidated
+explicitly and repeat downloads cost a file read. The key is also the
+response ETag.
+
+ReportLab is CPU-bound and holds the GIL, so renders run in a bounded
+process pool of PDF_RENDER_WORKERS processes per server process (0 renders in-process).
+Requests for a key that is already rendering share that render.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import CurriculumWeek
+from .pdf_builder import render_pdf
+
+# Bump when the rendered layout changes so cached files are not served
+LAYOUT_VERSION = 2
+
+
+def content_hash(curriculum):
+    """Hash of everything the PDF shows apart from progress"""
+    payload = json.dumps(
+        [curriculum.topic, curriculum.difficulty, str(curriculum.duration), curriculum.content],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def pdf_cache_key(curriculum, progress_version):
+    return hashlib.sha256(
+        f'{LAYOUT_VERSION}:{content_hash(curriculum)}:{progress_version}'.encode('utf-8')
+    ).hexdigest()[:32]
+
+
+def _cache_dir(curriculum_id):
+    root = getattr(settings, 'PDF_CACHE_DIR', None)
+    return Path(root) / str(curriculum_id) if root else None
+
+
+def open_cached_pdf(curriculum, key):
+    """The cached file for key opened for reading, or None if it is missing or was just pruned"""
+    directory = _cache_dir(curriculum.pk)
+    if directory is None:
+        return None
+    try:
+        return open(directory / f'{key}.pdf', 'rb')
+    except FileNotFoundError:
+        return None
+
+
+def store_pdf(curriculum_id, key, data):
+    """Write a rendered PDF under key and drop the curriculum's older renders"""
+    directory = _cache_dir(curriculum_id)
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, directory / f'{key}.pdf')
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # Only prune renders older than this one: a concurrent request may have
+    # just stored a newer key. Readers that already opened a pruned file keep
+    # reading it, and ones that lose the race re-render (see open_cached_pdf).
+    try:
+        written = (directory / f'{key}.pdf').stat().st_mtime_ns
+    except FileNotFoundError:
+        return  # Already pruned by a newer render
+    for path in directory.glob('*.pdf'):
+        try:
+            if path.stem != key and path.stat().st_mtime_ns < written:
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass  # Pruned by another writer
+
+
+class PdfRenderBusy(Exception):
+    """Raised when PDF_RENDER_MAX_PENDING renders are already queued"""
+
+
+def curriculum_document(curriculum, completed, progress_percentage):
+    """The plain data render_pdf lays out, with completed {(week_number, task_index)} ticked"""
+    weeks = CurriculumWeek.objects.filter(curriculum=curriculum).prefetch_related('tasks')
+    return {
+        'topic': curriculum.topic,
+        'duration': str(curriculum.duration),
+        'difficulty': curriculum.difficulty,
+        'progress_percentage': progress_percentage,
+        'weeks': [
+            {
+                'week_number': week.week_number,
+                'title': week.title,
+                'description': week.description,
+                'videos': list(week.videos or []),
+                'tasks': [(task.task, (task.week_number, task.task_index) in completed) for task in week.tasks.all()],
+            }
+            for week in weeks
+        ],
+    }
+
+
+class RenderPool:
+    """Process pool for PDF renders, created on first use and shared by every request in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._rendering = {}  # cache key -> Future
+
+    @property
+    def workers(self):
+        return getattr(settings, 'PDF_RENDER_WORKERS', 2)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a threaded server process with open connections is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def submit(self, curriculum_id, key, document):
+        """Future for the PDF bytes; the result is written to the cache once rendered"""
+        inline = self.workers <= 0
+        with self._lock:
+            future = self._rendering.get(key)
+            if future is not None:
+                return future
+            if len(self._rendering) >= getattr(settings, 'PDF_RENDER_MAX_PENDING', 32):
+                raise PdfRenderBusy("Too many PDFs are being rendered, please retry shortly")
+
+            if inline:
+                future = Future()
+            else:
+                try:
+                    future = self._get_executor().submit(render_pdf, document)
+                except BrokenProcessPool:
+                    # A worker died; start a fresh pool
+                    self._executor = None
+                    future = self._get_executor().submit(render_pdf, document)
+            self._rendering[key] = future
+
+        future.add_done_callback(lambda done: self._finished(curriculum_id, key, done))
+        if inline:
+            try:
+                future.set_result(render_pdf(document))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def _finished(self, curriculum_id, key, future):
+        with self._lock:
+            self._rendering.pop(key, None)
+        if future.exception() is None:
+            store_pdf(curriculum_id, key, future.result())
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+render_pool = RenderPool()
@@ -0,0 +1,75 @@
+"""
+Curriculum PDF layout. Works on a plain document dict rather than models so
+it can run in the render pool's worker processes without Django:
+
+    {'topic': ..., 'duration': ..., 'difficulty': ..., 'progress_percentage': ...,
+     'weeks': [{'week_number': ..., 'title': ..., 'description': ..., 'videos': [...],
+                'tasks': [(task_text, completed), ...]}, ...]}
+"""
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+_styles = None
+
+
+def get_styles():
+    """Paragraph styles, built once per process instead of once per render"""
+    global _styles
+    if _styles is None:
+        from reportlab.lib.styles import getSampleStyleSheet
+
+        sheet = getSampleStyleSheet()
+        _styles = {'title': sheet['Title'], 'heading': sheet['Heading2'], 'normal': sheet['Normal']}
+    return _styles
+
+
+def _text(value):
+    """Escape LLM/user text for Paragraph markup; a stray '<' or '&' would otherwise break the render"""
+    return escape(str(value))
+
+
+def render_pdf(document):
+    """Lay out a curriculum document in a single pass; returns the PDF bytes"""
+    # ReportLab is only needed here, so keep it out of module import time
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    styles = get_styles()
+    normal = styles['normal']
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+    # Title, duration, difficulty and progress
+    story = [
+        Paragraph(f"<b>{_text(document['topic'])} Curriculum</b>", styles['title']),
+        Spacer(1, 12),
+        Paragraph(f"<b>Duration:</b> {_text(document['duration'])}", normal),
+        Spacer(1, 12),
+        Paragraph(f"<b>Difficulty:</b> {_text(document['difficulty'].title())}", normal),
+        Spacer(1, 12),
+        Paragraph(f"<b>Progress:</b> {document['progress_percentage']:.1f}% completed", normal),
+        Spacer(1, 20),
+    ]
+
+    for week in document['weeks']:
+        story.append(Paragraph(f"<b>Week {week['week_number']}: {_text(week['title'])}</b>", styles['heading']))
+        story.append(Spacer(1, 6))
+        story.append(Paragraph(f"<b>Description:</b> {_text(week['description'])}", normal))
+        story.append(Spacer(1, 6))
+
+        # Videos
+        if week['videos']:
+            story.append(Paragraph("<b>Videos:</b>", normal))
+            story.extend(Paragraph(f"• {_text(video)}", normal) for video in week['videos'])
+            story.append(Spacer(1, 6))
+
+        # Tasks
+        if week['tasks']:
+            story.append(Paragraph("<b>Tasks:</b>", normal))
+            story.extend(
+                Paragraph(f"• {'✓' if completed else '○'} {_text(task)}", normal) for task, completed in week['tasks']
+            )
+            story.append(Spacer(1, 12))
+
+    doc.build(story)
+    return buffer.getvalue()
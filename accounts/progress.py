@@ -0,0 +1,497 @@
+"""
+Task progress storage and writes.
+
+Progress is kept either as one UserProgress row per touched task (the
+default) or, with PROGRESS_STORAGE = 'bitmap', as one ProgressBitmap per
+curriculum. Views go through get_progress_store() so both behave the same;
+manage.py migrate_progress_storage moves existing data between them.
+
+With PROGRESS_WRITE_BEHIND single toggles are coalesced in progress_buffer
+and written in batches instead of one write cycle per click.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Curriculum, CurriculumTask, ProgressBitmap, UserProgress
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressChangeError(ValueError):
+    """Raised for a malformed change in a batch"""
+
+
+def parse_client_timestamp(value):
+    """A client timestamp as an aware datetime: ISO 8601, or epoch milliseconds as sent by Date.now()"""
+    if value is None:
+        return timezone.now()
+    if isinstance(value, datetime):
+        return value if timezone.is_aware(value) else timezone.make_aware(value, dt_timezone.utc)
+    if isinstance(value, bool):
+        raise ProgressChangeError("Invalid client_timestamp")
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ProgressChangeError(f"Invalid client_timestamp: {value}")
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ProgressChangeError(f"Invalid client_timestamp: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+
+def _parse_time(value):
+    return parse_datetime(value) if value else None
+
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class RowProgressStore:
+    """One UserProgress row per task the user has touched"""
+
+    name = 'rows'
+
+    def state(self, user, curriculum):
+        """{(week_number, task_index): (completed, completed_at)} for every touched task"""
+        return {
+            (week_number, task_index): (completed, completed_at)
+            for week_number, task_index, completed, completed_at in UserProgress.objects.filter(
+                user=user,
+                curriculum=curriculum
+            ).values_list('week_number', 'task_index', 'completed', 'completed_at')
+        }
+
+    def changes(self, user, curriculum, since=None):
+        """(cursor, state) for tasks written after cursor since, or every touched task without one"""
+        # The cursor is read before the rows, so a concurrent write is sent again rather than missed
+        cursor = curriculum.progress_seq
+        rows = UserProgress.objects.filter(user=user, curriculum=curriculum)
+        if since is not None:
+            rows = rows.filter(seq__gt=since)
+        return cursor, {
+            (week_number, task_index): (completed, completed_at)
+            for week_number, task_index, completed, completed_at in rows.values_list(
+                'week_number', 'task_index', 'completed', 'completed_at'
+            )
+        }
+
+    def version(self, user, curriculum):
+        """Changes on every write to the curriculum's progress"""
+        return curriculum.progress_seq
+
+    def completed_keys(self, user, curriculum):
+        return set(UserProgress.objects.filter(
+            user=user,
+            curriculum=curriculum,
+            completed=True
+        ).values_list('week_number', 'task_index'))
+
+    def count(self, user, curriculum):
+        return UserProgress.objects.filter(user=user, curriculum=curriculum, completed=True).count()
+
+    def toggle(self, user, curriculum, week_number, task_index, completed, now):
+        """Set one task; returns True only if its completed state changed"""
+        seq = curriculum.next_progress_seq()
+        progress, created = UserProgress.objects.get_or_create(
+            user=user,
+            curriculum=curriculum,
+            week_number=week_number,
+            task_index=task_index,
+            defaults={'completed': completed, 'completed_at': now if completed else None, 'changed_at': now, 'seq': seq}
+        )
+        if created:
+            return completed
+
+        # Conditional update: only the request that actually flips the state moves the counters
+        return bool(UserProgress.objects.filter(pk=progress.pk, completed=not completed).update(
+            completed=completed,
+            completed_at=now if completed else None,
+            changed_at=now,
+            seq=seq
+        ))
+
+    def apply(self, user, curriculum, latest):
+        """Apply {key: (completed, changed_at)} where newer; returns (applied keys, completed delta)"""
+        if not latest:
+            return set(), 0
+        seq = curriculum.next_progress_seq()
+        existing = {
+            (progress.week_number, progress.task_index): progress
+            for progress in UserProgress.objects.select_for_update().filter(user=user, curriculum=curriculum)
+        }
+
+        applied, to_create, to_update, delta = set(), [], [], 0
+        for key, (completed, changed_at) in latest.items():
+            progress = existing.get(key)
+            if progress is None:
+                to_create.append(UserProgress(
+                    user=user,
+                    curriculum=curriculum,
+                    week_number=key[0],
+                    task_index=key[1],
+                    completed=completed,
+                    completed_at=changed_at if completed else None,
+                    changed_at=changed_at,
+                    seq=seq
+                ))
+                delta += completed
+            elif progress.changed_at is None or changed_at >= progress.changed_at:
+                if progress.completed != completed:
+                    delta += 1 if completed else -1
+                    progress.completed_at = changed_at if completed else None
+                progress.completed = completed
+                progress.changed_at = changed_at
+                progress.seq = seq
+                to_update.append(progress)
+            else:
+                continue
+            applied.add(key)
+
+        UserProgress.objects.bulk_create(to_create)
+        UserProgress.objects.bulk_update(to_update, ['completed', 'completed_at', 'changed_at', 'seq'])
+        return applied, delta
+
+    def clear_week(self, user, curriculum, week_number):
+        UserProgress.objects.filter(curriculum=curriculum, week_number=week_number).delete()
+
+
+class BitmapProgressStore:
+    """One ProgressBitmap per curriculum, so every read is a single primary-key fetch"""
+
+    name = 'bitmap'
+    max_attempts = 10
+
+    def _get(self, curriculum):
+        try:
+            return ProgressBitmap.objects.get(pk=curriculum.pk)
+        except ProgressBitmap.DoesNotExist:
+            return ProgressBitmap(curriculum_id=curriculum.pk)
+
+    def _modify(self, curriculum, change):
+        """Run change(bitmap) and save it, retrying if another request saved first"""
+        for _ in range(self.max_attempts):
+            bitmap = self._get(curriculum)
+            result = change(bitmap)
+            if bitmap._state.adding:
+                bitmap.version = 1  # change() stamped its tasks with version + 1
+                try:
+                    with transaction.atomic():
+                        bitmap.save(force_insert=True)
+                    return result
+                except IntegrityError:
+                    continue  # Created concurrently; retry against the saved row
+            saved = ProgressBitmap.objects.filter(pk=curriculum.pk, version=bitmap.version).update(
+                stride=bitmap.stride,
+                bits=bitmap.bits,
+                times=bitmap.times,
+                version=F('version') + 1
+            )
+            if saved:
+                return result
+        raise RuntimeError("Progress is being updated too often, please retry")
+
+    def _state(self, bitmap):
+        state = {bitmap.key_for(int(bit)): (False, None) for bit in bitmap.times}
+        for key in bitmap.completed_keys():
+            state[key] = (True, _parse_time(bitmap.get_times(*key)[0]))
+        return state
+
+    def state(self, user, curriculum):
+        return self._state(self._get(curriculum))
+
+    def changes(self, user, curriculum, since=None):
+        """(cursor, state) as for rows; the bitmap's version is the cursor"""
+        bitmap = self._get(curriculum)
+        state = self._state(bitmap)
+        if since is not None:
+            state = {key: state[key] for key in bitmap.changed_since(since)}
+        return bitmap.version, state
+
+    def version(self, user, curriculum):
+        return ProgressBitmap.objects.filter(pk=curriculum.pk).values_list('version', flat=True).first() or 0
+
+    def completed_keys(self, user, curriculum):
+        return set(self._get(curriculum).completed_keys())
+
+    def count(self, user, curriculum):
+        return self._get(curriculum).count()
+
+    def _set(self, bitmap, key, completed, changed_at):
+        """Set one task on a loaded bitmap; returns True if its state changed"""
+        changed = bitmap.set(*key, completed)
+        completed_at = changed_at if changed else _parse_time(bitmap.get_times(*key)[0])
+        bitmap.set_times(*key, completed_at if completed else None, changed_at, bitmap.version + 1)
+        return changed
+
+    def toggle(self, user, curriculum, week_number, task_index, completed, now):
+        return self._modify(curriculum, lambda bitmap: self._set(bitmap, (week_number, task_index), completed, now))
+
+    def apply(self, user, curriculum, latest):
+        def change(bitmap):
+            applied, delta = set(), 0
+            for key, (completed, changed_at) in latest.items():
+                stored = _parse_time(bitmap.get_times(*key)[1])
+                if stored is not None and changed_at < stored:
+                    continue
+                if self._set(bitmap, key, completed, changed_at):
+                    delta += 1 if completed else -1
+                applied.add(key)
+            return applied, delta
+        return self._modify(curriculum, change)
+
+    def clear_week(self, user, curriculum, week_number):
+        self._modify(curriculum, lambda bitmap: bitmap.clear_week(week_number))
+
+
+STORES = {store.name: store for store in (RowProgressStore(), BitmapProgressStore())}
+
+
+def get_progress_store(name=None):
+    """The store selected by PROGRESS_STORAGE ('rows' or 'bitmap')"""
+    return STORES[name or getattr(settings, 'PROGRESS_STORAGE', 'rows')]
+
+
+# ============================================================================
+# WRITES
+# ============================================================================
+
+def require_known_task(curriculum, week_number, task_index):
+    """Raise ProgressChangeError unless the curriculum has this task, as the batch path checks with known"""
+    if not CurriculumTask.objects.filter(
+        curriculum=curriculum, week_number=week_number, task_index=task_index
+    ).exists():
+        raise ProgressChangeError(f"Unknown task: week {week_number} task {task_index}")
+
+
+def toggle_progress(user, curriculum, week_number, task_index, completed):
+    """Set one task and move the curriculum counters if its state changed"""
+    # Unknown tasks would inflate the counters past 100% and, for bitmaps, grow the blob without bound
+    require_known_task(curriculum, week_number, task_index)
+    with transaction.atomic():
+        changed = get_progress_store().toggle(user, curriculum, week_number, task_index, completed, timezone.now())
+        # Update curriculum progress by the change instead of recounting
+        if changed:
+            curriculum.apply_progress_delta(1 if completed else -1)
+    return changed
+
+
+def _parse_change(raw):
+    try:
+        return (
+            (int(raw['week_number']), int(raw['task_index'])),
+            bool(raw['completed']),
+            parse_client_timestamp(raw.get('client_timestamp')),
+        )
+    except (KeyError, TypeError, ValueError, OverflowError, OSError) as e:
+        raise ProgressChangeError(f"Invalid change: {e}")
+
+
+def apply_progress_changes(user, curriculum, changes):
+    """
+    Apply a batch of {week_number, task_index, completed, client_timestamp}
+    changes in one transaction. For each task the newest change wins, both
+    within the batch and against what is already stored, so replaying an
+    offline backlog cannot undo a newer toggle. Progress is adjusted once.
+    Returns one result per change: 'applied', 'stale' (superseded by a newer
+    change) or 'unknown_task'.
+    """
+    parsed = [_parse_change(raw) for raw in changes]
+
+    # Latest change per task within the batch
+    latest = {}
+    for index, (key, completed, changed_at) in enumerate(parsed):
+        if key not in latest or changed_at >= latest[key][1]:
+            latest[key] = (completed, changed_at, index)
+
+    results = ['stale'] * len(parsed)
+    with transaction.atomic():
+        known = set(CurriculumTask.objects.filter(curriculum=curriculum).order_by().values_list('week_number', 'task_index'))
+        for key, (_, _, index) in latest.items():
+            if key not in known:
+                results[index] = 'unknown_task'
+
+        applied, delta = get_progress_store().apply(user, curriculum, {
+            key: (completed, changed_at) for key, (completed, changed_at, _) in latest.items() if key in known
+        })
+        for key in applied:
+            results[latest[key][2]] = 'applied'
+        if delta:
+            curriculum.apply_progress_delta(delta)
+
+    return results
+
+
+# ============================================================================
+# WRITE-BEHIND BUFFER
+# ============================================================================
+
+class ProgressBuffer:
+    """
+    Process-local write-behind buffer for single-task toggles. Only the last
+    state per (user, curriculum, week, task) is kept. Pending toggles are
+    written as one batch per curriculum every PROGRESS_FLUSH_INTERVAL_MS, as
+    soon as PROGRESS_FLUSH_MAX_PENDING tasks are waiting, and at exit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # (user_id, curriculum_id) -> {(week_number, task_index): (completed, changed_at)}
+        self._flushing = {}
+        self._size = 0
+        self._thread = None
+        self._registered = False
+
+    def record(self, user, curriculum, week_number, task_index, completed, now=None):
+        require_known_task(curriculum, week_number, task_index)
+        with self._lock:
+            tasks = self._pending.setdefault((user.pk, curriculum.pk), {})
+            self._size += (week_number, task_index) not in tasks
+            tasks[(week_number, task_index)] = (completed, now or timezone.now())
+            size = self._size
+        self._start_flusher()
+        if size >= getattr(settings, 'PROGRESS_FLUSH_MAX_PENDING', 1000):
+            self.flush()
+
+    def pending(self, user, curriculum):
+        """{(week_number, task_index): (completed, changed_at)} not yet written for one curriculum"""
+        group = (user.pk, curriculum.pk)
+        with self._lock:
+            return {**self._flushing.get(group, {}), **self._pending.get(group, {})}
+
+    def discard(self, curriculum, week_number):
+        """Drop pending and not yet written flushing toggles for a week whose tasks were replaced"""
+        with self._lock:
+            for (_, curriculum_id), tasks in self._pending.items():
+                if curriculum_id == curriculum.pk:
+                    for key in [key for key in tasks if key[0] == week_number]:
+                        del tasks[key]
+                        self._size -= 1
+            # flush() copies each group under the lock just before writing it
+            for (_, curriculum_id), tasks in self._flushing.items():
+                if curriculum_id == curriculum.pk:
+                    for key in [key for key in tasks if key[0] == week_number]:
+                        del tasks[key]
+
+    def flush(self):
+        """Write every pending toggle; returns the number of tasks written"""
+        with self._flush_lock:
+            with self._lock:
+                # Reads keep seeing the batch through _flushing until it is written
+                self._flushing, self._pending, self._size = self._pending, {}, 0
+            batch, failed, written = self._flushing, {}, 0
+            try:
+                curricula = Curriculum.objects.select_related('user').defer('content').in_bulk(
+                    [curriculum_id for _, curriculum_id in batch]
+                )
+                for (user_id, curriculum_id), tasks in batch.items():
+                    curriculum = curricula.get(curriculum_id)
+                    if curriculum is None or curriculum.user_id != user_id:
+                        continue  # Deleted since the toggle
+                    with self._lock:
+                        # Weeks discarded while earlier groups were being written are left out
+                        tasks = dict(tasks)
+                    if not tasks:
+                        continue
+                    try:
+                        apply_progress_changes(curriculum.user, curriculum, [
+                            {'week_number': week_number, 'task_index': task_index,
+                             'completed': completed, 'client_timestamp': changed_at}
+                            for (week_number, task_index), (completed, changed_at) in tasks.items()
+                        ])
+                        written += len(tasks)
+                    except Exception:
+                        logger.exception("Progress flush failed for curriculum %s", curriculum_id)
+                        failed[(user_id, curriculum_id)] = tasks
+            except Exception:
+                logger.exception("Progress flush failed")
+                failed = batch
+            finally:
+                with self._lock:
+                    # Failed toggles are retried on the next flush unless a newer one replaced them
+                    for group, tasks in failed.items():
+                        newer = self._pending.setdefault(group, {})
+                        for key, value in tasks.items():
+                            newer.setdefault(key, value)
+                    self._size = sum(len(tasks) for tasks in self._pending.values())
+                    self._flushing = {}
+            return written
+
+    def _start_flusher(self):
+        interval = getattr(settings, 'PROGRESS_FLUSH_INTERVAL_MS', 250) / 1000
+        with self._lock:
+            if not self._registered:
+                atexit.register(self.flush)
+                self._registered = True
+            if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='progress-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+
+progress_buffer = ProgressBuffer()
+
+
+def _merge_pending(state, pending):
+    for key, (completed, changed_at) in pending.items():
+        was_completed, completed_at = state.get(key, (False, None))
+        state[key] = (completed, (completed_at if was_completed else changed_at) if completed else None)
+    return state
+
+
+def progress_state(user, curriculum):
+    """The store's state with this process's pending write-behind toggles applied, so users read their own writes"""
+    return _merge_pending(get_progress_store().state(user, curriculum), progress_buffer.pending(user, curriculum))
+
+
+def progress_version(user, curriculum):
+    """Identifies the progress a user currently sees, pending write-behind toggles included"""
+    store = get_progress_store()
+    version = f'{store.name}.{store.version(user, curriculum)}'
+    pending = progress_buffer.pending(user, curriculum)
+    if pending:
+        digest = hashlib.sha256(repr(sorted((key, completed) for key, (completed, _) in pending.items())).encode())
+        version += f'.{digest.hexdigest()[:16]}'
+    return version
+
+
+def progress_changes(user, curriculum, cursor=None):
+    """
+    (cursor, state, is_delta) for polling clients. Given the cursor from a
+    previous call only tasks written since are returned; a missing or
+    outdated cursor (the weeks or the storage changed) gets the full state.
+    Pending write-behind toggles are always included.
+    """
+    store = get_progress_store()
+    prefix = f'{store.name}.{curriculum.content_version}.'
+    since = None
+    if cursor and cursor.startswith(prefix) and cursor[len(prefix):].isdigit():
+        since = int(cursor[len(prefix):])
+
+    seq, state = store.changes(user, curriculum, since)
+    return f'{prefix}{seq}', _merge_pending(state, progress_buffer.pending(user, curriculum)), since is not None
+
+
+def state_percentage(curriculum, state):
+    completed = sum(1 for done, _ in state.values() if done)
+    return (completed / curriculum.total_tasks * 100) if curriculum.total_tasks > 0 else 0
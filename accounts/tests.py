@@ -1,3 +1,1319 @@
-from django.test import TestCase
+import copy
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import llm, metrics, throttling
+from .extraction import CurriculumFormatError, CurriculumParser, extract_curriculum
+from .generation import (
+    GenerationError, SingleFlight, generate_curriculum_content, generation_cache, generation_cache_key, save_curriculum,
+    single_flight
+)
+from .jobs import claim_next_job, enqueue_generation_job, run_generation_job
+from .links import LinkValidator, is_trusted_host
+from .models import AdminSession, AdminUser, Curriculum, CurriculumFeedback, CurriculumTask, CurriculumWeek, GenerationCacheEntry, GenerationJob, GenerationLease, LinkCheck, ProgressBitmap, UserProgress
+from .pdf import open_cached_pdf, render_pool, store_pdf
+from .pdf_builder import render_pdf
+from .progress import apply_progress_changes, progress_buffer, toggle_progress
+
+SAMPLE_CURRICULUM = {
+    "weeks": [
+        {
+            "week": 1,
+            "title": "Basics",
+            "description": "Getting started",
+            "tasks": [
+                {"task": "Install Python", "resources": [], "videos": []},
+                {"task": "Write hello world", "resources": [], "videos": []},
+            ]
+        }
+    ]
+}
+
+
+def fake_backend(text):
+    """Stand-in for llm.get_backend returning a backend with a fixed response"""
+    backend = mock.Mock()
+    backend.generate.return_value = text
+    return mock.Mock(return_value=backend)
+
+
+class GenerationCacheTests(TestCase):
+    def setUp(self):
+        generation_cache.clear()
+        cache.clear()  # Rate-limit buckets live in the default cache
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client.force_login(self.user)
+
+    def post_generate(self, **overrides):
+        payload = {'topic': 'Python', 'duration': '4', 'goal': ''}
+        payload.update(overrides)
+        return self.client.post('/generate_curriculum/', json.dumps(payload), content_type='application/json')
+
+    def test_cache_key_normalizes_inputs(self):
+        self.assertEqual(
+            generation_cache_key('  Python ', 4, 'Beginner', 'Build  a game'),
+            generation_cache_key('python', '4', 'beginner', 'build a game')
+        )
+        self.assertNotEqual(
+            generation_cache_key('python', 4, 'beginner', ''),
+            generation_cache_key('python', 8, 'beginner', '')
+        )
+
+    def test_repeat_request_skips_llm_and_still_creates_curriculum(self):
+        get_backend = fake_backend(json.dumps(SAMPLE_CURRICULUM))
+        with mock.patch('accounts.llm.get_backend', get_backend):
+            first = self.post_generate().json()
+            second = self.post_generate(topic=' PYTHON ').json()
+
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(get_backend.return_value.generate.call_count, 1)
+        self.assertEqual(Curriculum.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(generation_cache.stats()['memory_hits'], 1)
+
+    def test_database_tier_survives_process_cache_clear(self):
+        with mock.patch('accounts.llm.get_backend', fake_backend(json.dumps(SAMPLE_CURRICULUM))):
+            self.post_generate()
+        generation_cache.clear()
+
+        with mock.patch('accounts.llm.get_backend') as get_backend:
+            result = self.post_generate().json()
+            get_backend.assert_not_called()
+
+        self.assertTrue(result['cached'])
+        self.assertEqual(GenerationCacheEntry.objects.get().hit_count, 1)
+
+    @override_settings(CURRICULUM_CACHE_MAX_ENTRIES=1)
+    def test_lru_eviction_is_counted(self):
+        generation_cache.set('a', SAMPLE_CURRICULUM)
+        generation_cache.set('b', SAMPLE_CURRICULUM)
+        self.assertEqual(generation_cache.stats()['evictions'], 1)
+
+
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        generation_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_async_post_returns_job_and_worker_creates_curriculum(self):
+        payload = {'topic': 'Python', 'duration': '2', 'async': True}
+        with mock.patch('accounts.llm.get_backend') as get_backend:
+            response = self.client.post('/generate_curriculum/', json.dumps(payload), content_type='application/json')
+            get_backend.assert_not_called()
+
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json()['status'], 'pending')
+
+        job = claim_next_job()
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_next_job())
+
+        with mock.patch('accounts.llm.get_backend', fake_backend(json.dumps(SAMPLE_CURRICULUM))):
+            run_generation_job(job)
+
+        result = self.client.get(status_url).json()
+        self.assertEqual(result['status'], 'succeeded')
+        self.assertEqual(result['curriculum'], SAMPLE_CURRICULUM)
+        self.assertTrue(Curriculum.objects.filter(id=result['curriculum_id'], user=self.user).exists())
+
+    def test_failed_job_reports_error(self):
+        job = GenerationJob.objects.create(user=self.user, topic='Python', duration=2, status='running')
+        with mock.patch('accounts.llm.get_backend', fake_backend('not json')):
+            run_generation_job(job)
+
+        result = self.client.get(f'/generation_jobs/{job.id}/').json()
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(result['error'], 'Invalid JSON from AI')
+
+    @override_settings(GENERATION_JOB_LEASE=60)
+    def test_jobs_abandoned_by_a_dead_worker_are_failed(self):
+        stale = GenerationJob.objects.create(user=self.user, topic='Python', duration=2, status='running',
+                                             started_at=timezone.now() - timezone.timedelta(seconds=61))
+        fresh = GenerationJob.objects.create(user=self.user, topic='Go', duration=2, status='running',
+                                             started_at=timezone.now())
+        self.assertIsNone(claim_next_job())
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+        self.assertIsNotNone(stale.finished_at)
+        self.assertEqual(self.client.get(f'/generation_jobs/{stale.id}/').json()['status'], 'failed')
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'running')
+
+
+class StreamingGenerationTests(TestCase):
+    def test_parser_emits_each_week_once_it_is_complete(self):
+        text = '```json\n' + json.dumps({"title": "x [y]", "weeks": [
+            {"week": 1, "title": 'A {tricky} "title"', "tasks": [{"task": "t"}]},
+            {"week": 2, "title": "B", "tasks": []},
+        ]}) + '\n```'
+        parser = CurriculumParser()
+        emitted = []
+        for i in range(0, len(text), 7):
+            emitted.append([week['week'] for week in parser.feed(text[i:i + 7])])
+
+        flattened = [week for batch in emitted for week in batch]
+        self.assertEqual(flattened, [1, 2])
+        # Week 1 must be emitted before the stream reaches week 2
+        first_batch = next(i for i, batch in enumerate(emitted) if batch)
+        self.assertEqual(emitted[first_batch], [1])
+
+    def test_stream_endpoint_sends_weeks_then_persists(self):
+        generation_cache.clear()
+        cache.clear()
+        user = User.objects.create_user(username='student', password='pass12345')
+        self.client.force_login(user)
+        text = json.dumps(SAMPLE_CURRICULUM)
+        get_backend = fake_backend('')
+        get_backend.return_value.stream.return_value = iter([text[i:i + 10] for i in range(0, len(text), 10)])
+
+        with mock.patch('accounts.llm.get_backend', get_backend):
+            response = self.client.get('/generate_curriculum/stream/', {'topic': 'Python', 'duration': 1})
+            body = b''.join(response).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertLess(body.index('event: week'), body.index('event: done'))
+        curriculum = Curriculum.objects.get(user=user)
+        self.assertEqual(curriculum.content, SAMPLE_CURRICULUM)
+        self.assertEqual(curriculum.total_tasks, 2)
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'weeks': []}
+
+        results = []
+        # Keep the DB lease out of worker threads; cross-process behaviour is covered below
+        with mock.patch.object(flight, '_lead_across_processes', side_effect=lambda key, fn: fn()):
+            threads = [threading.Thread(target=lambda: results.append(flight.do('k', generate))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'weeks': []}] * 5)
+        self.assertEqual(flight.stats()['followers'], 4)
+
+    def test_followers_of_a_failed_leader_do_not_all_retry(self):
+        flight = SingleFlight()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            time.sleep(0.2)
+            raise GenerationError("Invalid JSON from AI")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do('k', generate)
+            except GenerationError as e:
+                errors.append(e)
+
+        with mock.patch.object(flight, '_lead_across_processes', side_effect=lambda key, fn: fn()):
+            threads = [threading.Thread(target=call) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(flight.stats()['fallbacks'], 0)
+
+    @override_settings(CURRICULUM_SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    def test_another_process_takes_over_after_its_leader_fails(self):
+        generation_cache.clear()
+        flight = SingleFlight()
+        GenerationLease.objects.create(
+            cache_key='k', owner='other-host:1:1',
+            expires_at=timezone.now() + timezone.timedelta(minutes=1)
+        )
+        polls = []
+
+        def leader_gives_up(*args, **kwargs):
+            polls.append(1)
+            if len(polls) == 2:
+                GenerationLease.objects.all().delete()  # The other process failed and released
+
+        with mock.patch('accounts.generation.time.sleep', side_effect=leader_gives_up):
+            self.assertEqual(flight.do('k', lambda: {'weeks': ['taken over']}), {'weeks': ['taken over']})
+        self.assertEqual(flight.stats()['fallbacks'], 0)
+        self.assertFalse(GenerationLease.objects.exists())
+
+    @override_settings(CURRICULUM_SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    def test_waits_for_other_process_and_ignores_expired_leases(self):
+        generation_cache.clear()
+        flight = SingleFlight()
+        GenerationLease.objects.create(
+            cache_key='k', owner='other-host:1:1',
+            expires_at=timezone.now() + timezone.timedelta(minutes=1)
+        )
+        generation_cache.set('k', SAMPLE_CURRICULUM)
+        self.assertEqual(flight.do('k', mock.Mock()), SAMPLE_CURRICULUM)
+
+        # A lease left behind by a crashed process must not block the key
+        GenerationLease.objects.all().delete()
+        GenerationCacheEntry.objects.all().delete()
+        generation_cache.clear()
+        GenerationLease.objects.create(
+            cache_key='k2', owner='other-host:1:1',
+            expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        self.assertEqual(flight.do('k2', lambda: {'weeks': ['fresh']}), {'weeks': ['fresh']})
+        self.assertFalse(GenerationLease.objects.exists())
+
+    @override_settings(CURRICULUM_SINGLE_FLIGHT_TIMEOUT=1, CURRICULUM_SINGLE_FLIGHT_LEASE_TTL=600)
+    def test_lease_outlives_the_follower_timeout(self):
+        flight = SingleFlight()
+        expires = []
+
+        def generate():
+            expires.append(GenerationLease.objects.get(cache_key='k').expires_at - timezone.now())
+            return {'weeks': []}
+
+        flight.do('k', generate)
+        self.assertGreater(expires[0], timezone.timedelta(seconds=590))
+
+
+class LLMClientTests(TestCase):
+    def test_views_import_does_not_load_sdk(self):
+        import accounts.views  # noqa: F401
+        self.assertNotIn('google.generativeai', sys.modules)
+
+    def test_model_list_is_cached_on_disk(self):
+        path = os.path.join(tempfile.mkdtemp(), 'models.json')
+        sdk_model = mock.Mock(supported_generation_methods=['generateContent'], input_token_limit=10,
+                              output_token_limit=5, display_name='Flash')
+        sdk_model.name = 'models/flash'
+        genai = mock.Mock()
+        genai.list_models.return_value = [sdk_model]
+
+        with override_settings(LLM_MODELS_CACHE_PATH=path), mock.patch.object(llm, '_genai', return_value=genai):
+            first = llm.list_generation_models()
+            second = llm.list_generation_models()
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]['name'], 'models/flash')
+        genai.list_models.assert_called_once()
+
+
+class LLMBackendTests(TestCase):
+    def test_fake_backend_is_deterministic_and_schema_valid(self):
+        backend = llm.FakeBackend()
+        context = {'topic': 'Rust', 'duration': 6}
+        text = backend.generate('prompt', context)
+
+        self.assertEqual(text, llm.FakeBackend().generate('other prompt', context))
+        weeks = json.loads(text)['weeks']
+        self.assertEqual([week['week'] for week in weeks], [1, 2, 3, 4, 5, 6])
+        for week in weeks:
+            self.assertTrue(3 <= len(week['tasks']) <= 4)
+            for task in week['tasks']:
+                self.assertEqual(set(task), {'task', 'resources', 'videos'})
+        self.assertEqual(''.join(backend.stream('prompt', context)), text)
+
+    def test_failure_injection(self):
+        backend = llm.FakeBackend(failure_rate=1.0)
+        with self.assertRaises(llm.LLMError):
+            backend.generate('prompt', {'topic': 'Rust', 'duration': 1})
+        self.assertEqual(backend.calls, 1)
+
+    def test_replay_backend_serves_recorded_responses(self):
+        directory = tempfile.mkdtemp()
+        replay = llm.ReplayBackend(directory=directory)
+        with self.assertRaises(llm.LLMError):
+            replay.generate('prompt')
+
+        recorder = llm.ReplayBackend(directory=directory, record=True)
+        with mock.patch.object(recorder._recorder, '_generate', return_value='recorded'):
+            recorder.generate('prompt')
+        self.assertEqual(replay.generate('prompt'), 'recorded')
+
+    @override_settings(LLM_BACKEND='accounts.llm.FakeBackend')
+    def test_generation_view_runs_on_fake_backend(self):
+        generation_cache.clear()
+        cache.clear()
+        user = User.objects.create_user(username='student', password='pass12345')
+        self.client.force_login(user)
+        payload = {'topic': 'Go', 'duration': '3'}
+        result = self.client.post('/generate_curriculum/', json.dumps(payload), content_type='application/json').json()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['curriculum']['weeks']), 3)
+        self.assertGreaterEqual(Curriculum.objects.get(user=user).total_tasks, 9)
+
+
+class ExtractionTests(TestCase):
+    def test_object_format_is_not_mistaken_for_inner_tasks_array(self):
+        text = 'Sure! Here is your plan:\n```json\n' + json.dumps(SAMPLE_CURRICULUM) + '\n```\nGood luck!'
+        self.assertEqual(extract_curriculum(text), SAMPLE_CURRICULUM)
+
+    def test_prose_brackets_and_bare_week_array(self):
+        text = 'A [4 week] "plan": ' + json.dumps(SAMPLE_CURRICULUM['weeks'])
+        self.assertEqual(extract_curriculum(text), SAMPLE_CURRICULUM)
+
+    def test_truncated_output_is_repaired_to_last_complete_value(self):
+        text = json.dumps({"weeks": [
+            {"week": 1, "title": "A", "tasks": [{"task": "one"}]},
+            {"week": 2, "title": "B", "tasks": [{"task": "two"}, {"task": "thr"}]},
+        ]})
+        truncated = text[:text.index('thr') + 2]
+        weeks = extract_curriculum(truncated)['weeks']
+        self.assertEqual([week['week'] for week in weeks], [1, 2])
+        self.assertEqual([task['task'] for task in weeks[1]['tasks']], ['two'])
+
+    def test_missing_keys_are_filled(self):
+        weeks = extract_curriculum('{"weeks": [{"tasks": ["Read docs", {"title": "Build"}]},],}')['weeks']
+        self.assertEqual(weeks[0]['week'], 1)
+        self.assertEqual(weeks[0]['title'], 'Week 1')
+        self.assertEqual(weeks[0]['tasks'], [
+            {'task': 'Read docs', 'resources': [], 'videos': []},
+            {'title': 'Build', 'task': 'Build', 'resources': [], 'videos': []},
+        ])
+
+    def test_no_curriculum_raises(self):
+        with self.assertRaises(CurriculumFormatError):
+            extract_curriculum('I cannot help with that.')
+
+
+class CurriculumStructureTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rows', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_save_curriculum_builds_week_and_task_rows(self):
+        curriculum = save_curriculum(self.user, 'Python', 'beginner', 1, SAMPLE_CURRICULUM)
+        self.assertEqual(CurriculumWeek.objects.filter(curriculum=curriculum).count(), 1)
+        self.assertEqual(curriculum.total_tasks, 2)
+        self.assertEqual(curriculum.weeks_as_content(), SAMPLE_CURRICULUM['weeks'])
+
+        UserProgress.objects.create(user=self.user, curriculum=curriculum, week_number=1, task_index=1, completed=True)
+        result = self.client.get(reverse('get_curriculum_progress', args=[curriculum.id])).json()
+        self.assertEqual(result['curriculum_content'], SAMPLE_CURRICULUM['weeks'])
+        self.assertEqual(result['progress'], {
+            '1': {'0': {'completed': False, 'completed_at': None}, '1': {'completed': True, 'completed_at': None}},
+        })
+
+    def test_migration_converts_legacy_list_content(self):
+        curriculum = Curriculum.objects.create(
+            user=self.user, topic='Legacy', difficulty='beginner', duration=1,
+            content=[{'week': 1, 'title': 'Old', 'tasks': ['Read', {'task': 'Write'}]}],
+        )
+        migration = importlib.import_module('accounts.migrations.0006_populate_curriculum_structure')
+        migration.populate_structure(apps, None)
+
+        curriculum.refresh_from_db()
+        self.assertEqual(curriculum.content['weeks'][0]['title'], 'Old')
+        tasks = CurriculumTask.objects.filter(curriculum=curriculum)
+        self.assertEqual([task.task for task in tasks], ['Read', 'Write'])
+
+
+@override_settings(
+    LLM_BACKEND='accounts.llm.FakeBackend',
+    LLM_BACKEND_OPTIONS={'latency': 0.3},
+    CURRICULUM_BULK_CONCURRENCY=4,
+)
+class BulkGenerationTests(TestCase):
+    def setUp(self):
+        generation_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username='instructor', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_batch_runs_concurrently_and_reports_each_item(self):
+        specs = [{'topic': f'Module {i}', 'duration': 2} for i in range(4)]
+        specs += [{'topic': 'Module 0', 'duration': 2}, {'duration': 2}]
+
+        start = time.perf_counter()
+        response = self.client.post(reverse('generate_curriculum_bulk'), json.dumps({'curricula': specs}),
+                                    content_type='application/json')
+        elapsed = time.perf_counter() - start
+
+        results = response.json()['results']
+        self.assertLess(elapsed, 0.9)  # Sequential calls would take 1.2s
+        self.assertEqual([r['success'] for r in results], [True] * 5 + [False])
+        self.assertEqual(results[5]['error'], 'topic is required')
+        self.assertEqual(Curriculum.objects.filter(user=self.user).count(), 5)
+        curriculum = Curriculum.objects.get(id=results[0]['curriculum_id'])
+        self.assertEqual(curriculum.total_tasks, CurriculumTask.objects.filter(curriculum=curriculum).count())
+        self.assertEqual(llm.get_backend().calls, 4)  # The duplicate spec shared a call
+
+    def test_items_share_flights_and_are_counted(self):
+        metrics.reset()
+        generation_cache.set(generation_cache_key('Cached', 2, 'beginner', 'Learn the topic thoroughly'), SAMPLE_CURRICULUM)
+        in_view = generation_cache_key('Module 0', 2, 'beginner', 'Learn the topic thoroughly')
+        started = threading.Event()
+
+        def view_generation():
+            started.set()
+            time.sleep(0.3)
+            return SAMPLE_CURRICULUM
+
+        # A view in this process is already generating Module 0
+        view = threading.Thread(target=single_flight.do, args=(in_view, view_generation),
+                                kwargs={'across_processes': False})
+        view.start()
+        started.wait()
+        calls = llm.get_backend().calls
+        specs = [{'topic': 'Module 0', 'duration': 2}, {'topic': 'Module 1', 'duration': 2},
+                 {'topic': 'Module 1', 'duration': 2}, {'topic': 'Cached', 'duration': 2}]
+        results = self.client.post(reverse('generate_curriculum_bulk'), json.dumps({'curricula': specs}),
+                                   content_type='application/json').json()['results']
+        view.join()
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(Curriculum.objects.get(id=results[0]['curriculum_id']).content, SAMPLE_CURRICULUM)
+        self.assertEqual(llm.get_backend().calls - calls, 1)  # Only Module 1 reached the LLM
+        self.assertEqual(metrics.generations.value(result='generated'), 3)
+        self.assertEqual(metrics.generations.value(result='cached'), 1)
+        self.assertFalse(GenerationLease.objects.exists())
+
+
+class _LinkHandler(BaseHTTPRequestHandler):
+    """Local stand-in for resource hosts: /ok answers 200, anything else 404"""
+    requests_seen = []
+
+    def do_HEAD(self):
+        self.requests_seen.append(self.path)
+        if self.path.startswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Location', f'http://localhost:{self.server.server_address[1]}/ok/internal')
+            self.end_headers()
+            return
+        time.sleep(0.2)
+        self.send_response(200 if self.path.startswith('/ok') else 404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(LINK_CHECK_PER_HOST=8, LINK_CHECK_TTL=60, LINK_CHECK_ALLOWED_HOSTS=['127.0.0.1'])
+class LinkValidationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _LinkHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _LinkHandler.requests_seen = []
+
+    def test_links_are_checked_concurrently_and_cached(self):
+        urls = [f'{self.base}/ok/{i}' for i in range(6)] + [f'{self.base}/missing']
+        start = time.perf_counter()
+        results = LinkValidator().check(urls)
+        self.assertLess(time.perf_counter() - start, 1.0)  # Sequential checks would take 1.4s
+        self.assertEqual(results, {**{url: True for url in urls[:6]}, urls[6]: False})
+        self.assertEqual(LinkCheck.objects.get(url=urls[6]).status_code, 404)
+
+        _LinkHandler.requests_seen = []
+        self.assertEqual(LinkValidator().check(urls), results)
+        self.assertEqual(_LinkHandler.requests_seen, [])
+
+    def test_internal_addresses_are_never_requested(self):
+        validator = LinkValidator()
+        for url in ('http://10.0.0.1/', 'http://169.254.169.254/latest/meta-data/', 'http://[::1]:8000/',
+                    'http://localhost/admin'):
+            self.assertEqual(validator.probe(url), (False, None, 'Blocked address'), url)
+
+        # A public-looking link may not redirect into the internal network either
+        self.assertEqual(validator.probe(f'{self.base}/redirect'), (False, None, 'Blocked address'))
+        self.assertEqual(_LinkHandler.requests_seen, ['/redirect'])
+
+        self.assertTrue(is_trusted_host('ocw.mit.edu'))
+        self.assertFalse(is_trusted_host('mit.edu.attacker.com'))
+
+    def test_saving_a_curriculum_validates_links_after_commit(self):
+        user = User.objects.create_user(username='links', password='pass12345')
+        content = copy.deepcopy(SAMPLE_CURRICULUM)
+        content['weeks'][0]['tasks'][0]['resources'] = [f'{self.base}/ok/docs']
+        validator = mock.Mock()
+        with mock.patch('accounts.links.link_validator', validator), \
+                self.captureOnCommitCallbacks(execute=True):
+            save_curriculum(user, 'Python', 'beginner', 1, content)
+        validator.revalidate_in_background.assert_called_once_with([f'{self.base}/ok/docs'])
+
+
+@override_settings(LLM_BACKEND='accounts.llm.FakeBackend')
+class CurriculumExtensionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='extend', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Rust', 'duration': 2})}
+        self.curriculum = save_curriculum(self.user, 'Rust', 'beginner', 2, content)
+        UserProgress.objects.create(user=self.user, curriculum=self.curriculum, week_number=1, task_index=0, completed=True)
+        UserProgress.objects.create(user=self.user, curriculum=self.curriculum, week_number=2, task_index=0, completed=True)
+
+    def test_extend_generates_only_new_weeks_and_keeps_progress(self):
+        backend = llm.get_backend()
+        with mock.patch.object(backend, 'generate', wraps=backend.generate) as generate:
+            response = self.client.post(reverse('extend_curriculum', args=[self.curriculum.id]),
+                                        json.dumps({'weeks': 2}), content_type='application/json')
+
+        prompt, context = generate.call_args[0]
+        self.assertEqual((context['first_week'], context['last_week']), (3, 4))
+        self.assertIn('Week 1: Rust', prompt)
+        self.assertNotIn('exercise', prompt)  # Only titles are sent, not the existing tasks
+
+        result = response.json()
+        self.assertEqual([week['week'] for week in result['curriculum_content']], [1, 2, 3, 4])
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.duration, '4')
+        self.assertEqual(self.curriculum.completed_tasks, 2)
+        self.assertEqual(self.curriculum.total_tasks, CurriculumTask.objects.filter(curriculum=self.curriculum).count())
+
+    def test_regenerate_week_resets_only_that_weeks_progress(self):
+        untouched = CurriculumWeek.objects.get(curriculum=self.curriculum, week_number=1)
+        response = self.client.post(reverse('regenerate_week', args=[self.curriculum.id, 2]))
+        self.assertEqual(response.json()['week']['week'], 2)
+
+        self.assertTrue(CurriculumWeek.objects.filter(pk=untouched.pk).exists())
+        self.assertEqual(list(UserProgress.objects.filter(curriculum=self.curriculum).values_list('week_number', flat=True)), [1])
+        self.assertEqual(self.client.post(reverse('regenerate_week', args=[self.curriculum.id, 9])).status_code, 404)
+
+    def test_backend_failures_come_back_as_json(self):
+        backend = llm.get_backend()
+        with mock.patch.object(backend, 'generate', side_effect=llm.LLMError('quota exceeded')):
+            response = self.client.post(reverse('regenerate_week', args=[self.curriculum.id, 2]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'success': False, 'error': 'quota exceeded'})
+
+
+@override_settings(
+    LLM_BACKEND='accounts.llm.FakeBackend',
+    LLM_BACKEND_OPTIONS={'latency': 0.2},
+    CURRICULUM_CHUNK_THRESHOLD=8,
+    CURRICULUM_CHUNK_WEEKS=4,
+    CURRICULUM_CHUNK_CONCURRENCY=6,
+)
+class ChunkedGenerationTests(TestCase):
+    def setUp(self):
+        generation_cache.clear()
+
+    def test_long_curriculum_is_outlined_then_generated_in_parallel_chunks(self):
+        start = time.perf_counter()
+        content, cached = generate_curriculum_content('Systems Design', 24, 'advanced', 'goal')
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([week['week'] for week in content['weeks']], list(range(1, 25)))
+        self.assertTrue(all(week['tasks'] for week in content['weeks']))
+        self.assertEqual(llm.get_backend().calls, 7)  # Outline + six 4-week chunks
+        self.assertLess(elapsed, 1.0)  # Sequential calls would take 1.4s
+
+    def test_truncated_chunk_asks_again_for_the_missing_weeks(self):
+        backend = llm.get_backend()
+        real_generate = backend.generate
+        truncated = []
+
+        def generate(prompt, context):
+            text = real_generate(prompt, context)
+            if context.get('first_week') == 5 and not truncated:
+                truncated.append(context)
+                return text[:len(text) * 2 // 3]  # Cut off part-way through the chunk
+            return text
+
+        with mock.patch.object(backend, 'generate', side_effect=generate):
+            content, _ = generate_curriculum_content('Compilers', 12, 'advanced', 'goal')
+
+        self.assertEqual(truncated[0]['last_week'], 8)
+        self.assertEqual([week['week'] for week in content['weeks']], list(range(1, 13)))
+        # The week that was cut off is asked for again rather than kept with only some of its tasks
+        expected = backend.build_weeks({'topic': 'Compilers', 'first_week': 1, 'last_week': 12})
+        self.assertEqual([len(week['tasks']) for week in content['weeks']],
+                         [len(week['tasks']) for week in expected])
+
+    @override_settings(CURRICULUM_CHUNK_THRESHOLD=20)
+    def test_truncated_output_missing_weeks_is_not_cached(self):
+        backend = llm.get_backend()
+        real_generate = backend.generate
+
+        def generate(prompt, context):
+            text = real_generate(prompt, context)
+            return text[:len(text) // 2]
+
+        with mock.patch.object(backend, 'generate', side_effect=generate), \
+                self.assertLogs('accounts.generation', 'WARNING'):
+            content, _ = generate_curriculum_content('Compilers', 4, 'advanced', 'goal')
+        self.assertLess(len(content['weeks']), 4)
+        self.assertIsNone(generation_cache.get(generation_cache_key('Compilers', 4, 'advanced', 'goal')))
+
+
+@override_settings(
+    LLM_BACKEND='accounts.llm.FakeBackend',
+    GENERATION_RATE_BURST=2,
+    GENERATION_RATE_PER_MINUTE=6,
+    GENERATION_MAX_IN_FLIGHT=1,
+    GENERATION_QUEUE_TIMEOUT=0,
+)
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        generation_cache.clear()
+        self.user = User.objects.create_user(username='busy', password='pass12345')
+        self.client.force_login(self.user)
+
+    def generate(self, topic):
+        return self.client.post(reverse('generate_curriculum'), json.dumps({'topic': topic, 'duration': 1}),
+                                content_type='application/json')
+
+    def test_token_bucket_rejects_bursts_with_retry_after(self):
+        self.assertEqual(self.generate('A').status_code, 200)
+        self.assertEqual(self.generate('B').status_code, 200)
+        response = self.generate('C')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')  # One token refills every 10s
+
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.client.force_login(other)
+        self.assertEqual(self.generate('C').status_code, 200)
+
+    @override_settings(GENERATION_RATE_BURST=5, LLM_BACKEND='accounts.llm.FakeBackend')
+    def test_every_llm_call_holds_a_slot(self):
+        backend = llm.FakeBackend()
+        seen = []
+        real_generate = backend.generate
+        backend.generate = lambda prompt, context: seen.append(throttling.in_flight()) or real_generate(prompt, context)
+        with mock.patch('accounts.llm.get_backend', return_value=backend):
+            self.assertEqual(self.generate('A').status_code, 200)
+            response = self.client.post(reverse('generate_curriculum_bulk'), json.dumps({'curricula': [
+                {'topic': 'B', 'duration': 1}, {'topic': 'C', 'duration': 1},
+            ]}), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(len(seen), 3)
+        self.assertTrue(all(count >= 1 for count in seen))
+        self.assertEqual(throttling.in_flight(), 0)
+
+    @override_settings(GENERATION_RATE_BURST=5, GENERATION_MAX_IN_FLIGHT=1, GENERATION_QUEUE_TIMEOUT=0,
+                       LLM_BACKEND='accounts.llm.FakeBackend')
+    def test_busy_generator_rejects_views_and_requeues_jobs(self):
+        slot = throttling.acquire_slot()
+        response = self.generate('A')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        stream = self.client.get(reverse('generate_curriculum_stream'), {'topic': 'Go', 'duration': 1})
+        self.assertIn(b'event: error', b''.join(stream))
+
+        job = enqueue_generation_job(self.user, 'Rust', 1, 'beginner', '')
+        job = run_generation_job(claim_next_job())
+        self.assertEqual(job.status, 'pending')
+        self.assertIsNone(job.started_at)
+
+        throttling.release_slot(slot)
+        self.assertEqual(self.generate('A').status_code, 200)
+        self.assertEqual(run_generation_job(claim_next_job()).status, 'succeeded')
+
+    @override_settings(GENERATION_MAX_IN_FLIGHT=1, GENERATION_SLOT_TTL=1)
+    def test_leaked_slots_expire(self):
+        leaked = throttling.acquire_slot()
+        self.assertIsNone(throttling.acquire_slot(timeout=0))
+        time.sleep(1.1)
+        slot = throttling.acquire_slot(timeout=0)
+        self.assertIsNotNone(slot)
+        # Releasing the expired lease must not free the slot someone else now holds
+        throttling.release_slot(leaked)
+        self.assertEqual(throttling.in_flight(), 1)
+        throttling.release_slot(slot)
+        self.assertEqual(throttling.in_flight(), 0)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        generation_cache.clear()
+        metrics.reset()
+
+    def login_admin(self):
+        admin = AdminUser.objects.create(username='ops', email='ops@example.com', full_name='Ops')
+        AdminSession.objects.create(admin_user=admin, session_key='metrics-session', ip_address='127.0.0.1',
+                                    user_agent='', expires_at=timezone.now() + timezone.timedelta(hours=1))
+        session = self.client.session
+        session['admin_session_key'] = 'metrics-session'
+        session['admin_user_id'] = admin.id
+        session.save()
+
+    @override_settings(LLM_BACKEND='accounts.llm.FakeBackend')
+    def test_stages_are_recorded_and_exposed_to_admins(self):
+        user = User.objects.create_user(username='measured', password='pass12345')
+        self.client.force_login(user)
+        self.client.post(reverse('generate_curriculum'), json.dumps({'topic': 'Go', 'duration': 2}),
+                         content_type='application/json')
+        with mock.patch('accounts.llm.get_backend', fake_backend('not json')):
+            self.client.post(reverse('generate_curriculum'), json.dumps({'topic': 'Bad', 'duration': 2}),
+                             content_type='application/json')
+
+        for stage in ('llm', 'parse', 'persist', 'progress'):
+            self.assertGreaterEqual(metrics.stage_seconds.count(stage=stage), 1, stage)
+        self.assertEqual(metrics.parse_failures.value(), 1)
+        self.assertEqual(metrics.generations.value(result='failed'), 1)
+
+        self.assertEqual(self.client.get(reverse('admin_metrics')).status_code, 302)
+        self.login_admin()
+        body = self.client.get(reverse('admin_metrics')).content.decode()
+        self.assertIn('# TYPE curriculum_generation_stage_seconds histogram', body)
+        self.assertIn('curriculum_generation_stage_seconds_count{stage="llm"} 2', body)
+        self.assertIn('curriculum_llm_calls_total{kind="full",outcome="ok"} 2', body)
+        self.assertIn('curriculum_parse_failures_total 1', body)
+
+
+class ProgressCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='toggler', password='pass12345')
+        self.client.force_login(self.user)
+
+    def make_curriculum(self, weeks):
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Scala', 'duration': weeks})}
+        return save_curriculum(self.user, 'Scala', 'beginner', weeks, content)
+
+    def toggle(self, curriculum, task_index, completed):
+        return self.client.post(reverse('update_progress'), json.dumps({
+            'curriculum_id': curriculum.id, 'week_number': 1, 'task_index': task_index, 'is_completed': completed,
+        }), content_type='application/json').json()
+
+    def test_toggles_apply_deltas_only_when_state_changes(self):
+        curriculum = self.make_curriculum(2)
+        total = curriculum.total_tasks
+        self.assertEqual(self.toggle(curriculum, 0, True)['progress_percentage'], 100.0 / total)
+        self.toggle(curriculum, 0, True)  # Repeated click: no change
+        self.toggle(curriculum, 1, True)
+        self.toggle(curriculum, 1, False)
+        self.toggle(curriculum, 2, False)  # Unchecking a never-checked task
+
+        curriculum.refresh_from_db()
+        self.assertEqual((curriculum.total_tasks, curriculum.completed_tasks), (total, 1))
+        self.assertAlmostEqual(curriculum.progress_percentage, 100.0 / total)
+
+    def test_toggle_queries_do_not_grow_with_curriculum_size(self):
+        small, large = self.make_curriculum(1), self.make_curriculum(40)
+        self.toggle(small, 0, True)
+        self.toggle(large, 0, True)
+        with CaptureQueriesContext(connection) as small_queries:
+            self.toggle(small, 1, True)
+        with CaptureQueriesContext(connection) as large_queries:
+            self.toggle(large, 1, True)
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertFalse(any('"content"' in query['sql'] for query in large_queries))
+
+    def test_reconcile_repairs_drift(self):
+        curriculum = self.make_curriculum(1)
+        UserProgress.objects.create(user=self.user, curriculum=curriculum, week_number=1, task_index=0, completed=True)
+        Curriculum.objects.filter(pk=curriculum.pk).update(completed_tasks=3, total_tasks=99)
+        consistent = self.make_curriculum(2)
+
+        out = StringIO()
+        call_command('reconcile_progress', '--dry-run', stdout=out)
+        self.assertIn('1 of 2 curricula would be repaired', out.getvalue())
+
+        out = StringIO()
+        call_command('reconcile_progress', '--batch-size', '1', stdout=out)
+        curriculum.refresh_from_db()
+        self.assertEqual(curriculum.completed_tasks, 1)
+        self.assertEqual(curriculum.total_tasks, CurriculumTask.objects.filter(curriculum=curriculum).count())
+        self.assertIn('1 of 2 curricula repaired', out.getvalue())
+        self.assertEqual(Curriculum.objects.get(pk=consistent.pk).total_tasks, consistent.total_tasks)
+
+
+class ProgressMapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mapper', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_progress_endpoint_query_budget_is_independent_of_size(self):
+        for weeks in (1, 12):
+            content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Kotlin', 'duration': weeks})}
+            curriculum = save_curriculum(self.user, 'Kotlin', 'beginner', weeks, content)
+            UserProgress.objects.bulk_create([
+                UserProgress(user=self.user, curriculum=curriculum, week_number=w, task_index=0, completed=True,
+                             completed_at=timezone.now())
+                for w in range(1, weeks + 1)
+            ])
+            # Session, user, curriculum, progress rows, weeks, tasks
+            with self.assertNumQueries(6):
+                result = self.client.get(reverse('get_curriculum_progress', args=[curriculum.id])).json()
+            self.assertEqual(len(result['progress']), weeks)
+            self.assertTrue(result['progress'][str(weeks)]['0']['completed'])
+            self.assertFalse(result['progress'][str(weeks)]['1']['completed'])
+
+
+class ProgressBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='offline', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Elixir', 'duration': 2})}
+        self.curriculum = save_curriculum(self.user, 'Elixir', 'beginner', 2, content)
+
+    def sync(self, changes):
+        return self.client.post(reverse('update_progress_batch'), json.dumps({
+            'curriculum_id': self.curriculum.id, 'changes': changes,
+        }), content_type='application/json').json()
+
+    def test_batch_applies_changes_and_recomputes_once(self):
+        week_tasks = CurriculumTask.objects.filter(curriculum=self.curriculum, week_number=1).count()
+        changes = [{'week_number': 1, 'task_index': i, 'completed': True, 'client_timestamp': 1700000000000 + i}
+                   for i in range(week_tasks)]
+        with self.assertNumQueries(12):  # Independent of the batch size
+            result = self.sync(changes + [{'week_number': 9, 'task_index': 0, 'completed': True}])
+
+        self.assertEqual(result['results'], ['applied'] * week_tasks + ['unknown_task'])
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.completed_tasks, week_tasks)
+        self.assertAlmostEqual(result['progress_percentage'], week_tasks * 100.0 / self.curriculum.total_tasks)
+        self.assertEqual(UserProgress.objects.get(week_number=1, task_index=0).completed_at.year, 2023)
+
+    def test_newest_change_wins(self):
+        # A toggle made on the web now beats an older offline change to the same task
+        self.client.post(reverse('update_progress'), json.dumps({
+            'curriculum_id': self.curriculum.id, 'week_number': 1, 'task_index': 0, 'is_completed': True,
+        }), content_type='application/json')
+        result = self.sync([
+            {'week_number': 1, 'task_index': 0, 'completed': False, 'client_timestamp': '2024-01-01T00:00:00Z'},
+            {'week_number': 1, 'task_index': 1, 'completed': True, 'client_timestamp': '2024-01-01T00:00:05Z'},
+            {'week_number': 1, 'task_index': 1, 'completed': False, 'client_timestamp': '2024-01-01T00:00:01Z'},
+        ])
+        self.assertEqual(result['results'], ['stale', 'applied', 'stale'])
+        self.assertTrue(UserProgress.objects.get(week_number=1, task_index=0).completed)
+        self.assertTrue(UserProgress.objects.get(week_number=1, task_index=1).completed)
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.completed_tasks, 2)
+
+        self.assertEqual(self.sync([{'week_number': 1, 'completed': True}])['success'], False)
+        for curriculum_id in ('abc', None, [1]):
+            response = self.client.post(reverse('update_progress_batch'), json.dumps({
+                'curriculum_id': curriculum_id, 'changes': [],
+            }), content_type='application/json')
+            self.assertEqual(response.status_code, 400, curriculum_id)
+        for timestamp in (1e20, -1e20, float('inf'), float('nan')):
+            result = self.sync([{'week_number': 1, 'task_index': 0, 'completed': True, 'client_timestamp': timestamp}])
+            self.assertEqual(result['success'], False, timestamp)
+
+
+class ProgressBitmapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='compact', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Haskell', 'duration': 3})}
+        self.curriculum = save_curriculum(self.user, 'Haskell', 'beginner', 3, content)
+
+    def test_bits_follow_week_and_task_order_and_grow_when_needed(self):
+        bitmap = ProgressBitmap(curriculum=self.curriculum, stride=4)
+        self.assertTrue(bitmap.set(1, 0, True))
+        self.assertFalse(bitmap.set(1, 0, True))
+        bitmap.set(2, 3, True)
+        self.assertEqual(bytes(bitmap.bits), bytes([0b10000001]))
+        bitmap.set_times(2, 3, timezone.now(), timezone.now())
+
+        bitmap.set(3, 5, True)  # Wider than the stride: everything is re-laid out
+        self.assertEqual(bitmap.stride, 8)
+        self.assertEqual(bitmap.completed_keys(), [(1, 0), (2, 3), (3, 5)])
+        self.assertIsNotNone(bitmap.get_times(2, 3)[0])
+        self.assertEqual(bitmap.count(), 3)
+
+    def test_toggles_for_unknown_tasks_are_rejected(self):
+        for storage in ('bitmap', 'rows'):
+            with override_settings(PROGRESS_STORAGE=storage):
+                for week_number, task_index in ((2000000, 0), (1, 100000), (1, 99)):
+                    response = self.client.post(reverse('update_progress'), json.dumps({
+                        'curriculum_id': self.curriculum.id, 'week_number': week_number, 'task_index': task_index,
+                        'is_completed': True,
+                    }), content_type='application/json')
+                    self.assertEqual(response.status_code, 400, storage)
+        self.assertFalse(ProgressBitmap.objects.exists())
+        self.assertFalse(UserProgress.objects.exists())
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.completed_tasks, 0)
+
+    @override_settings(PROGRESS_STORAGE='bitmap')
+    def test_endpoints_use_the_bitmap_instead_of_rows(self):
+        self.client.post(reverse('update_progress'), json.dumps({
+            'curriculum_id': self.curriculum.id, 'week_number': 1, 'task_index': 1, 'is_completed': True,
+        }), content_type='application/json')
+        self.client.post(reverse('update_progress_batch'), json.dumps({'curriculum_id': self.curriculum.id, 'changes': [
+            {'week_number': 2, 'task_index': 0, 'completed': True},
+            {'week_number': 1, 'task_index': 1, 'completed': False, 'client_timestamp': '2020-01-01T00:00:00Z'},
+        ]}), content_type='application/json')
+
+        self.assertFalse(UserProgress.objects.exists())
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.completed_tasks, 2)
+        progress = self.client.get(reverse('get_curriculum_progress', args=[self.curriculum.id])).json()['progress']
+        self.assertTrue(progress['1']['1']['completed'])
+        self.assertIsNotNone(progress['1']['1']['completed_at'])
+        self.assertFalse(progress['1']['0']['completed'])
+
+        with override_settings(LLM_BACKEND='accounts.llm.FakeBackend'):
+            self.client.post(reverse('regenerate_week', args=[self.curriculum.id, 1]))
+        self.assertEqual(ProgressBitmap.objects.get().completed_keys(), [(2, 0)])
+
+    def test_migrate_progress_storage_round_trip(self):
+        toggled_at = timezone.now()
+        UserProgress.objects.create(user=self.user, curriculum=self.curriculum, week_number=2, task_index=2,
+                                    completed=True, completed_at=toggled_at, changed_at=toggled_at)
+        UserProgress.objects.create(user=self.user, curriculum=self.curriculum, week_number=1, task_index=0,
+                                    completed=False, changed_at=toggled_at)
+
+        call_command('migrate_progress_storage', '--to', 'bitmap', '--delete-source', stdout=StringIO())
+        self.assertFalse(UserProgress.objects.exists())
+        with override_settings(PROGRESS_STORAGE='bitmap'):
+            self.curriculum.update_progress()
+        self.assertEqual(self.curriculum.completed_tasks, 1)
+
+        call_command('migrate_progress_storage', '--to', 'rows', '--delete-source', stdout=StringIO())
+        self.assertFalse(ProgressBitmap.objects.exists())
+        rows = list(UserProgress.objects.values_list('week_number', 'task_index', 'completed', 'completed_at'))
+        self.assertEqual(rows, [(1, 0, False, None), (2, 2, True, toggled_at)])
+
+
+class ProgressDeltaSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rate-limit buckets live in the default cache
+        self.user = User.objects.create_user(username='poller', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Scala', 'duration': 2})}
+        self.curriculum = save_curriculum(self.user, 'Scala', 'beginner', 2, content)
+
+    def poll(self, since=None):
+        url = reverse('get_curriculum_progress', args=[self.curriculum.id])
+        return self.client.get(url, {'since': since} if since else {}).json()
+
+    def toggle(self, week_number, task_index, completed):
+        self.client.post(reverse('update_progress'), json.dumps({
+            'curriculum_id': self.curriculum.id, 'week_number': week_number, 'task_index': task_index,
+            'is_completed': completed,
+        }), content_type='application/json')
+
+    def check_delta_sync(self):
+        full = self.poll()
+        self.assertFalse(full['delta'])
+        self.assertIn('curriculum_content', full)
+
+        unchanged = self.poll(full['cursor'])
+        self.assertEqual((unchanged['delta'], unchanged['progress'], unchanged['cursor']), (True, {}, full['cursor']))
+        self.assertNotIn('curriculum_content', unchanged)
+
+        self.toggle(1, 0, True)
+        self.toggle(2, 1, True)
+        self.toggle(2, 1, False)
+        delta = self.poll(full['cursor'])
+        self.assertEqual(set(delta['progress']), {'1', '2'})
+        self.assertTrue(delta['progress']['1']['0']['completed'])
+        self.assertFalse(delta['progress']['2']['1']['completed'])
+        self.assertEqual(self.poll(delta['cursor'])['progress'], {})
+
+        # New weeks invalidate the cursor, so the client reloads everything
+        with override_settings(LLM_BACKEND='accounts.llm.FakeBackend'):
+            self.client.post(reverse('extend_curriculum', args=[self.curriculum.id]), json.dumps({'weeks': 1}),
+                             content_type='application/json')
+        reloaded = self.poll(delta['cursor'])
+        self.assertFalse(reloaded['delta'])
+        self.assertEqual(len(reloaded['curriculum_content']), 3)
+        self.assertFalse(self.poll('garbage')['delta'])
+
+    def test_rows_delta_sync(self):
+        self.check_delta_sync()
+        self.assertEqual(sorted(UserProgress.objects.values_list('seq', flat=True)), [1, 3])
+
+    @override_settings(PROGRESS_STORAGE='bitmap')
+    def test_bitmap_delta_sync(self):
+        self.check_delta_sync()
+
+
+@override_settings(PROGRESS_WRITE_BEHIND=True, PROGRESS_FLUSH_INTERVAL_MS=0)
+class ProgressWriteBehindTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='clicker', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Kotlin', 'duration': 2})}
+        self.curriculum = save_curriculum(self.user, 'Kotlin', 'beginner', 2, content)
+        self.buffer = progress_buffer
+        self.addCleanup(self.buffer.flush)
+
+    def toggle(self, task_index, completed):
+        return self.client.post(reverse('update_progress'), json.dumps({
+            'curriculum_id': self.curriculum.id, 'week_number': 1, 'task_index': task_index, 'is_completed': completed,
+        }), content_type='application/json').json()
+
+    def test_toggles_are_coalesced_and_read_back_before_flush(self):
+        for completed in (True, False, True):
+            response = self.toggle(0, completed)
+        self.toggle(1, True)
+        self.toggle(1, False)
+
+        self.assertFalse(UserProgress.objects.exists())
+        self.assertAlmostEqual(response['progress_percentage'], 100.0 / self.curriculum.total_tasks)
+        data = self.client.get(reverse('get_curriculum_progress', args=[self.curriculum.id])).json()
+        self.assertTrue(data['progress']['1']['0']['completed'])
+        self.assertFalse(data['progress']['1']['1']['completed'])
+        self.assertAlmostEqual(data['overall_percentage'], 100.0 / self.curriculum.total_tasks)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(
+            sorted(UserProgress.objects.values_list('task_index', 'completed')), [(0, True), (1, False)]
+        )
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.completed_tasks, 1)
+
+    @override_settings(PROGRESS_FLUSH_MAX_PENDING=3)
+    def test_flushes_when_the_buffer_fills_up(self):
+        for task_index in range(3):
+            self.toggle(task_index, True)
+        self.assertEqual(UserProgress.objects.filter(completed=True).count(), 3)
+        self.assertEqual(self.buffer.pending(self.user, self.curriculum), {})
+
+    def test_weeks_discarded_during_a_flush_are_not_written(self):
+        other = save_curriculum(self.user, 'Kotlin', 'beginner', 2, self.curriculum.content)
+        self.buffer.record(self.user, other, 1, 0, True)
+        self.buffer.record(self.user, self.curriculum, 1, 0, True)
+        self.buffer.record(self.user, self.curriculum, 2, 0, True)
+
+        real_apply = apply_progress_changes
+
+        def apply_then_regenerate(user, curriculum, changes):
+            if curriculum.pk == other.pk:
+                # Week 1 of the next curriculum is replaced while this one is written
+                self.buffer.discard(self.curriculum, 1)
+                self.assertEqual(set(self.buffer.pending(self.user, self.curriculum)), {(2, 0)})
+            return real_apply(user, curriculum, changes)
+
+        # Groups are written in the order they were first recorded, so the other curriculum goes first
+        with mock.patch('accounts.progress.apply_progress_changes', side_effect=apply_then_regenerate):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(sorted(UserProgress.objects.values_list('curriculum', 'week_number')),
+                         sorted([(other.pk, 1), (self.curriculum.pk, 2)]))
+
+
+class PdfCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Rust', 'duration': 2})}
+        self.curriculum = save_curriculum(self.user, 'Rust', 'beginner', 2, content)
+        self.cache_dir = tempfile.mkdtemp()
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir, PDF_RENDER_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def download(self, **headers):
+        return self.client.get(reverse('download_curriculum_pdf', args=[self.curriculum.id]), headers=headers)
+
+    def test_repeat_downloads_are_served_from_disk_until_progress_changes(self):
+        with mock.patch('accounts.pdf.render_pdf', wraps=render_pdf) as render:
+            first = self.download()
+            body = b''.join(first.streaming_content)
+            self.assertTrue(body.startswith(b'%PDF'))
+            self.assertEqual(b''.join(self.download().streaming_content), body)
+            self.assertEqual(render.call_count, 1)
+
+            self.assertEqual(self.download(if_none_match=first['ETag']).status_code, 304)
+
+            self.client.post(reverse('update_progress'), json.dumps({
+                'curriculum_id': self.curriculum.id, 'week_number': 1, 'task_index': 0, 'is_completed': True,
+            }), content_type='application/json')
+            changed = self.download(if_none_match=first['ETag'])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], first['ETag'])
+            b''.join(changed.streaming_content)
+            self.assertEqual(render.call_count, 2)
+
+        # Only the latest render is kept
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, str(self.curriculum.id))),
+                         [changed['ETag'].strip('"') + '.pdf'])
+
+    def test_storing_a_render_keeps_newer_and_open_renders(self):
+        directory = os.path.join(self.cache_dir, str(self.curriculum.id))
+        store_pdf(self.curriculum.id, 'newer', b'%PDF newer')
+        serving = open_cached_pdf(self.curriculum, 'newer')
+        self.addCleanup(serving.close)
+        later = time.time_ns() + 10 ** 9
+        os.utime(os.path.join(directory, 'newer.pdf'), ns=(later, later))
+
+        # A slower request finishing an older key must not prune the newer render
+        store_pdf(self.curriculum.id, 'stale', b'%PDF stale')
+        self.assertEqual(sorted(os.listdir(directory)), ['newer.pdf', 'stale.pdf'])
+
+        for name in ('newer.pdf', 'stale.pdf'):
+            os.utime(os.path.join(directory, name), ns=(0, 0))
+        store_pdf(self.curriculum.id, 'latest', b'%PDF latest')
+        self.assertEqual(os.listdir(directory), ['latest.pdf'])
+        # A reader that opened a pruned file still gets all of it; later ones miss and re-render
+        self.assertEqual(serving.read(), b'%PDF newer')
+        self.assertIsNone(open_cached_pdf(self.curriculum, 'newer'))
+
+    def test_builder_escapes_markup_in_task_text(self):
+        document = {
+            'topic': 'C & <C++>', 'duration': '1 week', 'difficulty': 'beginner', 'progress_percentage': 50.0,
+            'weeks': [{'week_number': 1, 'title': 'Templates <T>', 'description': 'a < b && c', 'videos': [],
+                       'tasks': [('Read <vector> & <map>', True), ('Write a <b>bold</b> claim', False)]}],
+        }
+        self.assertTrue(render_pdf(document).startswith(b'%PDF'))
+
+    @override_settings(PDF_RENDER_WORKERS=1, PDF_RENDER_WAIT_MS=0)
+    def test_slow_renders_continue_in_the_pool_while_the_client_polls(self):
+        self.addCleanup(render_pool.shutdown)
+        pending = self.download()
+        self.assertEqual(pending.status_code, 202)
+        self.assertTrue(pending.json()['download_url'].endswith(
+            reverse('download_curriculum_pdf', args=[self.curriculum.id])
+        ))
+
+        deadline = time.monotonic() + 60
+        response = pending
+        while response.status_code == 202 and time.monotonic() < deadline:
+            time.sleep(0.1)
+            response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exported', password='pass12345')
+        for topic in ('Lua', 'Zig'):
+            content = {'weeks': llm.FakeBackend().build_weeks({'topic': topic, 'duration': 2})}
+            curriculum = save_curriculum(self.user, topic, 'beginner', 2, content)
+        toggle_progress(self.user, curriculum, 1, 0, True)
+        CurriculumFeedback.objects.create(user=self.user, curriculum=curriculum, rating=4, feedback_text='Nice')
+
+    def login_admin(self):
+        admin = AdminUser.objects.create(username='ops', email='ops@example.com', full_name='Ops')
+        AdminSession.objects.create(admin_user=admin, session_key='export-session', ip_address='127.0.0.1',
+                                    user_agent='', expires_at=timezone.now() + timezone.timedelta(hours=1))
+        session = self.client.session
+        session['admin_session_key'] = 'export-session'
+        session['admin_user_id'] = admin.id
+        session.save()
+
+    def read_jsonl(self, archive, name):
+        return [json.loads(line) for line in archive.read(name).decode().splitlines()]
+
+    def test_admin_export_streams_a_zip_of_json_lines(self):
+        self.assertEqual(self.client.get(reverse('admin_export_curricula')).status_code, 302)
+        self.login_admin()
+        response = self.client.get(reverse('admin_export_curricula'), {'pdfs': '1'})
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+        curricula = self.read_jsonl(archive, 'curricula.jsonl')
+        self.assertEqual([c['topic'] for c in curricula], ['Lua', 'Zig'])
+        self.assertEqual(curricula[0]['username'], 'exported')
+        self.assertEqual(len(curricula[0]['content']['weeks']), 2)
+        progress = self.read_jsonl(archive, 'progress.jsonl')
+        self.assertEqual([(p['week_number'], p['task_index'], p['completed']) for p in progress], [(1, 0, True)])
+        self.assertEqual(self.read_jsonl(archive, 'feedback.jsonl')[0]['feedback_text'], 'Nice')
+        # PDFs are rendered by the command only, never in the request
+        self.assertFalse(any(name.startswith('pdf/') for name in archive.namelist()))
+
+    def test_export_command_reuses_cached_pdfs(self):
+        cache_dir = tempfile.mkdtemp()
+        output = os.path.join(cache_dir, 'export.zip')
+        with override_settings(PDF_CACHE_DIR=cache_dir, PDF_RENDER_WORKERS=0), \
+                mock.patch('accounts.pdf.render_pdf', wraps=render_pdf) as render:
+            call_command('export_curricula', '--output', output, '--pdfs', stdout=StringIO())
+            self.assertEqual(render.call_count, 2)
+            call_command('export_curricula', '--output', output, '--pdfs', stdout=StringIO())
+            self.assertEqual(render.call_count, 2)
+
+        with zipfile.ZipFile(output) as archive:
+            ids = [c['id'] for c in self.read_jsonl(archive, 'curricula.jsonl')]
+            pdfs = [name for name in archive.namelist() if name.startswith('pdf/')]
+            self.assertEqual(pdfs, [f'pdf/{i}.pdf' for i in ids])
+            for i in ids:
+                self.assertTrue(archive.read(f'pdf/{i}.pdf').startswith(b'%PDF'))
+
+    @override_settings(PROGRESS_STORAGE='bitmap')
+    def test_export_command_reads_the_configured_progress_store(self):
+        call_command('migrate_progress_storage', '--to', 'bitmap', stdout=StringIO())
+        output = os.path.join(tempfile.mkdtemp(), 'export.zip')
+        call_command('export_curricula', '--output', output, '--chunk-size', '1', stdout=StringIO())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), ['curricula.jsonl', 'progress.jsonl', 'feedback.jsonl'])
+            progress = self.read_jsonl(archive, 'progress.jsonl')
+        self.assertEqual([(p['week_number'], p['task_index'], p['completed']) for p in progress], [(1, 0, True)])
+
+
+class ExportFormatTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='notetaker', password='pass12345')
+        self.client.force_login(self.user)
+        content = {'weeks': llm.FakeBackend().build_weeks({'topic': 'Nim', 'duration': 3})}
+        self.curriculum = save_curriculum(self.user, 'Nim, Part 1', 'beginner', 3, content)
+        toggle_progress(self.user, self.curriculum, 2, 0, True)
+
+    def download(self, export_format):
+        response = self.client.get(reverse('download_curriculum', args=[self.curriculum.id, export_format]))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8'), response
+
+    def test_markdown_and_json_follow_the_normalized_weeks(self):
+        markdown, response = self.download('markdown')
+        self.assertTrue(response['Content-Type'].startswith('text/markdown'))
+        self.assertIn('.md"', response['Content-Disposition'])
+        self.assertTrue(markdown.startswith('# Nim, Part 1 Curriculum'))
+        self.assertEqual(markdown.count('\n## Week '), 3)
+        self.assertEqual(markdown.count('- [x] '), 1)
+
+        data = json.loads(self.download('json')[0])
+        self.assertEqual([week['week_number'] for week in data['weeks']], [1, 2, 3])
+        self.assertTrue(data['weeks'][1]['tasks'][0]['completed'])
+        self.assertEqual(data['id'], self.curriculum.id)
+
+    def test_ical_has_one_event_per_week(self):
+        calendar, response = self.download('ics')
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        lines = calendar.split('\r\n')
+        self.assertEqual((lines[0], lines[-2], lines[-1]), ('BEGIN:VCALENDAR', 'END:VCALENDAR', ''))
+        self.assertEqual(calendar.count('BEGIN:VEVENT'), 3)
+        self.assertIn('X-WR-CALNAME:Nim\\, Part 1 Curriculum', calendar)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        starts = [line.split(':')[1] for line in lines if line.startswith('DTSTART')]
+        self.assertEqual(len(set(starts)), 3)
+
+    def test_filename_is_escaped(self):
+        Curriculum.objects.filter(pk=self.curriculum.pk).update(topic='Nim "Über" Part 1')
+        response = self.download('json')[1]
+        self.assertEqual(response['Content-Disposition'],
+                         "attachment; filename*=utf-8''Nim%20%22%C3%9Cber%22%20Part%201_curriculum.json")
+
+    def test_unknown_format(self):
+        url = reverse('download_curriculum', args=[self.curriculum.id, 'docx'])
+        self.assertEqual(self.client.get(url).status_code, 404)
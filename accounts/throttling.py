@@ -0,0 +1,158 @@
+"""
+Admission control for LLM-backed generation views.
+
+Each user (or client IP when anonymous) gets a token bucket of
+GENERATION_RATE_BURST requests, refilled at GENERATION_RATE_PER_MINUTE. On
+top of that at most GENERATION_MAX_IN_FLIGHT LLM calls run at once, whether
+they come from a view, a bulk request, a chunked generation or a worker job;
+each call waits up to GENERATION_QUEUE_TIMEOUT seconds for a slot. A slot is
+a cache key leased for GENERATION_SLOT_TTL seconds, so one leaked by a
+crashed process frees itself. Rejected requests get a 429 with Retry-After.
+State lives in Django's cache framework, so configure a shared cache (Redis,
+Memcached, database) when running several processes.
+"""
+import math
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+SLOT_KEY = 'generation:slot:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _CacheLock:
+    """Best-effort mutex built on cache.add; gives up after a short wait"""
+
+    def __init__(self, key, timeout=2, wait=0.05):
+        self.key = f'{key}:lock'
+        self.timeout = timeout
+        self.wait = wait
+        self.held = False
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.wait
+        while not cache.add(self.key, 1, self.timeout):
+            if time.monotonic() >= deadline:
+                return self
+            time.sleep(0.002)
+        self.held = True
+        return self
+
+    def __exit__(self, *exc):
+        if self.held:
+            cache.delete(self.key)
+
+
+def take_tokens(identity, cost=1):
+    """Spend cost tokens from identity's bucket; returns 0 or seconds until they are available"""
+    capacity = _setting('GENERATION_RATE_BURST', 5)
+    rate = _setting('GENERATION_RATE_PER_MINUTE', 10) / 60.0
+    key = f'generation:bucket:{identity}'
+
+    # A request bigger than the burst needs a full bucket rather than never passing
+    cost = min(cost, capacity)
+    with _CacheLock(key):
+        now = time.time()
+        tokens, updated_at = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        if tokens < cost:
+            cache.set(key, (tokens, now), timeout=None)
+            return (cost - tokens) / rate if rate > 0 else math.inf
+        cache.set(key, (tokens - cost, now), timeout=None)
+        return 0
+
+
+class GenerationBusy(Exception):
+    """Raised when no generation slot frees up within GENERATION_QUEUE_TIMEOUT"""
+
+    def __init__(self, retry_after):
+        super().__init__("The generator is busy, please try again shortly")
+        self.retry_after = retry_after
+
+
+def _slot_keys():
+    return [SLOT_KEY.format(i) for i in range(_setting('GENERATION_MAX_IN_FLIGHT', 8))]
+
+
+def acquire_slot(timeout=None):
+    """Lease one of the global generation slots, waiting up to timeout seconds; None if all stay taken"""
+    timeout = _setting('GENERATION_QUEUE_TIMEOUT', 5) if timeout is None else timeout
+    ttl = _setting('GENERATION_SLOT_TTL', 300)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    while True:
+        for key in _slot_keys():
+            if cache.add(key, token, timeout=ttl):
+                return key, token
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(min(0.05, max(deadline - time.monotonic(), 0)))
+
+
+def release_slot(slot):
+    key, token = slot
+    # Only delete our own lease; once it has expired the slot may belong to another call
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def in_flight():
+    return len(cache.get_many(_slot_keys()))
+
+
+@contextmanager
+def generation_slot():
+    """Hold a slot for the duration of one LLM call; raises GenerationBusy when none frees up"""
+    if not _setting('GENERATION_THROTTLE', True):
+        yield
+        return
+    slot = acquire_slot()
+    if slot is None:
+        raise GenerationBusy(_setting('GENERATION_QUEUE_TIMEOUT', 5))
+    try:
+        yield
+    finally:
+        release_slot(slot)
+
+
+def _too_many(message, retry_after):
+    response = JsonResponse({'success': False, 'error': message}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(min(retry_after, 3600))))
+    return response
+
+
+def _identity(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def throttle_generation(cost=1):
+    """
+    View decorator applying the per-user rate limit. cost may be a callable
+    taking the request. The in-flight cap is enforced per LLM call by
+    generation_slot; a GenerationBusy escaping the view becomes a 429.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'POST') or not _setting('GENERATION_THROTTLE', True):
+                return view_func(request, *args, **kwargs)
+
+            retry_after = take_tokens(_identity(request), cost(request) if callable(cost) else cost)
+            if retry_after:
+                return _too_many('Too many generation requests, please slow down', retry_after)
+            try:
+                return view_func(request, *args, **kwargs)
+            except GenerationBusy as e:
+                return _too_many(str(e), e.retry_after)
+        return wrapper
+    return decorator
@@ -17,9 +17,17 @@ urlpatterns = [
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
 
     path('generate_curriculum/', views.generate_curriculum, name='generate_curriculum'),
+    path('generate_curriculum/bulk/', views.generate_curriculum_bulk, name='generate_curriculum_bulk'),
+    path('generate_curriculum/stream/', views.generate_curriculum_stream, name='generate_curriculum_stream'),
+    path('generation_jobs/<uuid:job_id>/', views.generation_job_status, name='generation_job_status'),
     path('update_progress/', views.update_progress, name='update_progress'),
+    path('update_progress/batch/', views.update_progress_batch, name='update_progress_batch'),
     path('curriculum/<int:curriculum_id>/progress/', views.get_curriculum_progress, name='get_curriculum_progress'),
+    path('curriculum/<int:curriculum_id>/extend/', views.extend_curriculum_view, name='extend_curriculum'),
+    path('curriculum/<int:curriculum_id>/weeks/<int:week_number>/regenerate/', views.regenerate_week_view, name='regenerate_week'),
+    path('curriculum/<int:curriculum_id>/links/', views.get_curriculum_links, name='get_curriculum_links'),
     path('curriculum/<int:curriculum_id>/download/', views.download_curriculum_pdf, name='download_curriculum_pdf'),
+    path('curriculum/<int:curriculum_id>/download/<str:export_format>/', views.download_curriculum, name='download_curriculum'),
 
     # Notes and Feedback
     path('add_note/', views.add_note, name='add_note'),
@@ -35,6 +43,9 @@ urlpatterns = [
     path('admin-users/', views.admin_users, name='admin_users'),
     path('admin-curricula/', views.admin_curricula, name='admin_curricula'),
     path('admin-feedback/', views.admin_feedback, name='admin_feedback'),
+    path('admin-generation-cache/', views.admin_generation_cache, name='admin_generation_cache'),
+    path('admin-metrics/', views.admin_metrics, name='admin_metrics'),
+    path('admin-export/', views.admin_export_curricula, name='admin_export_curricula'),
     path('admin-toggle-user/', views.admin_toggle_user_status, name='admin_toggle_user_status'),
     path('admin-delete-user/', views.admin_delete_user, name='admin_delete_user'),
 ]
@@ -3,38 +3,39 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
-from django.db.models import Avg
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Avg, Count
+from django.http import FileResponse, JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
+from django.utils.http import content_disposition_header, parse_etags
 from django.contrib.sites.shortcuts import get_current_site
-from .models import Curriculum, UserProgress, UserProfile, UserNote, CurriculumFeedback, UserAchievement, AdminUser, AdminSession
-import os
+from .models import Curriculum, UserProfile, UserNote, CurriculumFeedback, UserAchievement, AdminUser, AdminSession, GenerationJob
+from .generation import (
+    GenerationError, extend_curriculum, generate_curricula_bulk, generate_curriculum_content, generation_cache,
+    regenerate_week, save_curriculum, single_flight, stream_curriculum
+)
+from . import metrics
+from .export import export_zip_chunks
+from .formats import EXPORT_FORMATS
+from .jobs import enqueue_generation_job
+from .links import curriculum_urls, link_validator
+from .pdf import PdfRenderBusy, curriculum_document, open_cached_pdf, pdf_cache_key, render_pool
+from .progress import (
+    ProgressChangeError, apply_progress_changes, progress_buffer, progress_changes,
+    progress_state, progress_version, state_percentage, toggle_progress
+)
+from .throttling import GenerationBusy, throttle_generation
 import json
 import re
 import uuid
-import requests
 import secrets
 import hashlib
-from urllib.parse import urlparse
-import google.generativeai as genai
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from io import BytesIO
 
-# Configure the API key
-genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
-
-# Temporary code to list available models
-for m in genai.list_models():
-    if 'generateContent' in m.supported_generation_methods:
-        print(m.name)
-
 def send_verification_email(user, request):
     """Send email verification to user"""
     try:
@@ -77,21 +78,7 @@ def send_verification_email(user, request):
 
 def validate_video_link(url):
     """Validate if a video link is accessible"""
-    try:
-        parsed_url = urlparse(url)
-        if not parsed_url.scheme or not parsed_url.netloc:
-            return False
-
-        # Check if it's a known video platform
-        video_platforms = ['youtube.com', 'youtu.be', 'vimeo.com', 'mit.edu', 'harvard.edu']
-        if any(platform in parsed_url.netloc.lower() for platform in video_platforms):
-            return True
-
-        # Try to make a HEAD request to check if URL is accessible
-        response = requests.head(url, timeout=5, allow_redirects=True)
-        return response.status_code == 200
-    except:
-        return False
+    return bool(link_validator.check([url]).get(url))
 
 def validate_password_strength(password):
     """Validate password strength"""
@@ -199,16 +186,8 @@ def admin_logout(request):
     request.session.pop('admin_session_key', None)
     request.session.pop('admin_user_id', None)
 
-def extract_json_from_response(text):
-    """Extract JSON from AI response that might contain extra text"""
-    # Try to find JSON array in the response
-    json_pattern = r'\[[\s\S]*\]'
-    match = re.search(json_pattern, text)
-    if match:
-        return match.group(0)
-    return text
-
 @csrf_exempt
+@throttle_generation()
 def generate_curriculum(request):
     if request.method == 'POST':
         try:
@@ -216,88 +195,129 @@ def generate_curriculum(request):
             topic = data.get('topic')
             duration = int(data.get('duration'))
             goal = data.get('goal') or "Learn the topic thoroughly"
+            difficulty = data.get('difficulty', 'beginner')
 
-            model = genai.GenerativeModel('gemini-1.5-flash')
-
-            prompt = f"""
-Create a detailed {duration} curriculum for learning {topic} at {data.get('difficulty', 'beginner')} level.
-
-Format as JSON with this structure:
-{{
-    "weeks": [
-        {{
-            "week": 1,
-            "title": "Week title",
-            "description": "What will be covered",
-            "tasks": [
-                {{
-                    "task": "Specific learning task",
-                    "resources": ["Resource 1", "Resource 2"],
-                    "videos": ["Video URL or search term"]
-                }}
-            ]
-        }}
-    ]
-}}
-
-Make it practical and hands-on with real-world applications.
-Include 3-4 tasks per week.
-Focus on {topic} fundamentals and practical skills.
-Return only valid JSON, no extra text.
-"""
-
-            response = model.generate_content(prompt)
-            ai_response = response.text
-
-            print("AI raw output:", ai_response)
+            # Hand off to run_generation_workers instead of holding this worker for the LLM call
+            run_async = data.get('async', getattr(settings, 'CURRICULUM_ASYNC_GENERATION', False))
+            if run_async and request.user.is_authenticated:
+                job = enqueue_generation_job(request.user, topic, duration, difficulty, goal)
+                return JsonResponse({
+                    "success": True,
+                    "job_id": str(job.id),
+                    "status": job.status,
+                    "status_url": reverse('generation_job_status', kwargs={'job_id': job.id})
+                }, status=202)
 
             try:
-                # Extract JSON from response
-                json_text = extract_json_from_response(ai_response)
-                parsed = json.loads(json_text)
-
-                # Ensure curriculum is in the correct format
-                if isinstance(parsed, list):
-                    # AI returned array of weeks (old format) - wrap it
-                    validated_curriculum = {"weeks": parsed}
-                else:
-                    # AI returned object with weeks (new format) - use as is
-                    validated_curriculum = parsed
-
-                # Save curriculum to database if user is authenticated
-                if request.user.is_authenticated:
-                    # Create new curriculum with validated links
-                    curriculum = Curriculum.objects.create(
-                        user=request.user,
-                        topic=topic,
-                        difficulty=data.get('difficulty', 'beginner'),
-                        duration=duration,
-                        content=validated_curriculum
-                    )
-
-                    # Initialize progress tracking (should be 0% initially)
-                    curriculum.update_progress()
-
-                    return JsonResponse({
-                        "success": True,
-                        "curriculum": validated_curriculum,
-                        "curriculum_id": curriculum.id
-                    })
-                else:
-                    return JsonResponse({"success": True, "curriculum": validated_curriculum})
-
-            except json.JSONDecodeError:
+                validated_curriculum, cached = generate_curriculum_content(topic, duration, difficulty, goal)
+            except GenerationError as e:
                 return JsonResponse({
                     "success": False,
-                    "error": "Invalid JSON from AI",
-                    "raw_output": ai_response
+                    "error": str(e),
+                    "raw_output": e.raw_output
                 }, status=500)
 
+            # Save curriculum to database if user is authenticated
+            if request.user.is_authenticated:
+                curriculum = save_curriculum(request.user, topic, difficulty, duration, validated_curriculum)
+
+                return JsonResponse({
+                    "success": True,
+                    "curriculum": validated_curriculum,
+                    "curriculum_id": curriculum.id,
+                    "cached": cached
+                })
+            else:
+                return JsonResponse({"success": True, "curriculum": validated_curriculum, "cached": cached})
+
+        except GenerationBusy:
+            raise  # throttle_generation answers with a 429
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)}, status=400)
 
     return JsonResponse({"error": "Only POST allowed"}, status=405)
 
+def _bulk_cost(request):
+    """Each curriculum in a bulk request spends one rate-limit token"""
+    try:
+        return max(1, len(json.loads(request.body).get('curricula') or []))
+    except (ValueError, AttributeError, TypeError):
+        return 1
+
+@login_required
+@throttle_generation(cost=_bulk_cost)
+def generate_curriculum_bulk(request):
+    """Generate a batch of curricula, e.g. one per cohort module, in one request"""
+    if request.method != 'POST':
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+
+    try:
+        specs = json.loads(request.body).get('curricula')
+    except (json.JSONDecodeError, AttributeError) as e:
+        return JsonResponse({"success": False, "error": f"Invalid JSON: {str(e)}"}, status=400)
+
+    max_items = getattr(settings, 'CURRICULUM_BULK_MAX_ITEMS', 25)
+    if not isinstance(specs, list) or not specs:
+        return JsonResponse({"success": False, "error": "curricula must be a non-empty list"}, status=400)
+    if len(specs) > max_items:
+        return JsonResponse({"success": False, "error": f"At most {max_items} curricula per request"}, status=400)
+
+    results = generate_curricula_bulk(request.user, specs)
+    return JsonResponse({
+        "success": all(result['success'] for result in results),
+        "results": results
+    })
+
+def _sse_event(event, payload):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@login_required
+@throttle_generation()
+def generate_curriculum_stream(request):
+    """Stream weeks to the dashboard as Server-Sent Events while Gemini writes them"""
+    try:
+        topic = request.GET.get('topic')
+        duration = int(request.GET.get('duration'))
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "topic and duration are required"}, status=400)
+    goal = request.GET.get('goal') or "Learn the topic thoroughly"
+    difficulty = request.GET.get('difficulty', 'beginner')
+
+    async def events():
+        try:
+            async for event, payload in stream_curriculum(request.user, topic, duration, difficulty, goal):
+                yield _sse_event(event, payload)
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Keep nginx from buffering the stream
+    return response
+
+@login_required
+def generation_job_status(request, job_id):
+    """Poll a queued generation job until its curriculum exists"""
+    try:
+        job = GenerationJob.objects.select_related('curriculum').get(id=job_id, user=request.user)
+
+        result = {
+            'success': True,
+            'job_id': str(job.id),
+            'status': job.status,
+            'curriculum_id': job.curriculum_id,
+        }
+        if job.status == 'succeeded' and job.curriculum:
+            result['curriculum'] = job.curriculum.content
+        elif job.status == 'failed':
+            result['error'] = job.error
+
+        return JsonResponse(result)
+
+    except GenerationJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+
 
 
 def register_view(request):
@@ -496,31 +516,22 @@ def login_view(request):
 @login_required(login_url='/')
 def dashboard_view(request):
     # Get user's curriculum history
-    curricula = Curriculum.objects.filter(user=request.user).order_by('-created_at')
+    # The history list never shows content, so don't load the JSON blobs
+    curricula = Curriculum.objects.filter(user=request.user).defer('content').order_by('-created_at')
 
     # Get the most recent curriculum as "active"
     active_curriculum = curricula.first()
 
-    # Prepare curriculum content for frontend
+    # Prepare curriculum content for frontend from the normalized rows
     curriculum_content_json = None
-    if active_curriculum and active_curriculum.content:
-        import json
-        # Ensure content is in the correct format for frontend
-        if isinstance(active_curriculum.content, list):
-            # Old format: wrap in weeks object
-            curriculum_weeks = active_curriculum.content
-        elif isinstance(active_curriculum.content, dict) and 'weeks' in active_curriculum.content:
-            # New format: extract weeks array
-            curriculum_weeks = active_curriculum.content['weeks']
-        else:
-            curriculum_weeks = []
-
-        curriculum_content_json = json.dumps(curriculum_weeks)
+    if active_curriculum:
+        curriculum_content_json = json.dumps(active_curriculum.weeks_as_content())
 
     context = {
         'curricula': curricula,
         'active_curriculum': active_curriculum,
         'curriculum_content_json': curriculum_content_json,
+        'stream_generation': getattr(settings, 'CURRICULUM_STREAM_GENERATION', False),
     }
     return render(request, 'accounts/dashboard.html', context)
 
@@ -532,29 +543,19 @@ def update_progress(request):
             curriculum_id = data.get('curriculum_id')
             week_number = data.get('week_number')
             task_index = data.get('task_index')
-            is_completed = data.get('is_completed', False)
-
-            curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
+            is_completed = bool(data.get('is_completed', False))
 
-            progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                curriculum=curriculum,
-                week_number=week_number,
-                task_index=task_index,
-                defaults={'completed': is_completed}
+            curriculum = Curriculum.objects.only('id', 'user_id', 'total_tasks', 'completed_tasks', 'progress_percentage').get(
+                id=curriculum_id, user=request.user
             )
 
-            if not created:
-                progress.completed = is_completed
-                progress.completed_at = timezone.now() if is_completed else None
-                progress.save()
-            elif is_completed:
-                progress.completed_at = timezone.now()
-                progress.save()
-
-            # Update curriculum progress
-            curriculum.update_progress()
-            progress_percentage = curriculum.get_progress_percentage()
+            if getattr(settings, 'PROGRESS_WRITE_BEHIND', False):
+                # Buffered until the next flush; answer from stored plus pending progress
+                progress_buffer.record(request.user, curriculum, int(week_number), int(task_index), is_completed)
+                progress_percentage = state_percentage(curriculum, progress_state(request.user, curriculum))
+            else:
+                toggle_progress(request.user, curriculum, int(week_number), int(task_index), is_completed)
+                progress_percentage = curriculum.get_progress_percentage()
 
             # Check if curriculum is completed (100%)
             is_completed = progress_percentage >= 100.0
@@ -570,57 +571,102 @@ def update_progress(request):
             return JsonResponse({'success': False, 'error': f'Invalid JSON: {str(e)}'}, status=400)
         except Curriculum.DoesNotExist as e:
             return JsonResponse({'success': False, 'error': 'Curriculum not found'}, status=404)
+        except ProgressChangeError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
     return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
+@login_required
+def update_progress_batch(request):
+    """Apply many task toggles at once, e.g. a whole week or an offline client's backlog"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        changes = data.get('changes')
+        max_changes = getattr(settings, 'PROGRESS_BATCH_MAX_CHANGES', 500)
+        if not isinstance(changes, list) or len(changes) > max_changes:
+            return JsonResponse({'success': False, 'error': f'changes must be a list of at most {max_changes} items'}, status=400)
+
+        try:
+            curriculum_id = int(data.get('curriculum_id'))
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'curriculum_id must be an integer'}, status=400)
+
+        curriculum = Curriculum.objects.only('id', 'user_id', 'total_tasks', 'completed_tasks', 'progress_percentage').get(
+            id=curriculum_id, user=request.user
+        )
+        results = apply_progress_changes(request.user, curriculum, changes)
+        progress_percentage = curriculum.get_progress_percentage()
+        is_completed = progress_percentage >= 100.0
+
+        return JsonResponse({
+            'success': True,
+            'results': results,
+            'progress_percentage': progress_percentage,
+            'is_completed': is_completed,
+            'congratulations': is_completed
+        })
+
+    except (json.JSONDecodeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid JSON: {str(e)}'}, status=400)
+    except ProgressChangeError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Curriculum.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Curriculum not found'}, status=404)
+
 @login_required
 def get_curriculum_progress(request, curriculum_id):
     try:
-        curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
+        curriculum = Curriculum.objects.defer('content').get(id=curriculum_id, user=request.user)
         progress_data = {}
 
-        # Handle both old and new content formats
-        if isinstance(curriculum.content, list):
-            weeks = curriculum.content
-        elif isinstance(curriculum.content, dict) and 'weeks' in curriculum.content:
-            weeks = curriculum.content['weeks']
-        else:
-            weeks = []
+        # All progress in one query, indexed by (week_number, task_index), plus unflushed toggles.
+        # With ?since=<cursor> only tasks changed after the cursor are read and returned.
+        cursor, progress_rows, is_delta = progress_changes(request.user, curriculum, request.GET.get('since'))
+        overall_percentage = curriculum.progress_percentage
+        if getattr(settings, 'PROGRESS_WRITE_BEHIND', False):
+            full_state = progress_state(request.user, curriculum) if is_delta else progress_rows
+            overall_percentage = state_percentage(curriculum, full_state)
+
+        if is_delta:
+            # The weeks are unchanged since the cursor was issued, so they are left out
+            for (week_num, i), (completed, completed_at) in sorted(progress_rows.items()):
+                progress_data.setdefault(week_num, {})[i] = {
+                    'completed': completed,
+                    'completed_at': completed_at.isoformat() if completed_at else None
+                }
+            return JsonResponse({
+                'success': True,
+                'cursor': cursor,
+                'delta': True,
+                'progress': progress_data,
+                'overall_percentage': overall_percentage
+            })
 
-        for week_data in weeks:
-            week_num = week_data.get('week', 1)
-            progress_data[week_num] = {}
+        # Prepare curriculum content for frontend
+        curriculum_content = curriculum.weeks_as_content()
 
-            for i, task in enumerate(week_data.get('tasks', [])):
-                progress = UserProgress.objects.filter(
-                    user=request.user,
-                    curriculum=curriculum,
-                    week_number=week_num,
-                    task_index=i
-                ).first()
+        for week_data in curriculum_content:
+            week_num = week_data['week']
+            progress_data.setdefault(week_num, {})
 
+            for i in range(len(week_data['tasks'])):
+                completed, completed_at = progress_rows.get((week_num, i), (False, None))
                 progress_data[week_num][i] = {
-                    'completed': progress.completed if progress else False,
-                    'completed_at': progress.completed_at.isoformat() if progress and progress.completed_at else None
+                    'completed': completed,
+                    'completed_at': completed_at.isoformat() if completed_at else None
                 }
 
-        # Prepare curriculum content for frontend
-        curriculum_content = None
-        if isinstance(curriculum.content, list):
-            # Old format: content is directly a list of weeks
-            curriculum_content = curriculum.content
-        elif isinstance(curriculum.content, dict) and 'weeks' in curriculum.content:
-            # New format: content is an object with 'weeks' key
-            curriculum_content = curriculum.content['weeks']
-        else:
-            curriculum_content = []
-
         return JsonResponse({
             'success': True,
+            'cursor': cursor,
+            'delta': False,
             'progress': progress_data,
-            'overall_percentage': curriculum.progress_percentage,
+            'overall_percentage': overall_percentage,
             'curriculum_content': curriculum_content
         })
 
@@ -629,89 +675,148 @@ def get_curriculum_progress(request, curriculum_id):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+@login_required
+@throttle_generation()
+def extend_curriculum_view(request, curriculum_id):
+    """Add weeks to an existing curriculum, generating only the new ones"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST allowed'}, status=405)
+
+    try:
+        curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
+        extra_weeks = int(json.loads(request.body).get('weeks'))
+        max_weeks = getattr(settings, 'CURRICULUM_MAX_EXTEND_WEEKS', 12)
+        if not 1 <= extra_weeks <= max_weeks:
+            return JsonResponse({'success': False, 'error': f'weeks must be between 1 and {max_weeks}'}, status=400)
+
+        new_weeks = extend_curriculum(curriculum, extra_weeks)
+        return JsonResponse({
+            'success': True,
+            'new_weeks': new_weeks,
+            'curriculum_content': curriculum.weeks_as_content(),
+            'progress_percentage': curriculum.progress_percentage
+        })
+
+    except Curriculum.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Curriculum not found'}, status=404)
+    except GenerationError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'raw_output': e.raw_output}, status=500)
+    except GenerationBusy:
+        raise  # throttle_generation answers with a 429
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required
+@throttle_generation()
+def regenerate_week_view(request, curriculum_id, week_number):
+    """Replace one week of a curriculum with freshly generated content"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST allowed'}, status=405)
+
+    try:
+        curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
+        week = regenerate_week(curriculum, week_number)
+        return JsonResponse({
+            'success': True,
+            'week': week,
+            'curriculum_content': curriculum.weeks_as_content(),
+            'progress_percentage': curriculum.progress_percentage
+        })
+
+    except Curriculum.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Curriculum not found'}, status=404)
+    except GenerationError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'raw_output': e.raw_output}, status=500)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=404)
+    except GenerationBusy:
+        raise  # throttle_generation answers with a 429
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required
+def get_curriculum_links(request, curriculum_id):
+    """Cached link status for a curriculum: true, false, or null while unchecked"""
+    try:
+        curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
+    except Curriculum.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Curriculum not found'}, status=404)
+
+    links = link_validator.check(curriculum_urls(curriculum.content), wait=False)
+    return JsonResponse({'success': True, 'links': links})
+
+def _export_document(request, curriculum):
+    """The curriculum's weeks with the user's progress, as rendered by the PDF and the other export formats"""
+    # Completed tasks, looked up once instead of per task
+    state = progress_state(request.user, curriculum)
+    completed = {task for task, (done, _) in state.items() if done}
+    progress_percentage = curriculum.progress_percentage
+    if getattr(settings, 'PROGRESS_WRITE_BEHIND', False):
+        progress_percentage = state_percentage(curriculum, state)
+    return curriculum_document(curriculum, completed, progress_percentage)
+
+@login_required
+def download_curriculum(request, curriculum_id, export_format):
+    """Stream a curriculum as Markdown, JSON or iCalendar; see accounts.formats"""
+    export = EXPORT_FORMATS.get(export_format)
+    if export is None:
+        return JsonResponse({'error': f'Unknown export format: {export_format}'}, status=404)
+
+    try:
+        curriculum = Curriculum.objects.defer('content').get(id=curriculum_id, user=request.user)
+    except Curriculum.DoesNotExist:
+        return JsonResponse({'error': 'Curriculum not found'}, status=404)
+
+    document = _export_document(request, curriculum)
+    response = StreamingHttpResponse(
+        (chunk.encode('utf-8') for chunk in export.serialize(curriculum, document)),
+        content_type=export.content_type
+    )
+    # Topics are free text; quotes and non-ASCII characters must not break the header
+    response['Content-Disposition'] = content_disposition_header(True, f'{curriculum.topic}_curriculum.{export.extension}')
+    return response
+
 @login_required
 def download_curriculum_pdf(request, curriculum_id):
     try:
         curriculum = Curriculum.objects.get(id=curriculum_id, user=request.user)
 
-        # Create PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Title
-        title = Paragraph(f"<b>{curriculum.topic} Curriculum</b>", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-
-        # Duration
-        duration_text = Paragraph(f"<b>Duration:</b> {curriculum.duration}", styles['Normal'])
-        story.append(duration_text)
-        story.append(Spacer(1, 12))
-
-        # Difficulty
-        difficulty_text = Paragraph(f"<b>Difficulty:</b> {curriculum.difficulty.title()}", styles['Normal'])
-        story.append(difficulty_text)
-        story.append(Spacer(1, 12))
-
-        # Progress
-        progress_percentage = curriculum.progress_percentage
-        progress_text = Paragraph(f"<b>Progress:</b> {progress_percentage:.1f}% completed", styles['Normal'])
-        story.append(progress_text)
-        story.append(Spacer(1, 20))
-
-        # Curriculum content - handle both formats
-        if isinstance(curriculum.content, list):
-            weeks = curriculum.content
-        elif isinstance(curriculum.content, dict) and 'weeks' in curriculum.content:
-            weeks = curriculum.content['weeks']
-        else:
-            weeks = []
-
-        for week_data in weeks:
-            week_title = Paragraph(f"<b>Week {week_data.get('week', 1)}: {week_data.get('title', '')}</b>", styles['Heading2'])
-            story.append(week_title)
-            story.append(Spacer(1, 6))
-
-            description = Paragraph(f"<b>Description:</b> {week_data.get('description', '')}", styles['Normal'])
-            story.append(description)
-            story.append(Spacer(1, 6))
-
-            # Videos
-            if week_data.get('videos'):
-                videos_title = Paragraph("<b>Videos:</b>", styles['Normal'])
-                story.append(videos_title)
-                for video in week_data['videos']:
-                    video_item = Paragraph(f"• {video}", styles['Normal'])
-                    story.append(video_item)
-                story.append(Spacer(1, 6))
-
-            # Tasks
-            if week_data.get('tasks'):
-                tasks_title = Paragraph("<b>Tasks:</b>", styles['Normal'])
-                story.append(tasks_title)
-                for i, task in enumerate(week_data['tasks']):
-                    # Check if task is completed
-                    progress = UserProgress.objects.filter(
-                        user=request.user,
-                        curriculum=curriculum,
-                        week_number=week_data.get('week', 1),
-                        task_index=i,
-                        is_completed=True
-                    ).exists()
-
-                    status = "✓" if progress else "○"
-                    task_item = Paragraph(f"• {status} {task}", styles['Normal'])
-                    story.append(task_item)
-                story.append(Spacer(1, 12))
-
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{curriculum.topic}_curriculum.pdf"'
+        # Content hash plus progress version: the cache key and the ETag
+        key = pdf_cache_key(curriculum, progress_version(request.user, curriculum))
+        etag = f'"{key}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        pdf_file = open_cached_pdf(curriculum, key)
+        if pdf_file is None:
+            try:
+                future = render_pool.submit(curriculum.id, key, _export_document(request, curriculum))
+            except PdfRenderBusy as e:
+                response = JsonResponse({'success': False, 'error': str(e)}, status=503)
+                response['Retry-After'] = '2'
+                return response
+
+            # Wait briefly; a longer render finishes into the cache while the client polls this URL
+            wait = getattr(settings, 'PDF_RENDER_WAIT_MS', 2000) / 1000 if getattr(settings, 'PDF_CACHE_DIR', None) else None
+            try:
+                pdf_file = BytesIO(future.result(timeout=wait))
+            except FuturesTimeoutError:
+                response = JsonResponse({
+                    'success': True,
+                    'status': 'rendering',
+                    'download_url': request.build_absolute_uri(request.path)
+                }, status=202)
+                response['Retry-After'] = '1'
+                return response
+
+        response = FileResponse(
+            pdf_file, as_attachment=True, filename=f'{curriculum.topic}_curriculum.pdf', content_type='application/pdf'
+        )
+        response['ETag'] = etag
+        # Browsers keep the file but revalidate, getting a 304 until something changes
+        response['Cache-Control'] = 'private, no-cache'
         return response
 
     except Curriculum.DoesNotExist:
@@ -942,15 +1047,12 @@ def admin_users(request):
 @admin_required
 def admin_curricula(request):
     """Curriculum management page"""
-    curricula = Curriculum.objects.all().order_by('-created_at')
-
-    # Add curriculum statistics
-    for curriculum in curricula:
-        curriculum.feedback_count = CurriculumFeedback.objects.filter(curriculum=curriculum).count()
-        curriculum.notes_count = UserNote.objects.filter(curriculum=curriculum).count()
-        curriculum.avg_rating = CurriculumFeedback.objects.filter(curriculum=curriculum).aggregate(
-            avg_rating=Avg('rating')
-        )['avg_rating']
+    # Statistics in the same query, and without loading every content blob
+    curricula = Curriculum.objects.defer('content').annotate(
+        feedback_count=Count('curriculumfeedback', distinct=True),
+        notes_count=Count('usernote', distinct=True),
+        avg_rating=Avg('curriculumfeedback__rating')
+    ).order_by('-created_at')
 
     context = {'curricula': curricula, 'admin_user': request.admin_user}
     return render(request, 'accounts/admin_curricula.html', context)
@@ -962,6 +1064,26 @@ def admin_feedback(request):
     context = {'feedback': feedback, 'admin_user': request.admin_user}
     return render(request, 'accounts/admin_feedback.html', context)
 
+@admin_required
+def admin_generation_cache(request):
+    """Generation cache hit/miss/eviction counters for sizing the cache"""
+    stats = generation_cache.stats()
+    stats['single_flight'] = single_flight.stats()
+    return JsonResponse({'success': True, 'stats': stats})
+
+@admin_required
+def admin_metrics(request):
+    """Generation pipeline metrics in the Prometheus text format"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_required
+def admin_export_curricula(request):
+    """Stream every curriculum, its progress and feedback as a ZIP of JSON Lines"""
+    # PDFs are left to manage.py export_curricula --pdfs so renders never run in a request
+    response = StreamingHttpResponse(export_zip_chunks(), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="curricula-export-{timezone.now():%Y%m%d}.zip"'
+    return response
+
 @csrf_exempt
 @admin_required
 def admin_toggle_user_status(request):
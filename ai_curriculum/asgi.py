@@ -2,6 +2,8 @@
 ASGI config for ai_curriculum project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through this entry point to stream curriculum generation over
+Server-Sent Events (``/generate_curriculum/stream/``) without buffering.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
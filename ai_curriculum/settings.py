@@ -151,3 +151,90 @@ REQUIRE_EMAIL_VERIFICATION = not DEBUG  # Skip email verification in development
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Curriculum generation cache
+CURRICULUM_CACHE_TTL = 60 * 60 * 24  # Seconds a generated curriculum may be reused
+CURRICULUM_CACHE_MAX_ENTRIES = 256  # In-process LRU size per worker
+
+# Background generation (python manage.py run_generation_workers)
+CURRICULUM_ASYNC_GENERATION = False  # Queue dashboard generations as GenerationJob rows
+GENERATION_WORKERS = 4  # Concurrent LLM calls per worker process
+GENERATION_JOB_LEASE = 600  # Seconds before a running job whose worker died is failed
+
+# Bulk generation (POST /generate_curriculum/bulk/)
+CURRICULUM_BULK_CONCURRENCY = 4  # LLM calls in flight per bulk request
+CURRICULUM_BULK_MAX_ITEMS = 25
+
+# Weeks that can be added to an existing curriculum per request
+CURRICULUM_MAX_EXTEND_WEEKS = 12
+
+# Long curricula are planned as an outline, then generated in parallel week blocks
+CURRICULUM_CHUNK_THRESHOLD = 8  # Durations above this many weeks are chunked
+CURRICULUM_CHUNK_WEEKS = 4
+CURRICULUM_CHUNK_CONCURRENCY = 6
+
+# Stream weeks to the dashboard over Server-Sent Events. Serve through
+# ai_curriculum.asgi (e.g. uvicorn/daphne); WSGI servers buffer the stream.
+CURRICULUM_STREAM_GENERATION = False
+
+# Coalesce identical concurrent generations onto one LLM call
+CURRICULUM_SINGLE_FLIGHT = True
+CURRICULUM_SINGLE_FLIGHT_TIMEOUT = 60  # Seconds followers wait before calling the LLM themselves
+CURRICULUM_SINGLE_FLIGHT_LEASE_TTL = 600  # Seconds a leader's lease lasts; must outlast chunked generations
+
+# Task progress storage: 'rows' (one UserProgress row per task) or 'bitmap'
+# (one ProgressBitmap per curriculum). Switch with manage.py migrate_progress_storage.
+PROGRESS_STORAGE = 'rows'
+
+# Largest list of changes accepted by POST /update_progress/batch/
+PROGRESS_BATCH_MAX_CHANGES = 500
+
+# Write-behind for single task toggles: keep the last state per task in a
+# per-process buffer and write it in batches. Readers see their own pending
+# toggles only on the process that took them, so use sticky sessions or a
+# single worker when enabling this.
+PROGRESS_WRITE_BEHIND = False
+PROGRESS_FLUSH_INTERVAL_MS = 250
+PROGRESS_FLUSH_MAX_PENDING = 1000
+
+# Rendered curriculum PDFs, keyed by content hash and progress version.
+# Old renders are replaced as progress changes; set to None to disable.
+PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+
+# PDFs render in a process pool (one per server process; 0 renders in the
+# request). Downloads wait up to PDF_RENDER_WAIT_MS, then get a 202 and poll the
+# same URL while the render finishes into PDF_CACHE_DIR. Each web worker
+# process has its own pool, so a server runs up to PDF_RENDER_WORKERS times
+# the number of web workers (e.g. gunicorn --workers) ReportLab processes.
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_WAIT_MS = 2000
+PDF_RENDER_MAX_PENDING = 32
+
+# Generation admission control (accounts.throttling). Limits are kept in the
+# default cache; use a shared backend such as Redis when running several processes.
+GENERATION_THROTTLE = True
+GENERATION_RATE_BURST = 5  # Requests a user can make back to back
+GENERATION_RATE_PER_MINUTE = 10  # Sustained requests per user
+GENERATION_MAX_IN_FLIGHT = 8  # LLM calls running at once across all users
+GENERATION_QUEUE_TIMEOUT = 5  # Seconds a call waits for a free slot before a 429
+GENERATION_SLOT_TTL = 300  # Seconds before a slot leaked by a crashed process frees itself
+
+# Resource/video link validation, run in the background after each generation
+CURRICULUM_VALIDATE_LINKS = True
+LINK_CHECK_TTL = 60 * 60 * 24 * 7  # Seconds before a checked link is revalidated
+LINK_CHECK_TIMEOUT = 5
+LINK_CHECK_WORKERS = 16  # Pooled HTTP connections / concurrent checks per process
+LINK_CHECK_PER_HOST = 4  # Concurrent checks against any one host
+LINK_CHECK_ALLOWED_HOSTS = []  # Hosts exempt from the public-address check, e.g. a local test server
+
+# Gemini client (created lazily on first generation)
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-1.5-flash'
+LLM_MODELS_CACHE_PATH = BASE_DIR / 'llm_models.json'  # Written by manage.py llm_models
+LLM_MODELS_CACHE_TTL = 60 * 60 * 24
+
+# LLM backend: accounts.llm.GeminiBackend, accounts.llm.FakeBackend (offline,
+# deterministic) or accounts.llm.ReplayBackend (saved responses in LLM_REPLAY_DIR)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'accounts.llm.GeminiBackend')
+LLM_BACKEND_OPTIONS = {}  # e.g. {'latency': 0.5, 'failure_rate': 0.1, 'seed': 1} for load tests
+LLM_REPLAY_DIR = BASE_DIR / 'llm_recordings'
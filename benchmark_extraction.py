@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for curriculum JSON extraction over 1 KB - 500 KB responses.
+
+Builds fenced, prose-wrapped responses with the fake LLM backend and times
+extract_curriculum against the legacy greedy-regex approach. Time per KB
+should stay flat as the response grows.
+
+    python benchmark_extraction.py --repeat 20
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+django.setup()
+
+from accounts.extraction import extract_curriculum
+from accounts.llm import FakeBackend
+
+SIZES_KB = [1, 10, 50, 100, 250, 500]
+
+
+def legacy_extract(text):
+    """The regex-based extraction this module replaced"""
+    match = re.search(r'\[[\s\S]*\]', text)
+    return json.loads(match.group(0) if match else text)
+
+
+def build_response(size_kb):
+    """A realistic fenced response of roughly size_kb kilobytes"""
+    backend = FakeBackend()
+    weeks = 1
+    while True:
+        body = json.dumps({'weeks': backend.build_weeks({'topic': 'Python', 'duration': weeks})}, indent=2)
+        if len(body) >= size_kb * 1024 or weeks > 5000:
+            break
+        weeks = max(weeks + 1, int(weeks * size_kb * 1024 / len(body)))
+    return f"Here is your curriculum:\n```json\n{body}\n```\nLet me know if you need changes!"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print("=== Extraction Benchmark ===")
+    print(f"{'size':>8} {'extract ms':>12} {'us/KB':>8} {'legacy ms':>12}")
+    for size_kb in SIZES_KB:
+        text = build_response(size_kb)
+        actual_kb = len(text) / 1024
+        extract = min(timeit.repeat(lambda: extract_curriculum(text), number=1, repeat=args.repeat))
+        legacy = min(timeit.repeat(lambda: legacy_extract(text), number=1, repeat=args.repeat))
+        print(f"{actual_kb:7.0f}K {extract * 1000:12.3f} {extract * 1e6 / actual_kb:8.1f} {legacy * 1000:12.3f}")
+    print("\nLegacy: greedy regex + json.loads, with no schema validation or truncation repair.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the generation pipeline.
+
+Runs the LLM call, JSON parse, Curriculum persist and progress init for
+many distinct topics using the deterministic fake LLM backend, and
+reports per-stage timings. No network or API key needed.
+
+    python benchmark_generation.py --count 200 --weeks 12
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts import llm
+from accounts.generation import build_curriculum_prompt, parse_curriculum_response, save_curriculum
+
+
+def report(name, samples):
+    total = sum(samples)
+    print(f"{name:<16} median {statistics.median(samples) * 1000:8.3f} ms"
+          f"   p95 {sorted(samples)[int(len(samples) * 0.95) - 1] * 1000:8.3f} ms"
+          f"   {len(samples) / total if total else float('inf'):10.1f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200, help='Number of curricula to generate')
+    parser.add_argument('--weeks', type=int, default=12, help='Weeks per curriculum')
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected LLM latency in seconds')
+    args = parser.parse_args()
+
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create_user(username='benchmark', password='benchmark')
+
+    stages = {'llm': [], 'parse': [], 'persist+progress': []}
+    backend_settings = {
+        'LLM_BACKEND': 'accounts.llm.FakeBackend',
+        'LLM_BACKEND_OPTIONS': {'latency': args.latency},
+        'CURRICULUM_VALIDATE_LINKS': False,  # Keep the benchmark offline
+    }
+    with override_settings(**backend_settings):
+        backend = llm.get_backend()
+        for i in range(args.count):
+            topic = f'Topic {i}'
+            context = {'topic': topic, 'duration': args.weeks, 'difficulty': 'beginner'}
+
+            start = time.perf_counter()
+            text = backend.generate(build_curriculum_prompt(topic, args.weeks, 'beginner'), context)
+            parsed_at = time.perf_counter()
+            content = parse_curriculum_response(text)
+            persisted_at = time.perf_counter()
+            save_curriculum(user, topic, 'beginner', args.weeks, content)
+            done = time.perf_counter()
+
+            stages['llm'].append(parsed_at - start)
+            stages['parse'].append(persisted_at - parsed_at)
+            stages['persist+progress'].append(done - persisted_at)
+
+    print("=== Generation Pipeline Benchmark ===")
+    print(f"{args.count} curricula x {args.weeks} weeks, fake backend latency {args.latency:.3f}s\n")
+    for name, samples in stages.items():
+        report(name, samples)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Curriculum PDF render benchmark for 4-, 12- and 52-week curricula.
+
+Renders documents built from fake-backend weeks with accounts.pdf_builder
+and with the legacy per-render style sheet layout, reporting median time
+and peak Python memory (tracemalloc) per render.
+
+    python benchmark_pdf.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+django.setup()
+
+from accounts.llm import FakeBackend
+from accounts.pdf_builder import get_styles, render_pdf
+
+WEEKS = [4, 12, 52]
+
+
+def build_document(weeks):
+    """A render_pdf document with about half the tasks completed"""
+    content = FakeBackend().build_weeks({'topic': 'Python & <Data>', 'duration': weeks})
+    return {
+        'topic': 'Python & <Data>',
+        'duration': f'{weeks} weeks',
+        'difficulty': 'intermediate',
+        'progress_percentage': 50.0,
+        'weeks': [
+            {
+                'week_number': week['week'],
+                'title': week['title'],
+                'description': week['description'],
+                'videos': week.get('videos', []),
+                'tasks': [(task['task'], i % 2 == 0) for i, task in enumerate(week['tasks'])],
+            }
+            for week in content
+        ],
+    }
+
+
+def legacy_render(document):
+    """The layout before the builder rewrite: a new style sheet per render and unescaped text"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+    story.append(Paragraph(f"<b>{document['topic']} Curriculum</b>", styles['Title']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"<b>Duration:</b> {document['duration']}", styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"<b>Difficulty:</b> {document['difficulty'].title()}", styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"<b>Progress:</b> {document['progress_percentage']:.1f}% completed", styles['Normal']))
+    story.append(Spacer(1, 20))
+    for week in document['weeks']:
+        story.append(Paragraph(f"<b>Week {week['week_number']}: {week['title']}</b>", styles['Heading2']))
+        story.append(Spacer(1, 6))
+        story.append(Paragraph(f"<b>Description:</b> {week['description']}", styles['Normal']))
+        story.append(Spacer(1, 6))
+        if week['videos']:
+            story.append(Paragraph("<b>Videos:</b>", styles['Normal']))
+            for video in week['videos']:
+                story.append(Paragraph(f"• {video}", styles['Normal']))
+            story.append(Spacer(1, 6))
+        if week['tasks']:
+            story.append(Paragraph("<b>Tasks:</b>", styles['Normal']))
+            for task, completed in week['tasks']:
+                story.append(Paragraph(f"• {'✓' if completed else '○'} {task}", styles['Normal']))
+            story.append(Spacer(1, 12))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def measure(render, document, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = render(document)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    render(document)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    get_styles()  # Warm up like a long-running worker
+    print("=== PDF Render Benchmark ===")
+    print(f"{'weeks':>6} {'tasks':>6} {'render ms':>10} {'peak MB':>8} {'KB':>6} {'legacy ms':>10} {'legacy MB':>10}")
+    for weeks in WEEKS:
+        document = build_document(weeks)
+        # The legacy layout cannot cope with markup characters, so give it a plain topic
+        legacy_document = dict(document, topic='Python Data')
+        tasks = sum(len(week['tasks']) for week in document['weeks'])
+        seconds, peak, size = measure(render_pdf, document, args.repeat)
+        legacy_seconds, legacy_peak, _ = measure(legacy_render, legacy_document, args.repeat)
+        print(f"{weeks:>6} {tasks:>6} {seconds * 1000:10.1f} {peak / 2**20:8.2f} {size / 1024:6.0f} "
+              f"{legacy_seconds * 1000:10.1f} {legacy_peak / 2**20:10.2f}")
+    print("\nPeak memory is Python allocations during one render (tracemalloc).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
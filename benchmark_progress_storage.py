@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Storage and latency benchmark for task progress: UserProgress rows vs
+per-curriculum ProgressBitmap.
+
+Fills both representations with the same progress for many curricula, then
+reports on-disk size (table plus indexes, from SQLite's dbstat) and the
+latency of a full progress read, a completed count and a single toggle.
+
+    python benchmark_progress_storage.py --curricula 500 --weeks 12 --tasks 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import Curriculum, ProgressBitmap, UserProgress, build_structure
+from accounts.progress import get_progress_store, toggle_progress
+
+
+def table_bytes(table):
+    """Bytes used by a table and its indexes"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = %s "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+            [table, table]
+        )
+        return cursor.fetchone()[0]
+
+
+def populate(args):
+    rng = random.Random(1)
+    weeks = [
+        {'week': w, 'title': f'Week {w}', 'description': '',
+         'tasks': [{'task': f'Task {t}', 'resources': [], 'videos': []} for t in range(args.tasks)]}
+        for w in range(1, args.weeks + 1)
+    ]
+    users = User.objects.bulk_create([User(username=f'bench{i}') for i in range(args.curricula)])
+    curricula = Curriculum.objects.bulk_create([
+        Curriculum(user=user, topic='Benchmark', duration=args.weeks, content={'weeks': weeks},
+                   total_tasks=args.weeks * args.tasks)
+        for user in users
+    ])
+    build_structure(curricula)
+
+    now = timezone.now()
+    rows, bitmaps = [], []
+    for curriculum in curricula:
+        bitmap = ProgressBitmap(curriculum=curriculum)
+        for w in range(1, args.weeks + 1):
+            for t in range(args.tasks):
+                if rng.random() < args.touched:
+                    completed = rng.random() < 0.8
+                    rows.append(UserProgress(user_id=curriculum.user_id, curriculum=curriculum, week_number=w,
+                                             task_index=t, completed=completed,
+                                             completed_at=now if completed else None, changed_at=now))
+                    bitmap.set(w, t, completed)
+                    bitmap.set_times(w, t, now if completed else None, now)
+        bitmaps.append(bitmap)
+    UserProgress.objects.bulk_create(rows, batch_size=2000)
+    ProgressBitmap.objects.bulk_create(bitmaps, batch_size=500)
+    return curricula, len(rows)
+
+
+def timed(fn, samples):
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--curricula', type=int, default=500)
+    parser.add_argument('--weeks', type=int, default=12)
+    parser.add_argument('--tasks', type=int, default=4, help='Tasks per week')
+    parser.add_argument('--touched', type=float, default=0.6, help='Fraction of tasks with progress')
+    parser.add_argument('--samples', type=int, default=300)
+    args = parser.parse_args()
+
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    curricula, row_count = populate(args)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    print("=== Progress Storage Benchmark ===")
+    print(f"{args.curricula} curricula x {args.weeks} weeks x {args.tasks} tasks, {row_count} progress rows\n")
+
+    sizes = {'rows': table_bytes('accounts_userprogress'), 'bitmap': table_bytes('accounts_progressbitmap')}
+    rng = random.Random(2)
+    print(f"{'storage':<8} {'bytes':>10} {'B/curric':>9} {'read us':>9} {'count us':>9} {'toggle us':>10}")
+    for name in ('rows', 'bitmap'):
+        store = get_progress_store(name)
+        pick = lambda: rng.choice(curricula)
+        read = timed(lambda: store.state((c := pick()).user, c), args.samples)
+        count = timed(lambda: store.count((c := pick()).user, c), args.samples)
+        with override_settings(PROGRESS_STORAGE=name):
+            toggle = timed(lambda: toggle_progress((c := pick()).user, c, rng.randint(1, args.weeks),
+                                                   rng.randrange(args.tasks), rng.random() < 0.5), args.samples)
+        print(f"{name:<8} {sizes[name]:>10} {sizes[name] / args.curricula:>9.0f} {read:>9.1f} {count:>9.1f} {toggle:>10.1f}")
+
+    print("\nSizes include indexes. Reads are a full progress map for one curriculum (median).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for single-flight generation against the fake LLM backend.
+
+Fires N identical generation requests at once and reports how many LLM
+calls were made and the wall time, with single-flight on and off.
+
+    python benchmark_single_flight.py --requests 30 --latency 0.5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts import llm
+from accounts.generation import generate_curriculum_content, generation_cache, single_flight
+
+def run(requests, enabled):
+    generation_cache.clear()
+    single_flight.clear()
+    backend = llm.get_backend()
+    backend.calls = 0
+    barrier = threading.Barrier(requests)
+    errors = []
+
+    def worker(i):
+        try:
+            barrier.wait()
+            generate_curriculum_content('Python', 4, 'beginner', f'run-{enabled}')
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(requests)]
+    start = time.perf_counter()
+    with override_settings(CURRICULUM_SINGLE_FLIGHT=enabled), mock.patch('builtins.print'):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    return backend.calls, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.5, help='Fake backend latency in seconds')
+    args = parser.parse_args()
+
+    # Use a throwaway file database so worker threads share it
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+
+    print("=== Single-flight Benchmark ===")
+    print(f"{args.requests} concurrent identical requests, fake backend latency {args.latency:.2f}s\n")
+    backend_settings = {
+        'LLM_BACKEND': 'accounts.llm.FakeBackend',
+        'LLM_BACKEND_OPTIONS': {'latency': args.latency},
+        'CURRICULUM_VALIDATE_LINKS': False,  # Keep the benchmark offline
+    }
+    with override_settings(**backend_settings):
+        for enabled in (False, True):
+            calls, elapsed, errors = run(args.requests, enabled)
+            label = 'single-flight on ' if enabled else 'single-flight off'
+            print(f"{label}: {calls:3d} LLM calls, {elapsed:6.2f}s wall, {len(errors)} errors")
+            if errors:
+                print(f"    first error: {errors[0]!r}")
+    print(f"\nSingle-flight stats: {single_flight.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time to import accounts.views in a fresh interpreter.
+
+Each run blocks outbound sockets, so any network access at import time
+fails the run instead of silently slowing it down.
+
+    python benchmark_startup.py --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+PROBE = r'''
+import os, socket, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_curriculum.settings')
+
+def no_network(*args, **kwargs):
+    raise RuntimeError('network access during import')
+socket.socket.connect = no_network
+socket.create_connection = no_network
+
+import django
+django.setup()
+# Framework modules every request loads anyway; time only what accounts.views adds
+import django.http, django.shortcuts, django.contrib.auth.views
+start = time.perf_counter()
+import accounts.views
+elapsed = time.perf_counter() - start
+print(f"{elapsed * 1000:.2f} {int('google.generativeai' in sys.modules)}")
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print("=== Startup Benchmark ===")
+    timings = []
+    for run in range(args.runs):
+        result = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Run {run + 1} failed:\n{result.stderr}")
+            return 1
+        elapsed_ms, sdk_loaded = result.stdout.split()
+        timings.append(float(elapsed_ms))
+        print(f"Run {run + 1}: import accounts.views {float(elapsed_ms):8.2f} ms"
+              f" (Gemini SDK loaded: {'yes' if sdk_loaded == '1' else 'no'})")
+
+    print(f"\nMedian: {statistics.median(timings):.2f} ms over {args.runs} runs, no network access")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())